@@ -0,0 +1,74 @@
+"""
+Module for per-worker admission control.
+
+At most `max_in_flight` requests run at once; up to `max_queue` more wait
+briefly for a slot. Anything beyond that, or anything that waits longer than
+`queue_timeout`, is shed so the app can answer with a fast 503 instead of
+letting work pile up until gunicorn's timeout kills it.
+"""
+import os
+import threading
+import time
+from typing import Dict
+
+class AdmissionController:
+    """Bounded in-flight limit with a short FIFO-ish wait queue."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._counters = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0, 'shed_queue_timeout': 0}
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        return cls(
+            int(os.environ.get('MAX_IN_FLIGHT', 32)),
+            int(os.environ.get('MAX_QUEUE', 16)),
+            float(os.environ.get('QUEUE_TIMEOUT', 0.5))
+        )
+
+    def try_acquire(self, timeout: float = None) -> bool:
+        """Take a slot, waiting in the queue up to `timeout`; False means shed."""
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        with self._cond:
+            if self._in_flight < self.max_in_flight and not self._waiting:
+                self._in_flight += 1
+                self._counters['admitted'] += 1
+                return True
+            if self._waiting >= self.max_queue:
+                self._counters['shed_queue_full'] += 1
+                return False
+
+            self._waiting += 1
+            self._counters['queued'] += 1
+            give_up_at = time.monotonic() + timeout
+            try:
+                while self._in_flight >= self.max_in_flight:
+                    left = give_up_at - time.monotonic()
+                    if left <= 0:
+                        self._counters['shed_queue_timeout'] += 1
+                        return False
+                    self._cond.wait(left)
+                self._in_flight += 1
+                self._counters['admitted'] += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(
+                self._counters,
+                in_flight=self._in_flight,
+                queue_depth=self._waiting,
+                shed=self._counters['shed_queue_full'] + self._counters['shed_queue_timeout']
+            )
@@ -1,10 +1,98 @@
-from flask import Flask, request, jsonify, send_from_directory
+import time
+# Measured from the first import so /api/ready can report the app's import time
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, request, send_file, send_from_directory
 from flask_cors import CORS
+from flask_limiter import Limiter
 import os
-from podcast_data import search_podcasts, get_all_podcasts
-from linkedin_scraper import extract_profile_data, analyze_profile_for_podcasts
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from admission import AdmissionController
+from cache import get_cache
+from deadlines import DeadlineExceeded, bounded_timeout, clear_deadline, current_deadline, set_deadline
+from podcast_data import search_podcasts, get_all_podcasts, get_catalog_version, get_podcast_by_id, get_podcast_id
+from linkedin_scraper import extract_profile_data, analyze_profile_for_podcasts, canonical_username, profile_url
+from pitch import generate_pitch_message
+from logs import end_request, get_logger, log_stats, request_stages, start_request
+from metrics import metrics, stage
+from profiling import profiler
+from http_cache import add_cache_headers, compute_etag, is_not_modified, not_modified
+from images import ImageFetchError, image_proxy
+from events import EVENT_WEIGHTS, MAX_EVENTS_PER_REQUEST, PODCAST_ID_PATTERN, event_store
+from encoding import PrecompressedSnapshot, encoding_stats, json_response, stream_format, stream_response
+from projection import DEFAULT_FIELDS, ProjectionError, ProjectionIndex, apply_projection, get_projection_index, parse_projection, peek_projection_index
+from profile_fetcher import ProfileFetchError, ProfileNotFoundError, get_profile_fetcher
+from scoring import prepare_podcast, rank_prepared
+from scoring_pool import ScoringExecutor
+from similarity import get_similarity_index, peek_similarity_index, similarity_blender
+from sharding import ShardCoordinator
+from singleflight import SingleFlight
 
 app = Flask(__name__)
+log = get_logger(__name__)
+
+# Requests slower than this are also logged as a `slow_request` warning,
+# which is never sampled away like the per-request `request` event can be
+LOG_SLOW_MS = float(os.environ.get('LOG_SLOW_MS', 1000))
+
+# Per-worker admission control and the time budget of each admitted request
+admission = AdmissionController.from_env()
+REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', 25))
+SHED_RETRY_AFTER = int(os.environ.get('SHED_RETRY_AFTER', 1))
+ADMITTED_ENDPOINTS = {'recommend', 'pitch', 'list_podcasts', 'get_catalog', 'record_events'}
+
+def client_address():
+    """Key per-client quotas on the original client address behind the proxy."""
+    return request.access_route[0] if request.access_route else request.remote_addr
+
+# Per-client quotas, kept per worker unless RATE_LIMIT_STORAGE_URI points at a shared
+# store: optional on /api/recommend (e.g. RECOMMEND_RATE_LIMIT="10 per minute"), on by
+# default on /api/events so one client cannot flood the priors
+RECOMMEND_RATE_LIMIT = os.environ.get('RECOMMEND_RATE_LIMIT')
+EVENTS_RATE_LIMIT = os.environ.get('EVENTS_RATE_LIMIT', '120 per minute')
+limiter = Limiter(
+    client_address,
+    app=app,
+    storage_uri=os.environ.get('RATE_LIMIT_STORAGE_URI', 'memory://'),
+    enabled=bool(RECOMMEND_RATE_LIMIT or EVENTS_RATE_LIMIT)
+)
+
+# Optional process pool for scoring (SCORING_WORKERS > 0 enables it)
+scoring_executor = ScoringExecutor.from_env()
+SCORING_TIMEOUT = float(os.environ.get('SCORING_TIMEOUT', 10))
+
+# Optional scatter-gather over catalog shard nodes (SHARD_NODES enables it)
+shard_coordinator = ShardCoordinator.from_env()
+# The nodes hold the catalog; recommendations are projected from the podcasts they return
+SHARDED_PROJECTION = ProjectionIndex([])
+
+# Coalesces concurrent /api/recommend calls for the same profile and flag
+recommend_flight = SingleFlight()
+
+# Recommendations per response; streamed responses may ask for up to MAX_STREAM_K
+RECOMMEND_K = 10
+MAX_STREAM_K = int(os.environ.get('MAX_STREAM_K', 200))
+
+# Full catalog, serialized and compressed once per catalog version
+catalog_snapshot = (None, None)
+catalog_snapshot_lock = threading.Lock()
+
+# Catalog prepared for in-process scoring, keyed by the loaded catalog list
+prepared_catalog = (None, None)
+prepared_catalog_lock = threading.Lock()
+
+# Startup progress, reported by /api/ready
+startup = {
+    'ready': False,
+    'mode': None,
+    'import_seconds': None,
+    'warm_up_seconds': {},
+    'podcasts': None,
+    'catalog_version': None,
+    'error': None
+}
+warming_pid = None
 
 # Configure CORS for production
 if os.environ.get('FLASK_ENV') == 'production':
@@ -13,12 +101,13 @@ if os.environ.get('FLASK_ENV') == 'production':
         r"/api/*": {
             "origins": os.environ.get('ALLOWED_ORIGINS', '').split(','),
             "methods": ["GET", "POST"],
-            "allow_headers": ["Content-Type"]
+            "allow_headers": ["Content-Type", "If-None-Match", "X-Request-ID"],
+            "expose_headers": ["ETag", "X-Request-ID"]
         }
     })
 else:
     # In development, allow all origins
-    CORS(app)
+    CORS(app, expose_headers=["ETag", "X-Request-ID"])
 
 # Security headers middleware
 @app.after_request
@@ -27,158 +116,668 @@ def add_security_headers(response):
     response.headers['X-Frame-Options'] = 'DENY'
     response.headers['X-XSS-Protection'] = '1; mode=block'
     response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+    return add_cache_headers(response, request.endpoint)
+
+def overloaded(message):
+    """A fast 503 telling the client when to retry."""
+    response = json_response({'error': message}, 503)
+    response.headers['Retry-After'] = str(SHED_RETRY_AFTER)
     return response
 
-def generate_pitch_message(profile_data, podcast):
-    """Generate a personalized pitch message for the podcast host."""
-    skills_str = ', '.join(profile_data['skills'][:3])  # Top 3 skills
-    interests_str = ', '.join(profile_data['interests'][:2])  # Top 2 interests
-    
-    message = f"""Hi {podcast['host_name']},
+@app.before_request
+def warm_up_in_background():
+    """Warm a worker that was not warmed at startup (e.g. outside gunicorn)."""
+    global warming_pid
+    if startup['ready'] or warming_pid == os.getpid():
+        return None
+    warming_pid = os.getpid()
+    threading.Thread(target=warm_up, args=('lazy',), daemon=True).start()
+    return None
 
-I hope this message finds you well! I'm a regular listener of {podcast['title']} and really appreciate your insights on {', '.join(podcast['categories'][:2])}.
+@app.before_request
+def start_request_log():
+    """Tag this request's log lines with the caller's request ID, or a new one."""
+    # Request IDs also name profiles, so only file-name-safe ones are kept
+    requested = request.headers.get('X-Request-ID')
+    g.request_id, g.log_token = start_request(profiler.profile_id(requested))
 
-I'm reaching out because I believe I could bring valuable insights to your audience. With expertise in {skills_str} and a passion for {interests_str}, I could share unique perspectives on {profile_data['summary'][:100]}...
+@app.before_request
+def start_profiling():
+    """Sample this request's stacks when an admin asks for it."""
+    profiler.ensure_background()
+    if not profiler.enabled:
+        return None
+    flagged = request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+    if flagged and profiler.is_admin(request.headers.get('X-Admin-Token')):
+        g.profile_id = g.request_id
+        g.profile_sampler = profiler.start_request()
+    return None
 
-I'd love to explore the possibility of being a guest on your show. Would you be open to a conversation about potential collaboration?
+@app.after_request
+def finish_profiling(response):
+    sampler = g.pop('profile_sampler', None)
+    if sampler is not None:
+        profiler.finish_request(sampler, g.profile_id)
+        response.headers['X-Profile-Id'] = g.profile_id
+    return response
 
-Best regards,
-{profile_data['name']}"""
-    
-    return message
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    endpoint = request.endpoint or 'unknown'
+    if started is not None:
+        metrics.observe('podcast_http_request_duration_seconds', {'endpoint': endpoint}, time.perf_counter() - started)
+    metrics.inc('podcast_http_responses_total', {'endpoint': endpoint, 'status': str(response.status_code)})
+    return response
+
+def write_request_log(status):
+    """One line per request with its outcome and the time spent in each stage."""
+    duration_ms = round((time.perf_counter() - g.request_started) * 1000, 3)
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': status,
+        'duration_ms': duration_ms,
+        'stages': request_stages()
+    }
+    log.info('request', **fields)
+    if duration_ms >= LOG_SLOW_MS:
+        log.warning('slow_request', **fields)
+
+@app.after_request
+def log_request(response):
+    if g.get('request_started') is None:
+        return response
+    if response.is_streamed:
+        # The body (and its scoring stages) is generated after this returns;
+        # release_request logs it once the stream has finished
+        g.streamed_status = response.status_code
+    else:
+        write_request_log(response.status_code)
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.errorhandler(429)
+def rate_limited(e):
+    """Answer an exhausted client quota with JSON and the time until it resets."""
+    response = json_response({'error': f"Rate limit exceeded: {e.description}"}, 429)
+    limit = limiter.current_limit
+    if limit is not None:
+        response.headers['Retry-After'] = str(max(1, int(limit.reset_at - time.time())))
+    return response
+
+@app.before_request
+def admit_request():
+    """Shed requests the worker has no capacity for and start the deadline of the rest."""
+    if request.endpoint not in ADMITTED_ENDPOINTS:
+        return None
+    arrived = time.monotonic()
+    if not admission.try_acquire():
+        return overloaded('Server is busy, please retry shortly')
+    g.admitted = True
+    # Time spent queueing for a slot counts against the deadline
+    g.deadline_token = set_deadline(REQUEST_DEADLINE, arrived)
+    return None
+
+@app.teardown_request
+def release_request(exc):
+    if g.pop('admitted', False):
+        admission.release()
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        clear_deadline(token)
+    # Requests that raised never reach after_request
+    sampler = g.pop('profile_sampler', None)
+    if sampler is not None:
+        profiler.finish_request(sampler, g.profile_id)
+    # With stream_with_context, teardown runs when the generator is done
+    status = g.pop('streamed_status', None)
+    if status is not None:
+        write_request_log(status)
+    token = g.pop('log_token', None)
+    if token is not None:
+        end_request(token)
+
+def get_profile_analysis(linkedin_url, wants_to_be_featured):
+    """Extract and analyze a LinkedIn profile, sharing the result through the cache."""
+    def analyze():
+        profile_data = extract_profile_data(linkedin_url)
+        return {
+            'profile': profile_data,
+            'analysis': analyze_profile_for_podcasts(profile_data, wants_to_be_featured)
+        }
+
+    username = canonical_username(linkedin_url)
+    if username is None:
+        result = analyze()  # Raises for an invalid URL
+    else:
+        result = get_cache().get_or_compute('profile', f"{username}:{int(bool(wants_to_be_featured))}", analyze)
+    return result['profile'], result['analysis']
+
+def ranking_catalog_version():
+    """The catalog version recommendations are ranked from: the shard nodes' when sharded."""
+    return shard_coordinator.catalog_version() if shard_coordinator is not None else get_catalog_version()
+
+def recommendation_index():
+    """The projection index recommendations go through; sharded results are projected as they come."""
+    return SHARDED_PROJECTION if shard_coordinator is not None else get_projection_index()
+
+def score_podcasts(analysis, wants_to_be_featured, k=RECOMMEND_K):
+    """
+    Score the catalog against a profile analysis and return the top k as
+    (score, podcast, reasons), either on the shard nodes, off the request
+    path in a scoring pool, or in-process.
+    """
+    if shard_coordinator is not None:
+        # The nodes add similarity points themselves; only the priors are folded here
+        priors, _ = event_store.priors()
+        with stage('scoring'):
+            top_podcasts, shard_summary = shard_coordinator.top_k(analysis, wants_to_be_featured, k, priors=priors)
+        if shard_summary['partial']:
+            log.warning('partial_recommendations', 'Shards failed, recommendations are partial',
+                        failed=shard_summary['failed'])
+        return top_podcasts
+
+    all_podcasts = get_all_podcasts()
+    priors = event_store.priors_for(all_podcasts, get_podcast_id)
+    similar = None
+    if similarity_blender.enabled:
+        with stage('similarity'):
+            index = get_similarity_index()
+            if index.podcasts is all_podcasts:
+                similar = similarity_blender.bonuses(index, analysis)
+    with stage('scoring'):
+        if scoring_executor is not None:
+            scoring_executor.load_catalog(all_podcasts, get_catalog_version())
+            future = scoring_executor.submit(analysis, wants_to_be_featured, k, deadline=current_deadline(),
+                                             priors=priors, similar=similar)
+            try:
+                ranked = future.result(timeout=bounded_timeout(SCORING_TIMEOUT, 'scoring'))
+            except FutureTimeoutError:
+                future.cancel()
+                raise DeadlineExceeded("Deadline exceeded during scoring")
+        else:
+            # Pool workers score from shared memory; only in-process scoring needs this
+            prepared = get_prepared_catalog(all_podcasts)
+            ranked = rank_prepared(prepared, analysis, wants_to_be_featured, k, deadline=current_deadline(),
+                                   priors=priors, similar=similar)
+    return [(score, all_podcasts[index], reasons) for score, index, reasons in ranked]
 
 def get_podcast_recommendations(linkedin_url, wants_to_be_featured):
     """Get podcast recommendations based on LinkedIn profile."""
     try:
         # Extract and analyze LinkedIn profile data
-        profile_data = extract_profile_data(linkedin_url)
-        analysis = analyze_profile_for_podcasts(profile_data, wants_to_be_featured)
-        
-        # Get all available podcasts
-        all_podcasts = get_all_podcasts()
+        _, analysis = get_profile_analysis(linkedin_url, wants_to_be_featured)
         
         # Score podcasts based on profile analysis
-        scored_podcasts = []
-        for podcast in all_podcasts:
-            score = 0
-            reasons = []
-            
-            # Score based on keywords from profile
-            matching_keywords = []
-            for keyword in analysis['keywords']:
-                keyword_lower = keyword.lower()
-                if keyword_lower in podcast['title'].lower():
-                    score += 3
-                    matching_keywords.append(keyword)
-                elif keyword_lower in podcast['description'].lower():
-                    score += 2
-                    matching_keywords.append(keyword)
-            if matching_keywords:
-                reasons.append(f"Matches your expertise in: {', '.join(matching_keywords)}")
-            
-            # Score based on categories
-            matching_categories = []
-            for category in analysis['categories']:
-                category_lower = category.lower()
-                if category_lower in podcast['title'].lower():
-                    score += 3
-                    matching_categories.append(category)
-                elif category_lower in podcast['description'].lower():
-                    score += 2
-                    matching_categories.append(category)
-                elif any(category_lower in pc.lower() for pc in podcast['categories']):
-                    score += 2
-                    matching_categories.append(category)
-            if matching_categories:
-                reasons.append(f"Aligns with your interests in: {', '.join(set(matching_categories))}")
-            
-            # Add bonus points for featured opportunities if user wants to be featured
-            if wants_to_be_featured:
-                matching_opportunities = []
-                for opportunity in analysis['featured_opportunities']:
-                    if opportunity.lower() in podcast['title'].lower() or \
-                       opportunity.lower() in podcast['description'].lower():
-                        score += 4
-                        matching_opportunities.append(opportunity)
-                if matching_opportunities:
-                    reasons.append("Perfect for guest appearances based on your profile")
-            
-            # Add bonus points for top-rated and featured podcasts
-            if 'Top Rated' in podcast['categories']:
-                score += 3
-                reasons.append("Highly rated by listeners")
-            if 'Featured' in podcast['categories']:
-                score += 2
-                reasons.append("Featured podcast")
-            
-            if score > 0:  # Only include podcasts with some relevance
-                scored_podcasts.append((score, podcast, reasons))
+        top_podcasts = score_podcasts(analysis, wants_to_be_featured)
         
-        # Sort by score and get top 10
-        scored_podcasts.sort(key=lambda x: x[0], reverse=True)
+        # Build the top 10 from precomputed per-podcast projections
+        index = recommendation_index()
         recommendations = [
-            {
-                'title': p['title'],
-                'description': p['description'],
-                'image': p['image'],
-                'website': p['website'],
-                'categories': p['categories'],
-                'reasons': reasons,
-                'host_name': p.get('host_name', 'Host'),  # Default to 'Host' if not specified
-                'host_email': p.get('host_email', ''),
-                'pitch_message': generate_pitch_message(profile_data, p) if wants_to_be_featured else ''
-            }
-            for _, p, reasons in scored_podcasts[:10]
+            index.project(get_podcast_id(p), DEFAULT_FIELDS, reasons, p)
+            for _, p, reasons in top_podcasts
         ]
         
         return recommendations
     
+    except (DeadlineExceeded, ProfileFetchError, ValueError):
+        # The route turns these into 503, 404 or 400 rather than an empty 200
+        raise
     except Exception as e:
-        print(f"Error getting recommendations: {str(e)}")
+        log.exception('recommend_error', f"Error getting recommendations: {str(e)}")
         return []
 
+def profile_summary(profile_data, analysis, wants_to_be_featured):
+    """The profile section of a recommend response."""
+    return {
+        'summary': profile_data['summary'],
+        'skills': profile_data['skills'][:5],  # Top 5 skills
+        'interests': profile_data['interests'],
+        'featuredOpportunities': analysis['featured_opportunities'] if wants_to_be_featured else []
+    }
+
+def stream_recommendations(linkedin_url, wants_to_be_featured, k, fields, include, etag):
+    """
+    Yield a recommend response as (kind, payload) events: the profile first,
+    then each recommendation, then the pitch for each podcast with a host
+    email when the user wants to be featured. Recommendations are projected
+    one at a time as they are sent, so only the top k references are held.
+    """
+    username = canonical_username(linkedin_url)
+    try:
+        profile_data, analysis = get_profile_analysis(linkedin_url, wants_to_be_featured)
+        profile = {'profileRef': username}
+        for section in include:
+            profile[section] = profile_summary(profile_data, analysis, wants_to_be_featured)
+        yield 'profile', profile
+
+        top_podcasts = score_podcasts(analysis, wants_to_be_featured, k)
+        index = recommendation_index()
+        for rank, (_, podcast, reasons) in enumerate(top_podcasts, 1):
+            yield 'recommendation', {
+                'rank': rank,
+                'podcast': index.project(get_podcast_id(podcast), fields, reasons, podcast)
+            }
+
+        if wants_to_be_featured and username is not None:
+            catalog_version = ranking_catalog_version()
+            for _, podcast, _ in top_podcasts:
+                # No one to send a pitch to (scraped podcasts have no email); /api/pitch still renders one
+                if podcast.get('host_email'):
+                    yield 'pitch', get_pitch(username, get_podcast_id(podcast), catalog_version, podcast, profile_data)
+
+        done = {'count': len(top_podcasts)}
+        # The same ETag the buffered response carries, so clients can revalidate it
+        if etag is not None and top_podcasts:
+            done['etag'] = etag
+        yield 'done', done
+    except DeadlineExceeded as e:
+        yield 'error', {'error': str(e), 'status': 503}
+    except ProfileNotFoundError as e:
+        yield 'error', {'error': str(e), 'status': 404}
+    except ProfileFetchError as e:
+        yield 'error', {'error': str(e), 'status': 503}
+    except Exception as e:
+        log.exception('recommend_error', f"Error streaming recommendations: {str(e)}")
+        yield 'error', {'error': str(e), 'status': 500}
+
+def build_recommend_response(linkedin_url, wants_to_be_featured):
+    """Build the /api/recommend payload for a LinkedIn profile."""
+    username = canonical_username(linkedin_url)
+    # Listener feedback reorders results, so the priors are part of the key
+    _, priors_digest = event_store.priors()
+    cache_key = f"{username}:{int(bool(wants_to_be_featured))}:{ranking_catalog_version()}:{priors_digest}"
+    if username is not None:
+        cached = get_cache().get('recommendations', cache_key)
+        if cached is not None:
+            return cached
+
+    # Get recommendations and profile analysis
+    recommendations = get_podcast_recommendations(linkedin_url, wants_to_be_featured)
+    
+    # Get profile data for display
+    profile_data, analysis = get_profile_analysis(linkedin_url, wants_to_be_featured)
+    
+    payload = {
+        'recommendations': recommendations,
+        'profileRef': username,  # Pass to /api/pitch to generate a pitch on demand
+        'profile': profile_summary(profile_data, analysis, wants_to_be_featured)
+    }
+
+    # Errors come back as an empty list, which should not be cached
+    if username is not None and recommendations:
+        get_cache().set('recommendations', cache_key, payload)
+    return payload
+
 @app.route('/api/recommend', methods=['POST'])
+@limiter.limit(lambda: RECOMMEND_RATE_LIMIT or '')  # An empty limit string applies no limit
 def recommend():
     """Endpoint to get podcast recommendations based on LinkedIn profile."""
     try:
         data = request.json
         if not data or 'linkedinUrl' not in data:
-            return jsonify({'error': 'LinkedIn URL is required'}), 400
+            return json_response({'error': 'LinkedIn URL is required'}, 400)
 
         linkedin_url = data['linkedinUrl']
         wants_to_be_featured = data.get('wantsToBeFeatured', False)
+        fields, include = parse_projection(request.args)
 
-        # Get recommendations and profile analysis
-        recommendations = get_podcast_recommendations(linkedin_url, wants_to_be_featured)
-        
-        # Get profile data for display
-        profile_data = extract_profile_data(linkedin_url)
-        analysis = analyze_profile_for_podcasts(profile_data, wants_to_be_featured)
-        
-        return jsonify({
-            'recommendations': recommendations,
-            'profile': {
-                'summary': profile_data['summary'],
-                'skills': profile_data['skills'][:5],  # Top 5 skills
-                'interests': profile_data['interests'],
-                'featuredOpportunities': analysis['featured_opportunities'] if wants_to_be_featured else []
-            }
+        # Validated once here; helpers further down re-derive the username untimed
+        with stage('validate_url'):
+            username = canonical_username(linkedin_url)
+
+        # Repeat requests for an unchanged catalog skip all the work
+        key = (username or linkedin_url, bool(wants_to_be_featured))
+        _, priors_digest = event_store.priors()
+        etag = compute_etag(ranking_catalog_version(), 'recommend', *key, ','.join(fields), ','.join(sorted(include)),
+                            priors_digest)
+
+        fmt = stream_format()
+        if fmt is not None:
+            k = request.args.get('k', RECOMMEND_K, type=int)
+            if not 1 <= k <= MAX_STREAM_K:
+                return json_response({'error': f"k must be between 1 and {MAX_STREAM_K}"}, 400)
+            if username is None:
+                return json_response({'error': 'Invalid LinkedIn URL format'}, 400)
+            return stream_response(stream_recommendations(
+                linkedin_url, wants_to_be_featured, k, fields, include, etag if k == RECOMMEND_K else None
+            ), fmt)
+
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        # Concurrent requests for the same profile share one computation
+        payload = recommend_flight.do(key, build_recommend_response, linkedin_url, wants_to_be_featured)
+        response = json_response(apply_projection(payload, fields, include, recommendation_index()))
+        # Errors come back as an empty list, which must not be revalidated
+        if payload['recommendations']:
+            response.set_etag(etag, weak=True)
+        return response
+
+    except ProjectionError as e:
+        return json_response({'error': str(e)}, 400)
+    except DeadlineExceeded as e:
+        return overloaded(str(e))
+    except ProfileNotFoundError as e:
+        return json_response({'error': str(e)}, 404)
+    except ProfileFetchError as e:
+        return json_response({'error': str(e)}, 503)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+def get_pitch(profile_ref, podcast_id, catalog_version, podcast=None, profile_data=None):
+    """Return the pitch for one podcast through the cache, or None for an unknown podcast."""
+    cache_key = f"{profile_ref}:{podcast_id}:{catalog_version}"
+    result = get_cache().get('pitch', cache_key)
+    if result is None:
+        podcast = podcast or get_podcast_by_id(podcast_id)
+        if podcast is None:
+            return None
+        if profile_data is None:
+            profile_data, _ = get_profile_analysis(profile_url(profile_ref), True)
+        result = {
+            'podcastId': podcast_id,
+            'hostEmail': podcast.get('host_email', ''),
+            'pitchMessage': generate_pitch_message(profile_data, podcast)
+        }
+        get_cache().set('pitch', cache_key, result)
+    return result
+
+@app.route('/api/pitch', methods=['GET'])
+def pitch():
+    """Endpoint to generate the guest pitch for a single recommended podcast."""
+    try:
+        podcast_id = request.args.get('podcastId', '')
+        with stage('validate_url'):
+            profile_ref = canonical_username(profile_url(request.args.get('profileRef', '')))
+        if not podcast_id or profile_ref is None:
+            return json_response({'error': 'podcastId and profileRef are required'}, 400)
+
+        catalog_version = get_catalog_version()
+        etag = compute_etag(catalog_version, 'pitch', profile_ref, podcast_id)
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        result = get_pitch(profile_ref, podcast_id, catalog_version)
+        if result is None:
+            return json_response({'error': 'Podcast not found'}, 404)
+
+        response = json_response(result)
+        response.set_etag(etag, weak=True)
+        return response
+
+    except DeadlineExceeded as e:
+        return overloaded(str(e))
+    except ProfileNotFoundError as e:
+        return json_response({'error': str(e)}, 404)
+    except ProfileFetchError as e:
+        return json_response({'error': str(e)}, 503)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+@app.route('/api/events', methods=['POST'])
+@limiter.limit(lambda: EVENTS_RATE_LIMIT or '')
+def record_events():
+    """
+    Endpoint for listener feedback: impressions, clicks and copied pitches.
+    Accepts {"events": [{"type": ..., "podcastId": ...}]} with any content
+    type, so browsers can send it with navigator.sendBeacon. An event the
+    client already reported for a podcast recently is counted once.
+    """
+    data = request.get_json(force=True, silent=True)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list) or not events:
+        return json_response({'error': 'events must be a non-empty list'}, 400)
+    if len(events) > MAX_EVENTS_PER_REQUEST:
+        return json_response({'error': f"At most {MAX_EVENTS_PER_REQUEST} events per request"}, 400)
+
+    valid = [
+        (event['type'], event['podcastId']) for event in events
+        if isinstance(event, dict) and event.get('type') in EVENT_WEIGHTS
+        and isinstance(event.get('podcastId'), str) and PODCAST_ID_PATTERN.match(event['podcastId'])
+    ]
+    accepted = event_store.record(valid, client=client_address())
+    return json_response({
+        'accepted': accepted,
+        'duplicates': len(valid) - accepted,
+        'rejected': len(events) - len(valid)
+    }, 202)
+
+@app.route('/api/image/<podcast_id>', methods=['GET'])
+def podcast_image(podcast_id):
+    """Endpoint serving a podcast's artwork as a thumbnail from the disk cache."""
+    try:
+        podcast = get_podcast_by_id(podcast_id)
+        if podcast is None:
+            return json_response({'error': 'Podcast not found'}, 404)
+        if not podcast.get('image'):
+            return json_response({'error': 'Podcast has no artwork'}, 404)
+
+        with stage('image'):
+            thumbnail = image_proxy.get(podcast['image'])
+        # The file is named by its content hash, which makes a strong ETag
+        response = send_file(thumbnail.file, mimetype=thumbnail.content_type, etag=thumbnail.digest,
+                             max_age=image_proxy.max_age, conditional=True)
+        if response.status_code == 200:
+            response.content_length = thumbnail.size
+        return response
+
+    except ImageFetchError as e:
+        return json_response({'error': str(e)}, 502)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+@app.route('/api/podcasts', methods=['GET'])
+def list_podcasts():
+    """Endpoint to search the podcast catalog, 10 results per page."""
+    try:
+        query = request.args.get('q', '')
+        offset = max(0, request.args.get('offset', 0, type=int))
+
+        etag = compute_etag(get_catalog_version(), 'podcasts', query.lower(), offset)
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        podcasts = search_podcasts(query, offset)
+        response = json_response({
+            'podcasts': [dict(podcast, id=get_podcast_id(podcast)) for podcast in podcasts],
+            'offset': offset
         })
+        response.set_etag(etag, weak=True)
+        return response
+
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+def get_prepared_catalog(podcasts):
+    """Return the catalog prepared for scoring, built once per loaded catalog."""
+    global prepared_catalog
+    with prepared_catalog_lock:
+        if prepared_catalog[0] is not podcasts:
+            prepared_catalog = (podcasts, [prepare_podcast(podcast) for podcast in podcasts])
+        return prepared_catalog[1]
+
+def get_catalog_snapshot(version):
+    """Return the serialized and compressed catalog for a catalog version."""
+    global catalog_snapshot
+    with catalog_snapshot_lock:
+        if catalog_snapshot[0] != version:
+            podcasts = [dict(podcast, id=get_podcast_id(podcast)) for podcast in get_all_podcasts()]
+            catalog_snapshot = (version, PrecompressedSnapshot({'version': version, 'podcasts': podcasts}))
+        return catalog_snapshot[1]
+
+def warm_up(mode):
+    """
+    Load the catalog and build everything derived from it before traffic
+    arrives. Run in the gunicorn master (see gunicorn.conf.py), workers fork
+    with it all in place.
+    """
+    timings = {}
+
+    def step(name, fn):
+        started = time.perf_counter()
+        result = fn()
+        timings[name] = round(time.perf_counter() - started, 4)
+        return result
+
+    if shard_coordinator is not None:
+        # The shard nodes hold the catalog; the endpoints that read it here load it on first use
+        startup.update(ready=True, mode=mode, warm_up_seconds=timings, podcasts=None,
+                       catalog_version=None, error=None)
+        return startup
+
+    try:
+        podcasts = step('catalog', get_all_podcasts)
+        version = get_catalog_version()
+        if scoring_executor is None:
+            step('scoring_index', lambda: get_prepared_catalog(podcasts))
+        step('projection_index', lambda: get_projection_index().view(DEFAULT_FIELDS))
+        if similarity_blender.enabled:
+            step('similarity_index', get_similarity_index)
+        step('catalog_snapshot', lambda: get_catalog_snapshot(version))
+    except Exception as e:
+        log.exception('warm_up_error', f"Error warming up: {str(e)}", mode=mode)
+        startup.update(mode=mode, warm_up_seconds=timings, error=str(e))
+        return startup
+    startup.update(ready=True, mode=mode, warm_up_seconds=timings, podcasts=len(podcasts),
+                   catalog_version=version, error=None)
+    return startup
+
+@app.route('/api/catalog', methods=['GET'])
+def get_catalog():
+    """Endpoint to download the full podcast catalog."""
+    try:
+        version = get_catalog_version()
+        etag = compute_etag(version, 'catalog')
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        response = get_catalog_snapshot(version).response()
+        response.set_etag(etag, weak=True)
+        return response
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, 500)
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 503 until the catalog and indexes are loaded."""
+    return json_response(startup, 200 if startup['ready'] else 503)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({'status': 'healthy'})
+    fetcher = get_profile_fetcher()
+    return json_response({
+        'status': 'healthy',
+        'admission': admission.stats(),
+        'caches': get_cache().stats(),
+        'coalescing': recommend_flight.stats(),
+        'profileProvider': fetcher.stats() if fetcher is not None else None,
+        'encoding': encoding_stats.snapshot(),
+        'profiling': profiler.stats(),
+        'similarity': index.stats() if (index := peek_similarity_index()) is not None else None,
+        'logging': log_stats(),
+        'images': image_proxy.stats(),
+        'events': event_store.stats()
+    })
+
+def collect_metrics():
+    """Counters and gauges read from the app's components at scrape time."""
+    for namespace, counts in get_cache().stats().items():
+        for result, key in (('hit', 'hits'), ('miss', 'misses'), ('error', 'errors')):
+            yield 'counter', 'podcast_cache_requests_total', {'namespace': namespace, 'result': result}, counts[key]
+
+    admission_stats = admission.stats()
+    for outcome in ('admitted', 'queued', 'shed_queue_full', 'shed_queue_timeout'):
+        yield 'counter', 'podcast_admission_total', {'outcome': outcome}, admission_stats[outcome]
+    yield 'gauge', 'podcast_admission_in_flight', {}, admission_stats['in_flight']
+    yield 'gauge', 'podcast_admission_queue_depth', {}, admission_stats['queue_depth']
+
+    coalescing = recommend_flight.stats()
+    for result in ('executed', 'coalesced'):
+        yield 'counter', 'podcast_coalescing_total', {'result': result}, coalescing[result]
+
+    for endpoint, sizes in encoding_stats.snapshot().items():
+        yield 'counter', 'podcast_encoding_bytes_total', {'endpoint': endpoint, 'form': 'raw'}, sizes['raw_bytes']
+        yield 'counter', 'podcast_encoding_bytes_total', {'endpoint': endpoint, 'form': 'wire'}, sizes['wire_bytes']
+
+    fetcher = get_profile_fetcher()
+    if fetcher is not None:
+        for outcome, count in fetcher.stats().items():
+            if outcome != 'breaker':
+                yield 'counter', 'podcast_profile_provider_total', {'outcome': outcome}, count
+
+    # Only report a catalog that is already loaded; a scrape must not trigger one
+    index = peek_projection_index()
+    if index is not None:
+        yield 'gauge', 'podcast_catalog_podcasts', {}, len(index.ids)
+        yield 'gauge', 'podcast_catalog_info', {'version': get_catalog_version()}, 1
+
+    yield 'counter', 'podcast_log_dropped_total', {}, log_stats()['dropped']
+
+    image_stats = image_proxy.stats()
+    for result, key in (('hit', 'hits'), ('miss', 'misses'), ('error', 'fetch_errors')):
+        yield 'counter', 'podcast_image_requests_total', {'result': result}, image_stats[key]
+    yield 'gauge', 'podcast_image_cache_bytes', {}, image_stats['cache']['bytes']
+
+    event_stats = event_store.stats()
+    for outcome in ('recorded', 'duplicates', 'overwritten', 'written', 'write_errors'):
+        yield 'counter', 'podcast_events_total', {'outcome': outcome}, event_stats[outcome]
+    yield 'gauge', 'podcast_events_buffered', {}, event_stats['buffered']
+
+metrics.add_collector(collect_metrics)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics, aggregated across the workers sharing METRICS_DIR."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def require_admin():
+    """Return an error response unless the request carries the profiling admin token."""
+    if not profiler.enabled:
+        return json_response({'error': 'Not found'}, 404)
+    if not profiler.is_admin(request.headers.get('X-Admin-Token')):
+        return json_response({'error': 'Forbidden'}, 403)
+    return None
+
+@app.route('/api/debug/profiles', methods=['GET'])
+def list_profiles():
+    """List stored request and background profiles, newest first."""
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    return json_response({'profiles': profiler.list_profiles()})
+
+@app.route('/api/debug/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Download one profile as collapsed stacks."""
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    folded = profiler.load(profile_id)
+    if folded is None:
+        return json_response({'error': 'Profile not found'}, 404)
+    return Response(folded, mimetype='text/plain')
 
 @app.route('/')
 def serve_frontend():
     """Serve the frontend HTML file."""
     return send_from_directory('../frontend', 'index.html')
 
+startup['import_seconds'] = round(time.perf_counter() - IMPORT_STARTED, 4)
+
 if __name__ == '__main__':
+    metrics.clear_snapshots()
+    warm_up('dev')
     port = int(os.environ.get('PORT', 5002))
     app.run(
         host='0.0.0.0',
@@ -0,0 +1,9 @@
+"""
+Repeatable benchmarks for the recommendation pipeline.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 1000,10000 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+    python -m benchmarks.load --spawn --rate 50 --duration 30
+"""
@@ -0,0 +1,57 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+
+Exits with status 1 when any benchmark's p50 latency grew, or its
+throughput fell, by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+def result_key(result: Dict) -> Tuple[str, str]:
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> Tuple[List[str], int]:
+    """Return report lines and the number of regressions."""
+    before = {result_key(r): r for r in baseline['results']}
+    lines = [f"baseline {baseline['meta']['commit']} -> current {current['meta']['commit']}"]
+    regressions = 0
+    for result in current['results']:
+        key = result_key(result)
+        old = before.get(key)
+        label = f"{key[0]} {key[1]}"
+        if old is None:
+            lines.append(f"  new         {label}")
+            continue
+        p50_change = result['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0
+        throughput_change = result['items_per_s'] / old['items_per_s'] - 1 if old['items_per_s'] else 0.0
+        regressed = p50_change > threshold or throughput_change < -threshold
+        regressions += regressed
+        lines.append(
+            f"  {'REGRESSED' if regressed else 'ok':<11} {label}  "
+            f"p50 {old['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms ({p50_change:+.1%})  "
+            f"throughput {throughput_change:+.1%}  "
+            f"peak {old['peak_alloc_bytes'] / 1e6:.2f} -> {result['peak_alloc_bytes'] / 1e6:.2f} MB"
+        )
+    return lines, regressions
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    lines, regressions = compare(baseline, current, args.threshold)
+    print('\n'.join(lines))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
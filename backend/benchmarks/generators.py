@@ -0,0 +1,122 @@
+"""
+Seeded generators for synthetic catalogs and profiles.
+
+Distributions loosely follow the scraped iTunes business catalog: a few
+categories dominate, descriptions are mostly short with a long tail, and a
+small share of shows are 'Top Rated' or 'Featured'. Words are drawn from a
+Zipf-like vocabulary that overlaps the terms profile analysis looks for, so
+scoring does a realistic amount of matching work.
+"""
+import itertools
+import random
+from typing import Dict, List
+
+# Category: relative weight
+CATEGORY_WEIGHTS = {
+    'Business': 30, 'Technology': 20, 'Entrepreneurship': 12, 'Startups': 8,
+    'Marketing': 8, 'Investing': 6, 'Management': 5, 'Careers': 4,
+    'Innovation': 4, 'Venture Capital': 3, 'Leadership': 3, 'Education': 2
+}
+TOP_RATED_SHARE = 0.05
+FEATURED_SHARE = 0.03
+
+# Terms that profile analysis and scoring match on, most common first
+TOPIC_TERMS = [
+    'business', 'leadership', 'startup', 'technology', 'strategy', 'innovation',
+    'marketing', 'AI', 'entrepreneurship', 'founder', 'growth', 'product management',
+    'machine learning', 'investing', 'sales', 'SaaS', 'cloud', 'digital transformation',
+    'team leadership', 'venture capital', 'blockchain', 'fintech', 'careers', 'CEO interviews',
+    'founder stories', 'tech talks', 'strategic planning', 'business development'
+]
+FILLER_WORDS = (
+    'the a of and to in with for on about from every week we our your how why what '
+    'stories interviews people world best new inside real show episode guests host '
+    'conversations lessons ideas experts journey build learn success time life work'
+).split()
+TITLE_NOUNS = ['Show', 'Podcast', 'Hour', 'Daily', 'Weekly', 'Talks', 'Diaries', 'Playbook', 'Lab', 'Report']
+TITLE_ADJECTIVES = ['Modern', 'Honest', 'Bold', 'Smart', 'Curious', 'Lean', 'Big', 'Next', 'Open', 'Deep']
+HOST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Riley', 'Casey', 'Jamie', 'Avery', 'Quinn']
+
+PROFILE_RICHNESS = {
+    # skills, experience entries, interests
+    'sparse': (2, 0, 1),
+    'typical': (6, 2, 5),
+    'rich': (25, 8, 12)
+}
+JOB_TITLES = ['Founder & CEO', 'Product Manager', 'Director of Engineering', 'Sales Lead',
+              'Marketing Manager', 'Data Scientist', 'Consultant', 'VP Operations']
+
+def _zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+_TOPIC_CUM_WEIGHTS = _zipf_weights(len(TOPIC_TERMS))
+_CATEGORIES = list(CATEGORY_WEIGHTS)
+_CATEGORY_CUM_WEIGHTS = list(itertools.accumulate(CATEGORY_WEIGHTS.values()))
+
+def _description(rng: random.Random) -> str:
+    # Log-normal length: median ~45 words, occasionally a few hundred
+    length = max(5, min(400, int(rng.lognormvariate(3.8, 0.6))))
+    topics = max(1, length // 12)
+    words = rng.choices(FILLER_WORDS, k=length - topics)
+    words += rng.choices(TOPIC_TERMS, cum_weights=_TOPIC_CUM_WEIGHTS, k=topics)
+    rng.shuffle(words)
+    return ' '.join(words).capitalize() + '.'
+
+def _title(rng: random.Random, index: int) -> str:
+    roll = rng.random()
+    if roll < 0.3:
+        topic = rng.choices(TOPIC_TERMS, cum_weights=_TOPIC_CUM_WEIGHTS)[0]
+        return f"The {topic.title()} {rng.choice(TITLE_NOUNS)} #{index}"
+    if roll < 0.6:
+        return f"{rng.choice(HOST_NAMES)}'s {rng.choice(TITLE_ADJECTIVES)} {rng.choice(TITLE_NOUNS)} #{index}"
+    return f"{rng.choice(TITLE_ADJECTIVES)} {rng.choice(TITLE_NOUNS)} #{index}"
+
+def generate_podcast(rng: random.Random, index: int) -> Dict:
+    """Return one synthetic podcast in the scraped catalog's format."""
+    categories = list(dict.fromkeys(rng.choices(_CATEGORIES, cum_weights=_CATEGORY_CUM_WEIGHTS, k=rng.randint(1, 3))))
+    if rng.random() < TOP_RATED_SHARE:
+        categories.append('Top Rated')
+    if rng.random() < FEATURED_SHARE:
+        categories.append('Featured')
+    podcast = {
+        'title': _title(rng, index),
+        'description': _description(rng),
+        'image': f"https://images.example.com/{index}/600x600bb.jpg",
+        'website': f"https://podcasts.example.com/show/{index}",
+        'categories': categories,
+        'source': 'Synthetic'
+    }
+    if rng.random() < 0.4:
+        podcast['host_name'] = rng.choice(HOST_NAMES)
+        podcast['host_email'] = f"{podcast['host_name'].lower()}{index}@example.com"
+    return podcast
+
+def generate_catalog(size: int, seed: int = 0) -> List[Dict]:
+    """Return `size` synthetic podcasts; the same seed always gives the same catalog."""
+    rng = random.Random(seed)
+    return [generate_podcast(rng, index) for index in range(size)]
+
+def generate_profile(richness: str = 'typical', seed: int = 0) -> Dict:
+    """Return a synthetic profile in extract_profile_data's format."""
+    skills_count, experience_count, interests_count = PROFILE_RICHNESS[richness]
+    rng = random.Random(f"{richness}:{seed}")
+
+    def terms(count):
+        picked = rng.choices(TOPIC_TERMS, cum_weights=_TOPIC_CUM_WEIGHTS, k=count * 2)
+        return [term.title() for term in dict.fromkeys(picked)][:count]
+
+    return {
+        'name': f"{rng.choice(HOST_NAMES)} Example",
+        'skills': terms(skills_count),
+        'experience': [
+            {'title': rng.choice(JOB_TITLES), 'company': f"Company {i}", 'description': _description(rng)}
+            for i in range(experience_count)
+        ],
+        'summary': _description(rng),
+        'interests': terms(interests_count)
+    }
+
+def generate_profiles(count: int, seed: int = 0) -> List[Dict]:
+    """Return profiles cycling through every richness level."""
+    levels = list(PROFILE_RICHNESS)
+    return [generate_profile(levels[i % len(levels)], seed + i) for i in range(count)]
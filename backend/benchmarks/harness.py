@@ -0,0 +1,63 @@
+"""
+Timing and memory measurement shared by the benchmarks.
+"""
+import gc
+import math
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def measure(name: str, fn: Callable[[int], object], params: Optional[Dict] = None, items: int = 1,
+            min_time: float = 1.0, min_iterations: int = 5, max_iterations: int = 100000,
+            warmup: int = 2) -> Dict:
+    """
+    Call fn(i) repeatedly and report its latency distribution and throughput.
+    Every call, warm-up and traced ones included, gets a distinct i, so
+    benchmarks can key fresh inputs on it.
+    Runs for at least `min_time` seconds and `min_iterations` calls. `items`
+    is how many units of work (podcasts, requests) one call processes. Peak
+    memory is measured in a separate traced call so tracing does not skew
+    the timings.
+    """
+    for i in range(warmup):
+        fn(i)
+    gc.collect()
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_iterations and (len(latencies) < min_iterations or
+                                               time.perf_counter() - started < min_time):
+        call_started = time.perf_counter()
+        fn(warmup + len(latencies))
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(warmup + len(latencies))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'name': name,
+        'params': params or {},
+        'iterations': len(latencies),
+        'items_per_call': items,
+        'calls_per_s': len(latencies) / elapsed,
+        'items_per_s': len(latencies) * items / elapsed,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'peak_alloc_bytes': peak
+    }
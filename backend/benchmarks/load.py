@@ -0,0 +1,331 @@
+"""
+Load driver for the HTTP API.
+
+Replays a JSONL traffic file, or generates a synthetic mix, against a running
+server and reports latency percentiles, error rates and throughput per
+endpoint.
+
+    python -m benchmarks.load --url http://127.0.0.1:5002 --mix recommend=70,podcasts=20,health=10 \\
+        --rate 50 --duration 30
+    python -m benchmarks.load --spawn --replay traffic.jsonl --concurrency 32
+
+Each line of a traffic file is one request:
+
+    {"method": "POST", "path": "/api/recommend", "body": {"linkedinUrl": "..."}, "at": 0.25}
+
+(see traffic.example.jsonl). `params`, `headers` and `body` are optional,
+and `at` (seconds from the start) is only used with `--replay-timing`;
+otherwise lines are sent at `--rate` or as fast as the workers allow.
+
+With `--rate` the arrival process is open loop: requests are scheduled at
+Poisson arrivals regardless of how fast the server answers, and latency is
+measured from the scheduled time, so queueing in the driver counts against
+the server instead of hiding it. Without it the driver is closed loop, with
+`--concurrency` workers each sending their next request when the last one
+finishes. `--spawn` starts the app under gunicorn with the Procfile's gevent
+configuration on a free port and stops it afterwards.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from benchmarks.harness import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same worker model as Procfile / Dockerfile
+GUNICORN_ARGS = ['--worker-class=gevent', '--timeout=30']
+
+DEFAULT_MIX = 'recommend=60,podcasts=20,pitch=10,health=10'
+SEARCH_TERMS = ['business', 'leadership', 'startup', 'ai', 'marketing', 'ceo', 'invest', '']
+
+class SyntheticTraffic:
+    """
+    Draws requests from a weighted endpoint mix. Profiles repeat with a
+    Zipf-like skew over a fixed population, so caches see a realistic mix of
+    hits and misses.
+    """
+
+    def __init__(self, mix: Dict[str, float], profiles: int, seed: int, podcast_ids: List[str]):
+        self.kinds = list(mix)
+        self.cum_weights = list(itertools.accumulate(mix.values()))
+        self.profile_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, profiles + 1)))
+        self.podcast_ids = podcast_ids
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _username(self) -> str:
+        rank = self.rng.choices(range(len(self.profile_weights)), cum_weights=self.profile_weights)[0]
+        return f"load-user-{rank}"
+
+    def next(self) -> Dict:
+        with self.lock:
+            kind = self.rng.choices(self.kinds, cum_weights=self.cum_weights)[0]
+            if kind == 'recommend':
+                return {'method': 'POST', 'path': '/api/recommend', 'body': {
+                    'linkedinUrl': f"https://www.linkedin.com/in/{self._username()}",
+                    'wantsToBeFeatured': self.rng.random() < 0.5
+                }}
+            if kind == 'pitch' and self.podcast_ids:
+                return {'method': 'GET', 'path': '/api/pitch', 'params': {
+                    'podcastId': self.rng.choice(self.podcast_ids), 'profileRef': self._username()
+                }}
+            if kind == 'podcasts':
+                return {'method': 'GET', 'path': '/api/podcasts', 'params': {
+                    'q': self.rng.choice(SEARCH_TERMS), 'offset': self.rng.choice([0, 0, 0, 10])
+                }}
+            if kind == 'catalog':
+                return {'method': 'GET', 'path': '/api/catalog'}
+            return {'method': 'GET', 'path': '/api/health'}
+
+    def __iter__(self) -> Iterator[Dict]:
+        while True:
+            yield self.next()
+
+def read_traffic(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        kind, _, weight = part.partition('=')
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+class Recorder:
+    """Collects per-endpoint latencies, statuses and errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, endpoint: str, seconds: float, status: Optional[int], error: Optional[str] = None) -> None:
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            statuses = self.statuses.setdefault(endpoint, {})
+            key = str(status) if status is not None else 'error'
+            statuses[key] = statuses.get(key, 0) + 1
+            if error is not None or status is None or status >= 400:
+                errors = self.errors.setdefault(endpoint, {})
+                reason = error or str(status)
+                errors[reason] = errors.get(reason, 0) + 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        with self.lock:
+            everything = []
+            for endpoint, latencies in sorted(self.latencies.items()):
+                everything.extend(latencies)
+                endpoints[endpoint] = self._summary(latencies, elapsed, self.statuses[endpoint],
+                                                    self.errors.get(endpoint, {}))
+            overall_statuses, overall_errors = {}, {}
+            for endpoint in self.latencies:
+                for status, count in self.statuses[endpoint].items():
+                    overall_statuses[status] = overall_statuses.get(status, 0) + count
+                for reason, count in self.errors.get(endpoint, {}).items():
+                    overall_errors[reason] = overall_errors.get(reason, 0) + count
+        return {'duration_s': elapsed, 'overall': self._summary(everything, elapsed, overall_statuses, overall_errors),
+                'endpoints': endpoints}
+
+    @staticmethod
+    def _summary(latencies: List[float], elapsed: float, statuses: Dict, errors: Dict) -> Dict:
+        latencies = sorted(latencies)
+        failed = sum(errors.values())
+        return {
+            'requests': len(latencies),
+            'throughput_per_s': len(latencies) / elapsed if elapsed else 0.0,
+            'error_rate': failed / len(latencies) if latencies else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p90_ms': percentile(latencies, 90) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'statuses': statuses,
+            'errors': errors
+        }
+
+def send(session: requests.Session, base_url: str, spec: Dict, recorder: Recorder,
+         scheduled: float, timeout: float) -> None:
+    endpoint = spec['path'].split('?')[0]
+    try:
+        response = session.request(
+            spec.get('method', 'GET'), base_url + spec['path'], params=spec.get('params'),
+            json=spec.get('body'), headers=spec.get('headers'), timeout=timeout
+        )
+        response.content  # Time the full body
+        recorder.record(endpoint, time.perf_counter() - scheduled, response.status_code)
+    except requests.RequestException as e:
+        recorder.record(endpoint, time.perf_counter() - scheduled, None, type(e).__name__)
+
+def run_closed_loop(base_url: str, traffic: Iterator[Dict], concurrency: int, duration: float,
+                    limit: Optional[int], timeout: float, recorder: Recorder) -> float:
+    lock = threading.Lock()
+    remaining = [limit]
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        while time.perf_counter() < stop_at:
+            with lock:
+                if remaining[0] is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                spec = next(traffic, None)
+            if spec is None:
+                return
+            send(session, base_url, spec, recorder, time.perf_counter(), timeout)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+def run_open_loop(base_url: str, traffic: Iterator[Dict], concurrency: int, duration: float,
+                  limit: Optional[int], timeout: float, recorder: Recorder,
+                  rate: Optional[float], seed: int, replay_timing: bool) -> float:
+    rng = random.Random(seed)
+    local = threading.local()
+
+    def task(spec, scheduled):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        send(local.session, base_url, spec, recorder, scheduled, timeout)
+
+    started = time.perf_counter()
+    next_at = started
+    loop_offset = last_at = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for sent, spec in enumerate(traffic):
+            if limit is not None and sent >= limit:
+                break
+            if replay_timing and 'at' in spec:
+                at = float(spec['at'])
+                if at < last_at:
+                    loop_offset += last_at  # A looped file started over
+                last_at = at
+                next_at = started + loop_offset + at
+            if next_at - started > duration:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(task, spec, next_at)
+            if rate:
+                next_at += rng.expovariate(rate)
+    return time.perf_counter() - started
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def spawn_server(workers: int, env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """Start the app under gunicorn+gevent and wait until it reports ready."""
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', f"--workers={workers}",
+               f"--bind=127.0.0.1:{port}"] + GUNICORN_ARGS
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=dict(os.environ, **env))
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            # /api/health answers before warm-up finishes; /api/ready does not
+            if requests.get(base_url + '/api/ready', timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not become ready within 30 seconds")
+
+def discover_podcast_ids(base_url: str) -> List[str]:
+    try:
+        response = requests.get(base_url + '/api/podcasts', params={'q': ''}, timeout=30)
+        return [podcast['id'] for podcast in response.json().get('podcasts', [])]
+    except (requests.RequestException, ValueError, KeyError):
+        return []
+
+def print_report(report: Dict) -> None:
+    print(f"{'endpoint':<16} {'requests':>9} {'req/s':>9} {'errors':>8} "
+          f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+    for endpoint, summary in rows:
+        print(f"{endpoint:<16} {summary['requests']:>9} {summary['throughput_per_s']:>9.1f} "
+              f"{summary['error_rate']:>8.2%} {summary['p50_ms']:>9.1f} {summary['p90_ms']:>9.1f} "
+              f"{summary['p99_ms']:>9.1f} {summary['max_ms']:>9.1f}")
+    if report['overall']['errors']:
+        print(f"errors: {report['overall']['errors']}")
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Drive load against the HTTP API')
+    parser.add_argument('--url', default='http://127.0.0.1:5002', help='server to test')
+    parser.add_argument('--spawn', action='store_true', help='start the app under gunicorn+gevent')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers with --spawn')
+    parser.add_argument('--replay', help='JSONL traffic file to replay')
+    parser.add_argument('--replay-timing', action='store_true', help="send replayed requests at their 'at' offsets")
+    parser.add_argument('--loop', action='store_true', help='repeat the traffic file until the duration ends')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='synthetic endpoint weights, e.g. recommend=70,health=30')
+    parser.add_argument('--profiles', type=int, default=1000, help='distinct synthetic profiles')
+    parser.add_argument('--concurrency', type=int, default=16, help='closed-loop workers or open-loop connections')
+    parser.add_argument('--rate', type=float, help='open-loop arrivals per second')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run for')
+    parser.add_argument('--requests', type=int, help='stop after this many requests')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='also write the report as JSON here')
+    args = parser.parse_args(argv)
+
+    process = None
+    base_url = args.url.rstrip('/')
+    if args.spawn:
+        process, base_url = spawn_server(args.workers, {})
+    try:
+        if args.replay:
+            lines = read_traffic(args.replay)
+            traffic = itertools.cycle(lines) if args.loop else iter(lines)
+        else:
+            mix = parse_mix(args.mix)
+            podcast_ids = discover_podcast_ids(base_url) if 'pitch' in mix else []
+            traffic = iter(SyntheticTraffic(mix, args.profiles, args.seed, podcast_ids))
+
+        recorder = Recorder()
+        if args.rate or args.replay_timing:
+            elapsed = run_open_loop(base_url, traffic, args.concurrency, args.duration, args.requests,
+                                    args.timeout, recorder, args.rate, args.seed, args.replay_timing)
+        else:
+            elapsed = run_closed_loop(base_url, traffic, args.concurrency, args.duration, args.requests,
+                                      args.timeout, recorder)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = recorder.report(elapsed)
+    report['config'] = {key: value for key, value in vars(args).items() if key != 'output'}
+    report['config']['url'] = base_url
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Run the micro and macro benchmarks and write the results as JSON.
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --output results.json
+    python -m benchmarks.run --sizes 1000000 --only rank --min-time 5
+
+Micro benchmarks time single functions (profile analysis, scoring, ranking,
+similarity index build and query, catalog loading, search, serialization); macro benchmarks time the whole
+recommendation pipeline, in-process and through the Flask app.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.generators import PROFILE_RICHNESS, generate_catalog, generate_profile, generate_profiles
+from benchmarks.harness import measure
+
+from cache import deserialize, serialize
+from linkedin_scraper import analyze_profile_for_podcasts
+from podcast_data import CACHE_FILE, load_or_scrape_podcasts, search_podcasts
+from projection import DEFAULT_FIELDS, ProjectionIndex
+from scoring import merge_top_k, prepare_podcast, rank_podcasts, rank_prepared, score_podcast
+from similarity import SimilarityIndex, profile_text
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SEARCH_QUERIES = ('leadership', 'ai', 'venture', 'no-such-show', 'business')
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def profile_benchmarks(options: Dict) -> Iterator[Dict]:
+    """Benchmarks that do not depend on catalog size."""
+    for richness in PROFILE_RICHNESS:
+        profile = generate_profile(richness, options['seed'])
+        yield measure('analyze_profile', lambda i: analyze_profile_for_podcasts(profile, i % 2 == 0),
+                      {'richness': richness}, **options['timing'])
+
+def catalog_benchmarks(catalog: List[Dict], options: Dict) -> Iterator[Dict]:
+    """Micro and macro benchmarks over one catalog size."""
+    size = len(catalog)
+    params = {'catalog_size': size}
+    timing = options['timing']
+    profiles = generate_profiles(12, options['seed'])
+    analyses = [analyze_profile_for_podcasts(profile, True) for profile in profiles]
+    prepared = [prepare_podcast(podcast) for podcast in catalog]
+
+    chunk = prepared[:1000]
+    yield measure('score_podcast', lambda i: [score_podcast(p, analyses[i % 12], True) for p in chunk],
+                  params, items=len(chunk), **timing)
+    yield measure('rank_podcasts', lambda i: rank_podcasts(catalog, analyses[i % 12], True, 10),
+                  params, items=size, **timing)
+    yield measure('rank_prepared', lambda i: rank_prepared(prepared, analyses[i % 12], True, 10),
+                  params, items=size, **timing)
+
+    shard_size = -(-size // 8)
+    partials = [rank_prepared(prepared[start:start + shard_size], analyses[0], True, 10, offset=start)
+                for start in range(0, size, shard_size)]
+    yield measure('merge_top_k', lambda i: merge_top_k(partials, 10), dict(params, shards=len(partials)), **timing)
+
+    # Catalog loading and search read podcasts.json from the working directory
+    yield measure('load_or_scrape_podcasts', lambda i: load_or_scrape_podcasts(), params, items=size, **timing)
+    yield measure('search_podcasts', lambda i: search_podcasts(SEARCH_QUERIES[i % len(SEARCH_QUERIES)]),
+                  params, items=size, **timing)
+
+    # Built once per catalog version, so a single timed build is enough
+    yield measure('similarity_index_build', lambda i: SimilarityIndex(catalog), params, items=size,
+                  min_time=0, min_iterations=1, warmup=0)
+    similarity_index = SimilarityIndex(catalog)
+    texts = [profile_text(analysis) for analysis in analyses]
+    yield measure('similarity_query', lambda i: similarity_index.query(texts[i % 12], 50, 0.2),
+                  dict(params, **similarity_index.stats()), **timing)
+
+    index = ProjectionIndex(catalog)
+    index.view(DEFAULT_FIELDS)
+
+    def pipeline(i):
+        profile = profiles[i % len(profiles)]
+        analysis = analyze_profile_for_podcasts(profile, True)
+        ranked = rank_podcasts(catalog, analysis, True, 10)
+        return [index.project(index.ids[position], DEFAULT_FIELDS, reasons) for _, position, reasons in ranked]
+
+    yield measure('recommend_pipeline', pipeline, params, **timing)
+
+    payload = {'recommendations': pipeline(0), 'profileRef': 'bench'}
+    yield measure('cache_roundtrip', lambda i: deserialize(serialize(payload)), params, **timing)
+
+    if options['workers']:
+        from scoring_pool import ScoringExecutor
+        executor = ScoringExecutor(options['workers'])
+        try:
+            executor.load_catalog(catalog, f"bench-{size}")
+            yield measure('pooled_ranking', lambda i: executor.submit(analyses[i % 12], True, 10).result(),
+                          dict(params, workers=options['workers']), items=size, **timing)
+        finally:
+            executor.close()
+
+    if options['http']:
+        from app import app
+        client = app.test_client()
+
+        def http_recommend(i):
+            # A new profile each call, so neither the profile nor the result cache hits
+            response = client.post('/api/recommend', json={
+                'linkedinUrl': f"https://www.linkedin.com/in/bench-{size}-{options['run_id']}-{i}",
+                'wantsToBeFeatured': i % 2 == 0
+            })
+            assert response.status_code == 200, response.status_code
+
+        yield measure('http_recommend', http_recommend, params, **timing)
+
+def run(sizes: List[int], options: Dict, only: str = '', log: Callable[[str], None] = print) -> Dict:
+    results = []
+
+    def keep(result):
+        log(f"{result['name']:<24} {json.dumps(result['params']):<40} "
+            f"p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+            f"{result['items_per_s']:12.0f} items/s  peak {result['peak_alloc_bytes'] / 1e6:8.2f} MB")
+        results.append(result)
+
+    started = time.time()
+    for result in profile_benchmarks(options):
+        if only in result['name']:
+            keep(result)
+
+    original_dir = os.getcwd()
+    for size in sizes:
+        log(f"Generating a catalog of {size} podcasts (seed {options['seed']})")
+        catalog = generate_catalog(size, options['seed'])
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.path.join(workdir, CACHE_FILE), 'w') as f:
+                json.dump(catalog, f)
+            os.chdir(workdir)
+            try:
+                for result in catalog_benchmarks(catalog, options):
+                    if only in result['name']:
+                        keep(result)
+            finally:
+                os.chdir(original_dir)
+        del catalog
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': options['seed'],
+            'sizes': sizes,
+            'started_at': started,
+            'duration_s': time.time() - started,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        },
+        'results': results
+    }
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the recommendation pipeline')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated catalog sizes (1000 to 1000000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', default='', help='run only benchmarks whose name contains this')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to run each benchmark for')
+    parser.add_argument('--min-iterations', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=0, help='also benchmark a scoring pool of this size')
+    parser.add_argument('--no-http', action='store_true', help='skip the Flask app benchmark')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    options = {
+        'seed': args.seed,
+        'workers': args.workers,
+        'http': not args.no_http,
+        'run_id': os.getpid(),
+        'timing': {'min_time': args.min_time, 'min_iterations': args.min_iterations}
+    }
+    log = lambda line: print(line, file=sys.stderr)
+    report = run([int(size) for size in args.sizes.split(',') if size], options, args.only, log)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        log(f"Wrote {len(report['results'])} results to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+if __name__ == '__main__':
+    main()
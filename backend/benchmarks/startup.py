@@ -0,0 +1,114 @@
+"""
+Report import and startup times.
+
+    python -m benchmarks.startup --top 15
+    python -m benchmarks.startup --modes preload,worker --workers 4 --output startup.json
+
+The import report runs `python -X importtime -c "import app"` and lists the
+modules with the largest cumulative import time. The startup report starts
+the app under gunicorn in each mode (PRELOAD_APP=1 warms in the master,
+PRELOAD_APP=0 in each worker) and measures the time until /api/ready first
+answers 200, and the latency of the first /api/recommend after that.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import requests
+
+from benchmarks.load import BACKEND_DIR, free_port
+
+def import_report(top: int) -> Dict:
+    """Cumulative import time per module for a cold `import app`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = [field.strip() for field in line[len('import time:'):].split('|')]
+        if not cumulative_us.isdigit():
+            continue  # Column headers
+        modules.append({'module': name, 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    total = next((m['cumulative_ms'] for m in reversed(modules) if m['module'] == 'app'), None)
+    modules.sort(key=lambda m: m['cumulative_ms'], reverse=True)
+    return {'total_ms': total, 'top': modules[:top]}
+
+def startup_report(mode: str, workers: int, timeout: float) -> Dict:
+    """Time a gunicorn start until the app reports ready."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PRELOAD_APP='1' if mode == 'preload' else '0')
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', f"--workers={workers}", f"--bind=127.0.0.1:{port}"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        first_response = ready = None
+        details = {}
+        while time.perf_counter() - started < timeout:
+            try:
+                response = requests.get(base_url + '/api/ready', timeout=1)
+                if first_response is None:
+                    first_response = time.perf_counter() - started
+                if response.status_code == 200:
+                    ready = time.perf_counter() - started
+                    details = response.json()
+                    break
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+
+        first_recommend = None
+        if ready is not None:
+            request_started = time.perf_counter()
+            requests.post(base_url + '/api/recommend', json={
+                'linkedinUrl': f"https://www.linkedin.com/in/startup-{os.getpid()}"
+            }, timeout=30)
+            first_recommend = time.perf_counter() - request_started
+        return {
+            'mode': mode,
+            'workers': workers,
+            'first_response_s': first_response,
+            'ready_s': ready,
+            'first_recommend_ms': first_recommend * 1000 if first_recommend is not None else None,
+            'app': details
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Report import and startup times')
+    parser.add_argument('--top', type=int, default=15, help='modules to list in the import report')
+    parser.add_argument('--modes', default='preload,worker', help='startup modes to time')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for readiness')
+    parser.add_argument('--output', help='also write the report as JSON here')
+    args = parser.parse_args(argv)
+
+    imports = import_report(args.top)
+    print(f"import app: {imports['total_ms']:.1f} ms")
+    for module in imports['top']:
+        print(f"  {module['cumulative_ms']:8.1f} ms  {module['module']}")
+
+    startups: List[Dict] = []
+    for mode in [m for m in args.modes.split(',') if m]:
+        report = startup_report(mode, args.workers, args.timeout)
+        startups.append(report)
+        ready = f"{report['ready_s']:.2f} s" if report['ready_s'] is not None else 'never'
+        first = f"{report['first_recommend_ms']:.1f} ms" if report['first_recommend_ms'] is not None else '-'
+        print(f"{mode:<8} ready after {ready}, first recommend {first}, "
+              f"warm-up {report['app'].get('warm_up_seconds')}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'imports': imports, 'startup': startups}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Module for the cache tier shared by profile analyses, recommendation results
+and scraped catalog blobs.
+
+Values are serialized compactly (minified JSON, zlib-compressed past a size
+threshold) and stored under namespaced keys, each namespace with its own TTL.
+Backends are pluggable so every gunicorn worker on a host, or every host, can
+share one warm cache:
+
+- memory: in-process LRU (the default, one per worker)
+- sqlite: a host-local SQLite file shared by all workers
+- redis: any server speaking the Redis protocol (see resp_server.py for a
+  local stand-in)
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Default time-to-live in seconds for each namespace
+DEFAULT_TTLS = {
+    'profile': 3600,
+    'recommendations': 600,
+    'pitch': 3600,
+    'catalog': 86400
+}
+
+KEY_PREFIX = 'podrec'
+COMPRESS_THRESHOLD = 1024
+
+# Seconds between sweeps of expired rows from the SQLite backend
+SQLITE_PURGE_INTERVAL = 300
+
+# First byte of every serialized value
+RAW_JSON = b'j'
+ZLIB_JSON = b'z'
+
+def serialize(value: Any) -> bytes:
+    """Encode a value as minified JSON, compressing large payloads."""
+    data = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if len(data) >= COMPRESS_THRESHOLD:
+        return ZLIB_JSON + zlib.compress(data, 6)
+    return RAW_JSON + data
+
+def deserialize(blob: bytes) -> Any:
+    """Decode a value written by serialize."""
+    marker, data = blob[:1], blob[1:]
+    if marker == ZLIB_JSON:
+        data = zlib.decompress(data)
+    elif marker != RAW_JSON:
+        raise ValueError("Unknown cache value encoding")
+    return json.loads(data)
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+class SQLiteBackend:
+    """Host-local store shared by every worker process through one SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_purge = time.time() + SQLITE_PURGE_INTERVAL
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)'
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, value, time.time() + ttl)
+        )
+        # Reads skip expired rows, but only a sweep deletes them
+        if time.time() >= self._next_purge:
+            self._next_purge = time.time() + SQLITE_PURGE_INTERVAL
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def purge_expired(self) -> None:
+        """Drop expired rows; reads already ignore them."""
+        self._connection().execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+
+class RedisBackend:
+    """
+    Minimal client for servers speaking the Redis protocol (RESP).
+    Keeps one connection per thread; expiry is left to the server.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        if self.password:
+            self._command(b'AUTH', self.password.encode('utf-8'))
+        if self.db:
+            self._command(b'SELECT', str(self.db).encode('ascii'))
+
+    def _command(self, *parts: bytes) -> Any:
+        if getattr(self._local, 'sock', None) is None:
+            self._connect()
+        request = [b'*%d\r\n' % len(parts)]
+        for part in parts:
+            request.append(b'$%d\r\n%s\r\n' % (len(part), part))
+        try:
+            self._local.sock.sendall(b''.join(request))
+            return self._read_reply()
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    def _read_reply(self) -> Any:
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            raise RuntimeError(payload.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise ConnectionError("Malformed reply from cache server")
+
+    def close(self) -> None:
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            finally:
+                self._local.sock = None
+
+    def ping(self) -> bool:
+        return self._command(b'PING') == b'PONG'
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._command(b'GET', key.encode('utf-8'))
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._command(b'SET', key.encode('utf-8'), value, b'PX', str(max(1, int(ttl * 1000))).encode('ascii'))
+
+    def delete(self, key: str) -> None:
+        self._command(b'DEL', key.encode('utf-8'))
+
+class Cache:
+    """
+    Namespaced cache over a backend. Backend errors are logged and treated
+    as misses, so a broken cache never fails a request.
+    """
+
+    def __init__(self, backend, ttls: Optional[Dict[str, float]] = None):
+        self.backend = backend
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'errors': 0})
+            counts[outcome] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss."""
+        try:
+            blob = self.backend.get(self._key(namespace, key))
+        except Exception as e:
+            log.error('cache_error', f"Error reading cache: {str(e)}", namespace=namespace)
+            self._count(namespace, 'errors')
+            return None
+        if blob is None:
+            self._count(namespace, 'misses')
+            return None
+        try:
+            value = deserialize(blob)
+        except Exception as e:
+            # A corrupt or old-format entry is a miss, and is dropped so it is rewritten
+            log.error('cache_error', f"Discarding undecodable cache entry: {str(e)}", namespace=namespace)
+            self._count(namespace, 'errors')
+            self.delete(namespace, key)
+            return None
+        self._count(namespace, 'hits')
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value using the namespace TTL unless one is given."""
+        if ttl is None:
+            ttl = self.ttls.get(namespace, 300)
+        try:
+            self.backend.set(self._key(namespace, key), serialize(value), ttl)
+        except Exception as e:
+            log.error('cache_error', f"Error writing cache: {str(e)}", namespace=namespace)
+            self._count(namespace, 'errors')
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self.backend.delete(self._key(namespace, key))
+        except Exception as e:
+            log.error('cache_error', f"Error deleting from cache: {str(e)}", namespace=namespace)
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached value, computing and storing it on a miss."""
+        value = self.get(namespace, key)
+        if value is None:
+            value = compute()
+            self.set(namespace, key, value)
+        return value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return hit/miss/error counters per namespace."""
+        with self._lock:
+            return {namespace: dict(counts) for namespace, counts in self._stats.items()}
+
+def create_cache_from_env() -> Cache:
+    """
+    Build the cache from CACHE_BACKEND (memory, sqlite or redis).
+    Namespace TTLs can be overridden with CACHE_TTL_<NAMESPACE>.
+    """
+    kind = os.environ.get('CACHE_BACKEND', 'memory').lower()
+    if kind == 'sqlite':
+        backend = SQLiteBackend(os.environ.get('CACHE_SQLITE_PATH', 'cache.sqlite3'))
+    elif kind == 'redis':
+        backend = RedisBackend(os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'))
+    elif kind == 'memory':
+        backend = MemoryBackend(int(os.environ.get('CACHE_MAXSIZE', 1024)))
+    else:
+        raise ValueError(f"Unknown cache backend: {kind}")
+
+    ttls = {}
+    for namespace in DEFAULT_TTLS:
+        override = os.environ.get(f"CACHE_TTL_{namespace.upper()}")
+        if override:
+            ttls[namespace] = float(override)
+    return Cache(backend, ttls)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def _forget_cache_after_fork() -> None:
+    # Connections opened before a fork (e.g. while warming the gunicorn master)
+    # must not be shared with the children
+    global _cache
+    _cache = None
+
+os.register_at_fork(after_in_child=_forget_cache_after_fork)
+
+def get_cache() -> Cache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache_from_env()
+    return _cache
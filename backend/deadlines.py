@@ -0,0 +1,44 @@
+"""
+Module for per-request deadlines.
+
+The app sets a deadline when a request is admitted; scraping, profile
+fetching and scoring read it to bound their own timeouts and to abandon work
+whose caller has already given up. The deadline lives in a context variable,
+which is per thread and, under gevent, per greenlet.
+"""
+import contextvars
+import time
+from typing import Optional
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time; its remaining work was abandoned."""
+
+def set_deadline(seconds: float, start: Optional[float] = None) -> contextvars.Token:
+    """Give the current request `seconds` from `start` (default: now)."""
+    return _deadline.set((start if start is not None else time.monotonic()) + seconds)
+
+def clear_deadline(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+def current_deadline() -> Optional[float]:
+    """Return the absolute (time.monotonic) deadline, or None outside a request."""
+    return _deadline.get()
+
+def remaining() -> Optional[float]:
+    """Return the seconds left before the deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def check_deadline(stage: str = 'request') -> None:
+    """Raise DeadlineExceeded if the deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded during {stage}")
+
+def bounded_timeout(timeout: float, stage: str = 'request') -> float:
+    """Cap a timeout at the time left, raising if none is left."""
+    check_deadline(stage)
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
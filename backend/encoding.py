@@ -0,0 +1,158 @@
+"""
+Module for encoding API responses.
+
+JSON is serialized with orjson when it is installed (JSON_ENCODER=orjson or
+auto) and with the standard library otherwise. Bodies past a size threshold
+are compressed with brotli (when installed) or gzip, as negotiated through
+Accept-Encoding. Per-endpoint counters record bytes before and after
+compression and the time spent encoding.
+
+Streamed responses are sent as NDJSON (one {"type": ...} object per line) or
+as Server-Sent Events, one event per item, uncompressed so that every item
+reaches the client as soon as it is written.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from flask import Response, request, stream_with_context
+
+from logs import record_stage
+from metrics import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto').lower()
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+STREAM_MIMETYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def dumps(payload: Any) -> bytes:
+    """Serialize a payload to compact UTF-8 JSON."""
+    if orjson is not None and JSON_ENCODER in ('auto', 'orjson'):
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with a content coding returned by negotiate_encoding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+    return body
+
+def negotiate_encoding(size: int) -> Optional[str]:
+    """Pick the content coding for a body of `size` bytes, or None to send it as is."""
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = request.accept_encodings.best_match(offered)
+    return best if best in offered else None
+
+class EncodingStats:
+    """Per-endpoint response size and encode time counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint: Optional[str], raw_bytes: int, wire_bytes: int, seconds: float) -> None:
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint or 'unknown', {
+                'responses': 0, 'raw_bytes': 0, 'wire_bytes': 0, 'encode_seconds': 0.0
+            })
+            stats['responses'] += 1
+            stats['raw_bytes'] += raw_bytes
+            stats['wire_bytes'] += wire_bytes
+            stats['encode_seconds'] += seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+
+encoding_stats = EncodingStats()
+
+def _finish(body: bytes, encoding: Optional[str], status: int, raw_bytes: int, started: float) -> Response:
+    response = Response(body, status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    elapsed = time.perf_counter() - started
+    response.headers['Server-Timing'] = f"encode;dur={elapsed * 1000:.2f}"
+    encoding_stats.record(request.endpoint, raw_bytes, len(body), elapsed)
+    metrics.observe('podcast_stage_duration_seconds', {'stage': 'serialize'}, elapsed)
+    record_stage('serialize', elapsed)
+    return response
+
+def stream_format() -> Optional[str]:
+    """The streaming format a request asks for with ?stream= or its Accept header, or None."""
+    requested = request.args.get('stream')
+    if requested in STREAM_MIMETYPES:
+        return requested
+    accepted = set(request.accept_mimetypes.values())
+    return next((fmt for fmt, mimetype in STREAM_MIMETYPES.items() if mimetype in accepted), None)
+
+def encode_event(kind: str, payload: Dict, fmt: str) -> bytes:
+    """Serialize one streamed item: an NDJSON line or an SSE event."""
+    if fmt == 'sse':
+        return b'event: ' + kind.encode('utf-8') + b'\ndata: ' + dumps(payload) + b'\n\n'
+    return dumps({'type': kind, **payload}) + b'\n'
+
+def stream_response(events: Iterable[Tuple[str, Dict]], fmt: str) -> Response:
+    """Stream (kind, payload) events, each written as soon as it is produced."""
+    endpoint = request.endpoint
+
+    def generate():
+        sent = 0
+        for kind, payload in events:
+            chunk = encode_event(kind, payload, fmt)
+            sent += len(chunk)
+            yield chunk
+        encoding_stats.record(endpoint, sent, sent, 0.0)
+
+    response = Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[fmt])
+    response.headers['Cache-Control'] = 'no-store'
+    # Ask reverse proxies (nginx and the like) not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Encode a payload as JSON, compressed when the client accepts it."""
+    started = time.perf_counter()
+    body = dumps(payload)
+    raw_bytes = len(body)
+    encoding = negotiate_encoding(raw_bytes)
+    if encoding:
+        body = compress(body, encoding)
+    return _finish(body, encoding, status, raw_bytes, started)
+
+class PrecompressedSnapshot:
+    """
+    A payload serialized and compressed once, with every supported coding,
+    so serving it only picks the matching variant.
+    """
+
+    def __init__(self, payload: Any):
+        self.identity = dumps(payload)
+        self.variants = {'gzip': compress(self.identity, 'gzip')}
+        if brotli is not None:
+            self.variants['br'] = compress(self.identity, 'br')
+
+    def response(self, status: int = 200) -> Response:
+        started = time.perf_counter()
+        encoding = negotiate_encoding(len(self.identity))
+        body = self.variants[encoding] if encoding else self.identity
+        return _finish(body, encoding, status, len(self.identity), started)
@@ -0,0 +1,333 @@
+"""
+Module for listener feedback events and the popularity priors built from them.
+
+The frontend reports impressions, clicks and copied pitches to /api/events.
+Recording an event only appends it to an in-memory ring buffer; a background
+thread writes the buffer in batches to an append-only store (one JSON line
+per event, one segment file per day, shared by every worker on the host).
+
+Folds happen at shared boundaries: every EVENTS_FOLD_INTERVAL seconds of
+wall-clock time, once EVENTS_FOLD_GRACE seconds have passed for the other
+workers' batches to land. A fold adds the events timestamped before its
+boundary to exponentially decayed per-podcast totals, decayed to the
+boundary rather than to when the worker got round to it, so every worker on
+the host folds the same events into the same priors whatever its timer.
+Those become a small integer bonus per podcast: podcasts engaged with more
+often than the catalog average per impression earn up to PRIOR_MAX points.
+The scorer reads the bonus from an array aligned with the catalog, so a
+request does a single index lookup per podcast and never aggregates events
+itself.
+
+A digest of the priors keys cached recommendations and their ETags, so a
+fold that changes the ranking also changes what clients revalidate against,
+and workers that folded the same boundary agree on both.
+
+A client reporting the same event for the same podcast again within
+EVENTS_DEDUP_WINDOW seconds is counted once (per worker).
+"""
+import array
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Engagement each event type stands for; impressions are the denominator
+EVENT_WEIGHTS = {'impression': 0.0, 'click': 1.0, 'copy': 3.0}
+PODCAST_ID_PATTERN = re.compile(r'^[\w\-]{1,64}$')
+MAX_EVENTS_PER_REQUEST = 100
+
+# Most points a prior can add to a podcast's score (Top Rated adds 3)
+PRIOR_MAX = 3
+
+# Impressions worth of the catalog average mixed into every podcast's rate,
+# so a handful of events cannot swing a podcast's prior
+PRIOR_SMOOTHING = 20.0
+
+# Most (client, type, podcast) keys remembered for deduplication
+MAX_DEDUP_KEYS = 100000
+
+SEGMENT_PREFIX = 'events-'
+SEGMENT_SUFFIX = '.jsonl'
+
+def segment_name(timestamp: float) -> str:
+    return f"{SEGMENT_PREFIX}{time.strftime('%Y%m%d', time.gmtime(timestamp))}{SEGMENT_SUFFIX}"
+
+def compute_priors(totals: Dict[str, List[float]]) -> Dict[str, int]:
+    """
+    Turn decayed (impressions, engagement) totals into per-podcast bonuses.
+    A podcast engaged with at the catalog average earns 0, at twice the
+    average or more it earns PRIOR_MAX.
+    """
+    impressions = sum(t[0] for t in totals.values())
+    engagement = sum(t[1] for t in totals.values())
+    if impressions <= 0 or engagement <= 0:
+        return {}
+    mean_rate = engagement / impressions
+    priors = {}
+    for podcast_id, (podcast_impressions, podcast_engagement) in totals.items():
+        rate = (podcast_engagement + PRIOR_SMOOTHING * mean_rate) / (podcast_impressions + PRIOR_SMOOTHING)
+        bonus = min(PRIOR_MAX, max(0, round(PRIOR_MAX * (rate / mean_rate - 1))))
+        if bonus:
+            priors[podcast_id] = bonus
+    return priors
+
+def priors_digest(priors: Dict[str, int]) -> str:
+    """Short content digest of a priors map, the same in every worker that folded the same events."""
+    if not priors:
+        return ''
+    material = json.dumps(sorted(priors.items()), separators=(',', ':'))
+    return hashlib.sha1(material.encode('utf-8')).hexdigest()[:12]
+
+class EventStore:
+    """Ring buffer, write-behind batches and the folded priors, for one worker."""
+
+    def __init__(self, directory: str, buffer_size: int = 10000, flush_interval: float = 2.0,
+                 fold_interval: float = 60.0, half_life: float = 7 * 86400, retention_days: int = 30,
+                 fold_grace: float = 10.0, dedup_window: float = 300.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.fold_interval = fold_interval
+        self.half_life = half_life
+        self.retention_days = retention_days
+        self.fold_grace = fold_grace
+        self.dedup_window = dedup_window
+        self._buffer = deque(maxlen=buffer_size)
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._fold_lock = threading.Lock()
+        self._thread_pid = None
+        self._stats = {'recorded': 0, 'duplicates': 0, 'overwritten': 0, 'written': 0, 'folded': 0,
+                       'write_errors': 0}
+
+        # Fold state: bytes read per segment, events read but past the last
+        # boundary, decayed totals and the priors from them
+        self._offsets = {}
+        self._pending = []
+        self._totals = {}
+        self._folded_at = None
+        self._priors = {}
+        self._digest = ''
+        self._generation = 0
+        self._aligned = (None, None, None)
+
+    @classmethod
+    def from_env(cls) -> 'EventStore':
+        return cls(
+            os.environ.get('EVENTS_DIR') or os.path.join(tempfile.gettempdir(), 'podcast-events'),
+            int(os.environ.get('EVENTS_BUFFER_SIZE', 10000)),
+            float(os.environ.get('EVENTS_FLUSH_INTERVAL', 2)),
+            float(os.environ.get('EVENTS_FOLD_INTERVAL', 60)),
+            float(os.environ.get('EVENTS_HALF_LIFE', 7 * 86400)),
+            int(os.environ.get('EVENTS_RETENTION_DAYS', 30)),
+            float(os.environ.get('EVENTS_FOLD_GRACE', 10)),
+            float(os.environ.get('EVENTS_DEDUP_WINDOW', 300))
+        )
+
+    def record(self, events: Iterable[Tuple[str, str]], client: Optional[str] = None) -> int:
+        """
+        Buffer (type, podcast ID) events; returns how many were accepted.
+        Events `client` already reported within the dedup window are dropped.
+        """
+        self.ensure_background()
+        now = round(time.time(), 3)
+        with self._lock:
+            accepted = []
+            for event_type, podcast_id in events:
+                if client is not None and self._seen(now, (client, event_type, podcast_id)):
+                    self._stats['duplicates'] += 1
+                    continue
+                accepted.append((now, event_type, podcast_id))
+            # A full ring buffer overwrites its oldest events rather than blocking
+            overflow = max(0, len(self._buffer) + len(accepted) - self._buffer.maxlen)
+            self._buffer.extend(accepted)
+            self._stats['recorded'] += len(accepted)
+            self._stats['overwritten'] += overflow
+        return len(accepted)
+
+    def _seen(self, now: float, key: Tuple[str, str, str]) -> bool:
+        """Whether key was seen within the dedup window; remembers it if not. Called under the lock."""
+        recent = self._recent
+        while recent:
+            oldest, seen_at = next(iter(recent.items()))
+            if now - seen_at < self.dedup_window and len(recent) < MAX_DEDUP_KEYS:
+                break
+            del recent[oldest]
+        if key in recent:
+            return True
+        recent[key] = now
+        return False
+
+    def flush(self) -> int:
+        """Append the buffered events to today's segment in one write."""
+        with self._lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+        if not batch:
+            return 0
+        lines = ''.join(
+            json.dumps({'ts': ts, 'type': event_type, 'podcastId': podcast_id}, separators=(',', ':')) + '\n'
+            for ts, event_type, podcast_id in batch
+        ).encode('utf-8')
+        os.makedirs(self.directory, exist_ok=True)
+        # O_APPEND keeps batches from different workers whole
+        fd = os.open(os.path.join(self.directory, segment_name(time.time())),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._stats['written'] += len(batch)
+        return len(batch)
+
+    def fold_boundary(self, now: Optional[float] = None) -> float:
+        """The newest boundary that can be folded: the last fold interval whose grace has passed."""
+        now = time.time() if now is None else now
+        return (now - self.fold_grace) // self.fold_interval * self.fold_interval
+
+    def fold(self, now: Optional[float] = None) -> None:
+        """Add the events before the newest boundary to the decayed totals and rebuild the priors."""
+        with self._fold_lock:
+            boundary = self.fold_boundary(now)
+            if self._folded_at is not None and boundary <= self._folded_at:
+                return
+            decay = 0.5 ** ((boundary - self._folded_at) / self.half_life) if self._folded_at else 1.0
+            totals = {podcast_id: [t[0] * decay, t[1] * decay] for podcast_id, t in self._totals.items()}
+
+            events = self._pending
+            for name in self._segments():
+                events.extend(self._read_new(name))
+            pending = []
+            folded = 0
+            for event in events:
+                weight = EVENT_WEIGHTS.get(event.get('type'))
+                podcast_id = event.get('podcastId')
+                ts = event.get('ts')
+                if weight is None or not isinstance(podcast_id, str) or not isinstance(ts, (int, float)):
+                    continue
+                if ts >= boundary:
+                    pending.append(event)  # Belongs to a later fold
+                    continue
+                age_decay = 0.5 ** ((boundary - ts) / self.half_life)
+                entry = totals.setdefault(podcast_id, [0.0, 0.0])
+                if weight:
+                    entry[1] += weight * age_decay
+                else:
+                    entry[0] += age_decay
+                folded += 1
+
+            self._pending = pending
+            self._totals = {podcast_id: t for podcast_id, t in totals.items() if t[0] + t[1] > 0.01}
+            self._folded_at = boundary
+            priors = compute_priors(self._totals)
+            with self._lock:
+                if priors != self._priors:
+                    self._priors = priors
+                    self._digest = priors_digest(priors)
+                    self._generation += 1
+                self._stats['folded'] += folded
+
+    def _segments(self) -> List[str]:
+        """Segment files in date order, deleting those past retention."""
+        try:
+            names = sorted(n for n in os.listdir(self.directory)
+                           if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+        except OSError:
+            return []
+        oldest = segment_name(time.time() - self.retention_days * 86400)
+        for name in [n for n in names if n < oldest]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            self._offsets.pop(name, None)
+        return [n for n in names if n >= oldest]
+
+    def _read_new(self, name: str) -> Iterable[Dict]:
+        """Events appended to a segment since the last fold, whole lines only."""
+        offset = self._offsets.get(name, 0)
+        try:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return []
+        end = data.rfind(b'\n') + 1
+        self._offsets[name] = offset + end
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+    def priors_for(self, podcasts: Sequence[Dict], get_id) -> Optional[array.array]:
+        """
+        Return the priors aligned with a catalog list (one signed byte per
+        podcast), rebuilt only when the list or the folded priors change.
+        None when no podcast has a prior.
+        """
+        self.ensure_background()
+        with self._lock:
+            generation, priors = self._generation, self._priors
+            aligned_podcasts, aligned_generation, aligned = self._aligned
+        if aligned_podcasts is podcasts and aligned_generation == generation:
+            return aligned
+        aligned = array.array('b', (priors.get(get_id(p), 0) for p in podcasts)) if priors else None
+        with self._lock:
+            self._aligned = (podcasts, generation, aligned)
+        return aligned
+
+    def priors(self) -> Tuple[Dict[str, int], str]:
+        """
+        Return the folded priors by podcast ID and their digest. The map is
+        replaced, never changed in place, on each fold that changes it.
+        """
+        self.ensure_background()
+        with self._lock:
+            return self._priors, self._digest
+
+    def ensure_background(self) -> None:
+        """Start this worker's flush and fold thread, once per process."""
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            # A buffer inherited through fork belongs to the parent
+            self._buffer.clear()
+        threading.Thread(target=self._run, name='events', daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.flush()
+            except Exception as e:
+                with self._lock:
+                    self._stats['write_errors'] += 1
+                log.error('events_error', f"Error writing events: {str(e)}")
+            # Checked every flush, so each boundary is folded soon after its grace ends
+            if self._folded_at is None or self.fold_boundary() > self._folded_at:
+                try:
+                    self.fold()
+                except Exception as e:
+                    log.error('events_error', f"Error folding events: {str(e)}")
+            time.sleep(self.flush_interval)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, buffered=len(self._buffer), podcasts_with_prior=len(self._priors),
+                        generation=self._generation, folded_through=self._folded_at)
+
+event_store = EventStore.from_env()
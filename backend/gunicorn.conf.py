@@ -0,0 +1,52 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn starts in this
+directory. Command line flags (e.g. those in Procfile) still take precedence.
+
+With PRELOAD_APP=1 (the default) the app is imported and warmed once in the
+master: the catalog, the scoring and projection indexes and the compressed
+catalog snapshot are built before the workers fork, so every worker starts
+ready and shares those pages copy-on-write. With PRELOAD_APP=0 each worker
+imports the app itself and warms up before accepting connections.
+"""
+import os
+import sys
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+timeout = 30
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+
+def _effective_worker_class():
+    """The worker class after command line overrides, which are applied after this file."""
+    for i, arg in enumerate(sys.argv):
+        if arg.startswith('--worker-class='):
+            return arg.split('=', 1)[1]
+        if arg in ('-k', '--worker-class') and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return worker_class
+
+# The preloaded app is imported in the master, before gevent workers would
+# patch the stdlib. Patch first, so locks and sockets created while importing
+# and warming up are gevent-aware in the forked workers.
+if preload_app and _effective_worker_class() == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+def on_starting(server):
+    # The master is not a worker: it must not write a snapshot that render() counts as one
+    from metrics import metrics
+    metrics.mark_master()
+
+    # Worker metric snapshots from a previous run would be summed with this one's
+    metrics.clear_snapshots()
+
+    if server.cfg.preload_app:
+        from app import warm_up
+        report = warm_up('preload')
+        server.log.info("Warmed up in master: %s", report)
+
+def post_worker_init(worker):
+    from app import startup, warm_up
+    if not startup['ready']:
+        report = warm_up('worker')
+        worker.log.info("Warmed up worker %s: %s", worker.pid, report)
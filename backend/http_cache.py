@@ -0,0 +1,50 @@
+"""
+Module for HTTP conditional caching (ETag / If-None-Match / Cache-Control).
+
+ETags are derived from the catalog version plus the canonical request key,
+not from the response body, so a matching If-None-Match is answered with a
+304 before any profile analysis, scoring or serialization happens.
+"""
+import hashlib
+from typing import Optional
+
+from flask import Response, request
+
+# Bump when the response format changes so old ETags stop matching
+ETAG_FORMAT_VERSION = '1'
+
+# Cache-Control per endpoint; endpoints not listed are left alone
+CACHE_CONTROL = {
+    'recommend': 'private, no-cache',
+    'pitch': 'private, max-age=3600',
+    'list_podcasts': 'public, max-age=300, stale-while-revalidate=60',
+    'get_catalog': 'public, max-age=300, stale-while-revalidate=60',
+    'health_check': 'no-store',
+    'readiness_check': 'no-store',
+    'metrics_endpoint': 'no-store',
+    'list_profiles': 'no-store',
+    'get_profile': 'no-store',
+    'record_events': 'no-store'
+}
+
+def compute_etag(catalog_version: str, *key_parts) -> str:
+    """Return a deterministic ETag value for a catalog version and request key."""
+    material = '\x1f'.join([ETAG_FORMAT_VERSION, catalog_version] + [str(part) for part in key_parts])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]
+
+def is_not_modified(etag: str) -> bool:
+    """Return whether the request's If-None-Match already covers this ETag."""
+    return request.if_none_match.contains_weak(etag)
+
+def not_modified(etag: str) -> Response:
+    """Build an empty 304 response carrying the ETag."""
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+def add_cache_headers(response: Response, endpoint: Optional[str]) -> Response:
+    """Set the endpoint's Cache-Control unless the view already chose one."""
+    cache_control = CACHE_CONTROL.get(endpoint)
+    if cache_control and 'Cache-Control' not in response.headers and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,309 @@
+"""
+Module for podcast artwork thumbnails served from a local disk cache.
+
+Catalog artwork URLs point at full-size images on the podcast directory's
+CDN. /api/image/<podcast_id> fetches each artwork once, shrinks it to a
+small JPEG thumbnail with Pillow and stores it on disk under the SHA-256 of
+its bytes, so identical artwork is stored once and a file's name doubles as
+its ETag.
+
+An SQLite index in the same directory maps each artwork URL to its file and
+records when it was last served. Every worker on the host shares the
+directory; when the files outgrow IMAGE_CACHE_MAX_BYTES the least recently
+served are deleted. Concurrent misses for the same artwork are coalesced
+into one origin fetch, and failed fetches are not retried for a while.
+
+See stub_image_origin.py for a local origin to point IMAGE_ORIGIN_URL at.
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from singleflight import SingleFlight
+
+# Bump when thumbnails are rendered differently so cached ones are replaced
+THUMBNAIL_FORMAT_VERSION = '1'
+
+# Served entries are marked used at most this often, sparing a write per hit
+TOUCH_INTERVAL = 60.0
+
+# Larger sources are refused before decoding (decompression bombs)
+MAX_SOURCE_PIXELS = 25_000_000
+
+EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp'}
+
+class ImageFetchError(Exception):
+    """The artwork could not be fetched from its origin or decoded."""
+
+class Thumbnail(NamedTuple):
+    file: BinaryIO
+    content_type: str
+    digest: str
+    size: int
+
+class ThumbnailCache:
+    """Content-addressed files in a directory, with a shared LRU index in SQLite."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, 'index.sqlite3')
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(self.directory, exist_ok=True)
+            connection = sqlite3.connect(self.index_path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS thumbnails (key TEXT PRIMARY KEY, digest TEXT NOT NULL, '
+                'content_type TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS thumbnails_used ON thumbnails (used)')
+            self._local.connection = connection
+        return connection
+
+    def _path(self, digest: str, content_type: str) -> str:
+        return os.path.join(self.directory, digest + EXTENSIONS.get(content_type, ''))
+
+    def open(self, key: str) -> Optional[Thumbnail]:
+        """Open the cached thumbnail for a key, or None on a miss."""
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT digest, content_type, used FROM thumbnails WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        digest, content_type, used = row
+        try:
+            # Once open, the file survives another worker evicting it
+            f = open(self._path(digest, content_type), 'rb')
+        except FileNotFoundError:
+            connection.execute('DELETE FROM thumbnails WHERE key = ?', (key,))
+            return None
+        now = time.time()
+        if now - used >= TOUCH_INTERVAL:
+            connection.execute('UPDATE thumbnails SET used = ? WHERE key = ?', (now, key))
+        return Thumbnail(f, content_type, digest, os.fstat(f.fileno()).st_size)
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        """Store a thumbnail under its content hash and evict past the size bound."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest, content_type)
+        connection = self._connection()
+        if not os.path.exists(path):
+            # Write then rename, so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        connection.execute(
+            'INSERT OR REPLACE INTO thumbnails (key, digest, content_type, size, used) VALUES (?, ?, ?, ?, ?)',
+            (key, digest, content_type, len(data), time.time())
+        )
+        self.evict()
+
+    def stored_bytes(self) -> int:
+        """Bytes on disk, counting artwork shared by several keys once."""
+        return self._connection().execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM thumbnails GROUP BY digest)'
+        ).fetchone()[0]
+
+    def evict(self) -> int:
+        """Delete the least recently served entries until the files fit; returns files removed."""
+        connection = self._connection()
+        total = self.stored_bytes()
+        removed = 0
+        while total > self.max_bytes:
+            oldest = connection.execute(
+                'SELECT key, digest, content_type, size FROM thumbnails ORDER BY used LIMIT 64'
+            ).fetchall()
+            if not oldest:
+                break
+            for key, digest, content_type, size in oldest:
+                connection.execute('DELETE FROM thumbnails WHERE key = ?', (key,))
+                if connection.execute('SELECT 1 FROM thumbnails WHERE digest = ?', (digest,)).fetchone():
+                    continue
+                try:
+                    os.remove(self._path(digest, content_type))
+                except FileNotFoundError:
+                    pass
+                removed += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        return removed
+
+    def stats(self) -> Dict:
+        # A scrape must not create the cache; report it empty until something is stored
+        if not os.path.exists(self.index_path):
+            return {'entries': 0, 'bytes': 0, 'max_bytes': self.max_bytes}
+        entries = self._connection().execute('SELECT COUNT(*) FROM thumbnails').fetchone()[0]
+        return {'entries': entries, 'bytes': self.stored_bytes(), 'max_bytes': self.max_bytes}
+
+def make_thumbnail(data: bytes, content_type: str, size: int, quality: int) -> Tuple[bytes, str]:
+    """
+    Shrink an image to fit a size x size box and re-encode it as JPEG.
+    When the source is already smaller, the source is kept.
+    """
+    # Imported here so the app starts without Pillow; only thumbnails need it
+    from PIL import Image
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        if width * height > MAX_SOURCE_PIXELS:
+            raise ImageFetchError(f"Artwork is too large to decode ({width}x{height})")
+        # JPEG sources decode straight at a reduced scale, far cheaper than a full decode
+        image.draft('RGB', (size, size))
+        image.thumbnail((size, size), Image.LANCZOS)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    except ImageFetchError:
+        raise
+    except Exception as e:
+        raise ImageFetchError(f"Artwork could not be decoded: {str(e)}")
+    thumbnail = output.getvalue()
+    if width <= size and height <= size and len(data) <= len(thumbnail):
+        return data, content_type
+    return thumbnail, 'image/jpeg'
+
+class ImageProxy:
+    """Fetches artwork from its origin once and serves thumbnails from the disk cache."""
+
+    def __init__(self, cache: ThumbnailCache, size: int = 192, quality: int = 80, timeout: float = 5.0,
+                 max_source_bytes: int = 10 * 1024 * 1024, origin_url: Optional[str] = None,
+                 retry_after: float = 300.0, max_age: int = 604800):
+        self.cache = cache
+        self.size = size
+        self.quality = quality
+        self.timeout = timeout
+        self.max_source_bytes = max_source_bytes
+        self.origin_url = origin_url
+        self.retry_after = retry_after
+        self.max_age = max_age
+        self._flight = SingleFlight()
+        self._session = None
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._stats = {'hits': 0, 'misses': 0, 'fetch_errors': 0}
+
+    @classmethod
+    def from_env(cls) -> 'ImageProxy':
+        return cls(
+            ThumbnailCache(
+                os.environ.get('IMAGE_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'podcast-images'),
+                int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+            ),
+            size=int(os.environ.get('IMAGE_SIZE', 192)),
+            quality=int(os.environ.get('IMAGE_QUALITY', 80)),
+            timeout=float(os.environ.get('IMAGE_FETCH_TIMEOUT', 5)),
+            max_source_bytes=int(os.environ.get('IMAGE_MAX_SOURCE_BYTES', 10 * 1024 * 1024)),
+            origin_url=os.environ.get('IMAGE_ORIGIN_URL') or None,
+            retry_after=float(os.environ.get('IMAGE_RETRY_AFTER', 300)),
+            max_age=int(os.environ.get('IMAGE_MAX_AGE', 604800))
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def cache_key(self, url: str) -> str:
+        """Key of an artwork URL's thumbnail at the current rendering settings."""
+        material = '\x1f'.join([THUMBNAIL_FORMAT_VERSION, str(self.size), str(self.quality), url])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]
+
+    def origin(self, url: str) -> str:
+        """The URL to fetch, on IMAGE_ORIGIN_URL instead of the catalog's host when set."""
+        if not self.origin_url:
+            return url
+        base, parts = urlsplit(self.origin_url), urlsplit(url)
+        return urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, ''))
+
+    def get(self, url: str) -> Thumbnail:
+        """Return the open thumbnail of an artwork URL, fetching it on a miss."""
+        key = self.cache_key(url)
+        thumbnail = self.cache.open(key)
+        if thumbnail is not None:
+            self._count('hits')
+            return thumbnail
+        self._count('misses')
+        self._flight.do(key, self._fill, key, url)
+        thumbnail = self.cache.open(key)
+        if thumbnail is None:
+            raise ImageFetchError("Artwork was evicted before it could be served")
+        return thumbnail
+
+    def _fill(self, key: str, url: str) -> None:
+        with self._lock:
+            failed_until = self._failures.get(key, 0.0)
+        if time.monotonic() < failed_until:
+            raise ImageFetchError("Artwork origin failed recently")
+        try:
+            data, content_type = self._fetch(self.origin(url))
+            self.cache.put(key, *make_thumbnail(data, content_type, self.size, self.quality))
+        except ImageFetchError:
+            self._fetch_failed(key)
+            raise
+        except ImportError:
+            # Pillow is missing here, not the origin at fault
+            raise
+        except Exception as e:
+            self._fetch_failed(key)
+            raise ImageFetchError(f"Error fetching artwork: {str(e)}")
+
+    def _fetch_failed(self, key: str) -> None:
+        with self._lock:
+            self._stats['fetch_errors'] += 1
+            now = time.monotonic()
+            if len(self._failures) >= 1000:
+                self._failures = {k: until for k, until in self._failures.items() if until > now}
+            self._failures[key] = now + self.retry_after
+
+    def _fetch(self, url: str) -> Tuple[bytes, str]:
+        if urlsplit(url).scheme not in ('http', 'https'):
+            raise ImageFetchError("Artwork URL must be http or https")
+        if self._session is None:
+            # Imported here like the profile fetcher, and only once artwork is requested
+            import requests
+            self._session = requests.Session()
+        with self._session.get(url, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise ImageFetchError(f"Artwork origin answered {response.status_code}")
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            # Only raster formats: an SVG served from this origin could run script
+            if content_type not in EXTENSIONS:
+                raise ImageFetchError(f"Artwork origin sent {content_type or 'no content type'}")
+            chunks, received = [], 0
+            for chunk in response.iter_content(64 * 1024):
+                received += len(chunk)
+                if received > self.max_source_bytes:
+                    raise ImageFetchError("Artwork is larger than IMAGE_MAX_SOURCE_BYTES")
+                chunks.append(chunk)
+        return b''.join(chunks), content_type
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._stats)
+        return dict(counters, cache=self.cache.stats())
+
+image_proxy = ImageProxy.from_env()
@@ -1,30 +1,30 @@
 """
 Module for scraping and analyzing LinkedIn profiles.
 """
-import requests
-from bs4 import BeautifulSoup
 from typing import Dict, List, Optional
 import re
+from metrics import timed
+from profile_fetcher import get_profile_fetcher
 
-def extract_profile_data(linkedin_url: str) -> Dict:
+# The profile username in a LinkedIn URL; hosts and paths are case-insensitive
+PROFILE_URL_PATTERN = re.compile(r'linkedin\.com/in/([\w\-]+)', re.IGNORECASE)
+
+def canonical_username(linkedin_url: str) -> Optional[str]:
     """
-    Extract relevant information from a LinkedIn profile URL.
-    In a production environment, this would use LinkedIn's API or a proper scraping service.
-    For now, we'll return mock data based on the profile URL.
+    Return the lowercased profile username from a LinkedIn URL,
+    or None if the URL does not point at a profile.
     """
-    # Extract username from LinkedIn URL
-    username = re.search(r'linkedin\.com/in/([\w\-]+)', linkedin_url)
-    if not username:
-        raise ValueError("Invalid LinkedIn URL format")
-    
-    username = username.group(1)
-    
-    # In a real implementation, we would:
-    # 1. Use LinkedIn API or a scraping service
-    # 2. Handle rate limiting and authentication
-    # 3. Parse the actual profile data
-    # For now, return mock data
+    username = PROFILE_URL_PATTERN.search(linkedin_url or '')
+    return username.group(1).lower() if username else None
+
+def profile_url(username: str) -> str:
+    """Return the LinkedIn profile URL for a username."""
+    return f"https://www.linkedin.com/in/{username}"
+
+def generate_mock_profile(username: str) -> Dict:
+    """Return mock profile data for a username, used when no provider is configured."""
     mock_data = {
+        'name': username.replace('-', ' ').title(),
         'skills': [
             'Business Development',
             'Entrepreneurship',
@@ -57,6 +57,29 @@ def extract_profile_data(linkedin_url: str) -> Dict:
     
     return mock_data
 
+@timed('extract_profile')
+def extract_profile_data(linkedin_url: str) -> Dict:
+    """
+    Extract relevant information from a LinkedIn profile URL.
+    Profiles come from the provider at PROFILE_PROVIDER_URL when one is set
+    (see profile_fetcher.py); otherwise we return mock data based on the URL.
+    """
+    # Extract username from LinkedIn URL
+    username = PROFILE_URL_PATTERN.search(linkedin_url or '')
+    if not username:
+        raise ValueError("Invalid LinkedIn URL format")
+    
+    # Lowercased like canonical_username, so both agree on which profile this is
+    username = username.group(1).lower()
+    
+    # Pooled, rate-limited and circuit-broken provider calls
+    fetcher = get_profile_fetcher()
+    if fetcher is not None:
+        return fetcher.fetch(username)
+    
+    return generate_mock_profile(username)
+
+@timed('analyze_profile')
 def analyze_profile_for_podcasts(profile_data: Dict, wants_to_be_featured: bool) -> Dict:
     """
     Analyze LinkedIn profile data to determine relevant podcast categories
@@ -121,7 +144,7 @@ def analyze_profile_for_podcasts(profile_data: Dict, wants_to_be_featured: bool)
             ])
     
     return {
-        'keywords': list(keywords),
+        'keywords': sorted(keywords),  # Sorted so results are deterministic across workers
         'categories': [cat for cat, relevant in categories.items() if relevant],
         'featured_opportunities': featured_opportunities
     }
@@ -0,0 +1,271 @@
+"""
+Module for structured, non-blocking logging.
+
+Log calls on the request path only filter the record and put it on an
+in-memory queue; a real OS thread (not a gevent greenlet, whose blocking
+writes would stall the worker's event loop) formats the records as JSON lines
+and writes them to stdout. When the queue is full, records are dropped and
+counted rather than blocking the request.
+
+Every record carries an `event` name. High-frequency events can be sampled
+(LOG_SAMPLE="request=0.1") or rate limited (LOG_RATE_LIMIT="cache_error=10/60");
+the next record of a rate-limited event reports how many were suppressed.
+Records logged while handling a request carry its request ID, and the
+per-request `request` event lists the time spent in each stage.
+"""
+import _queue
+import _thread
+import atexit
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+from typing import Dict, Optional, Tuple
+
+if 'gevent.monkey' in sys.modules:
+    _monkey = sys.modules['gevent.monkey']
+    _start_thread = _monkey.get_original('_thread', 'start_new_thread')
+    _sleep = _monkey.get_original('time', 'sleep')
+else:
+    _start_thread, _sleep = _thread.start_new_thread, time.sleep
+
+# Events limited by default: (records, per seconds)
+DEFAULT_RATE_LIMITS = {
+    'cache_error': (10, 60.0),
+    'shard_error': (10, 60.0),
+    'shard_version_mismatch': (1, 60.0),
+    'metrics_error': (5, 60.0)
+}
+
+# The request being handled: its ID and seconds spent per stage
+_request = contextvars.ContextVar('log_request', default=None)
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        event, _, rate = part.partition('=')
+        rates[event.strip()] = float(rate)
+    return rates
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, float]]:
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        event, _, limit = part.partition('=')
+        count, _, seconds = limit.partition('/')
+        limits[event.strip()] = (int(count), float(seconds or 1))
+    return limits
+
+def start_request(request_id: Optional[str] = None) -> Tuple[str, contextvars.Token]:
+    """Start log context for a request; returns its ID and a token for `end_request`."""
+    request_id = request_id or uuid.uuid4().hex
+    return request_id, _request.set({'request_id': request_id, 'stages': {}})
+
+def end_request(token: contextvars.Token) -> None:
+    _request.reset(token)
+
+def current_request_id() -> Optional[str]:
+    context = _request.get()
+    return context['request_id'] if context else None
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add time spent in a stage to the current request's log context."""
+    context = _request.get()
+    if context is not None:
+        stages = context['stages']
+        stages[name] = stages.get(name, 0.0) + seconds
+
+def request_stages() -> Dict[str, float]:
+    context = _request.get()
+    return {name: round(seconds * 1000, 3) for name, seconds in context['stages'].items()} if context else {}
+
+class EventFilter(logging.Filter):
+    """Per-event sampling and rate limiting, applied before a record is queued."""
+
+    def __init__(self, sample_rates: Dict[str, float], rate_limits: Dict[str, Tuple[int, float]]):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, 'event', None)
+        rate = self.sample_rates.get(event)
+        if rate is not None and rate < 1.0 and random.random() >= rate:
+            return False
+        limit = self.rate_limits.get(event)
+        if limit is None:
+            return True
+
+        count, per = limit
+        now = time.monotonic()
+        with self._lock:
+            started, sent, suppressed = self._windows.get(event, (now, 0, 0))
+            if now - started >= per:
+                started, sent = now, 0
+            if sent >= count:
+                self._windows[event] = (started, sent, suppressed + 1)
+                return False
+            self._windows[event] = (started, sent + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class QueueingHandler(logging.Handler):
+    """Hands records to a background writer thread without ever blocking."""
+
+    def __init__(self, stream=None, max_queue: int = 10000):
+        super().__init__()
+        self.stream = stream
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.dropped_total = 0
+        self._queue = None
+        self._pid = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            # handle() already holds the handler lock (re-created by logging after
+            # a fork); it is taken again so direct emit() calls start one writer too
+            with self.lock:
+                if self._pid != os.getpid():
+                    self._start_writer()
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            self.dropped_total += 1
+            return
+        # Capture what depends on the caller's context before handing off
+        record.request_id = getattr(record, 'request_id', None) or current_request_id()
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        record.message = record.getMessage()
+        record.args = None
+        self._queue.put(record)
+
+    def _start_writer(self) -> None:
+        # Per process: a queue and thread from before a fork do not survive it.
+        # The pid is set last, so no caller sees it before the queue is in place.
+        self._queue = _queue.SimpleQueue()
+        _start_thread(self._write_records, (self._queue,))
+        self._pid = os.getpid()
+
+    def _write_records(self, records) -> None:
+        while True:
+            lines = [self.format(records.get())]
+            while not records.empty() and len(lines) < 256:
+                lines.append(self.format(records.get()))
+            if self.dropped:
+                lines.append(json.dumps({'ts': time.time(), 'level': 'WARNING', 'event': 'log_dropped',
+                                         'count': self.dropped}))
+                self.dropped = 0
+            stream = self.stream or sys.stdout
+            try:
+                stream.write('\n'.join(lines) + '\n')
+                stream.flush()
+            except Exception:
+                pass
+
+    def drain(self, timeout: float = 1.0) -> None:
+        """Give the writer a moment to empty the queue, e.g. before exiting."""
+        deadline = time.monotonic() + timeout
+        while self._pid == os.getpid() and not self._queue.empty() and time.monotonic() < deadline:
+            _sleep(0.01)
+
+    def stats(self) -> Dict:
+        return {
+            'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'dropped': self.dropped_total
+        }
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'event': getattr(record, 'event', record.name),
+            'msg': record.message if hasattr(record, 'message') else record.getMessage()
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        entry.update(getattr(record, 'fields', None) or {})
+        if getattr(record, 'suppressed', None):
+            entry['suppressed'] = record.suppressed
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = dict(getattr(record, 'fields', None) or {})
+        if getattr(record, 'request_id', None):
+            fields['request_id'] = record.request_id
+        if getattr(record, 'suppressed', None):
+            fields['suppressed'] = record.suppressed
+        line = f"{record.levelname} {getattr(record, 'event', record.name)}: {record.message}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text.rstrip()
+        return line
+
+class EventLogger:
+    """Logger whose calls name an event and attach structured fields."""
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def log(self, level: int, event: str, message: Optional[str] = None, exc_info=None, **fields) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, message or event, exc_info=exc_info, extra={'event': event, 'fields': fields})
+
+    def debug(self, event: str, message: Optional[str] = None, **fields) -> None:
+        self.log(logging.DEBUG, event, message, **fields)
+
+    def info(self, event: str, message: Optional[str] = None, **fields) -> None:
+        self.log(logging.INFO, event, message, **fields)
+
+    def warning(self, event: str, message: Optional[str] = None, **fields) -> None:
+        self.log(logging.WARNING, event, message, **fields)
+
+    def error(self, event: str, message: Optional[str] = None, **fields) -> None:
+        self.log(logging.ERROR, event, message, **fields)
+
+    def exception(self, event: str, message: Optional[str] = None, **fields) -> None:
+        self.log(logging.ERROR, event, message, exc_info=True, **fields)
+
+_handler = None
+_handler_lock = threading.Lock()
+
+def configure_logging() -> QueueingHandler:
+    """Install the queueing handler on the 'podcast' logger, once."""
+    global _handler
+    with _handler_lock:
+        if _handler is not None:
+            return _handler
+        handler = QueueingHandler(max_queue=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+        handler.setFormatter(TextFormatter() if os.environ.get('LOG_FORMAT') == 'text' else JsonFormatter())
+        rate_limits = dict(DEFAULT_RATE_LIMITS, **parse_rate_limits(os.environ.get('LOG_RATE_LIMIT', '')))
+        handler.addFilter(EventFilter(parse_sample_rates(os.environ.get('LOG_SAMPLE', '')), rate_limits))
+
+        logger = logging.getLogger('podcast')
+        logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+        logger.addHandler(handler)
+        logger.propagate = False
+        atexit.register(handler.drain)
+        _handler = handler
+        return handler
+
+def log_stats() -> Dict:
+    return configure_logging().stats()
+
+def get_logger(name: str) -> EventLogger:
+    """Return the event logger for a module, e.g. get_logger(__name__)."""
+    configure_logging()
+    return EventLogger(logging.getLogger(f"podcast.{name}"))
@@ -0,0 +1,313 @@
+"""
+Module for request and stage metrics in the Prometheus text format.
+
+Latencies go into log-linear (HDR-style) histograms: every power of two is
+split into SUB_BUCKETS linear steps, so a bucket is never wider than 1/SUB_BUCKETS
+of its lower bound and recording is a single bisect. Each worker keeps its own
+registry and periodically writes a snapshot to METRICS_DIR (a temp directory
+by default), and /api/metrics sums the snapshots of every gunicorn worker.
+"""
+import bisect
+import functools
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from logs import get_logger, record_stage
+
+log = get_logger(__name__)
+
+# Histogram buckets: 2^-14 s (~61us) to 2^6 s (64s)
+SUB_BUCKETS = 2
+MIN_EXPONENT = -14
+MAX_EXPONENT = 6
+BUCKET_BOUNDS = [
+    2.0 ** exponent * (1 + step / SUB_BUCKETS)
+    for exponent in range(MIN_EXPONENT, MAX_EXPONENT)
+    for step in range(SUB_BUCKETS)
+]
+
+METRIC_HELP = {
+    'podcast_http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'podcast_http_responses_total': ('counter', 'Responses by endpoint and status code.'),
+    'podcast_stage_duration_seconds': ('histogram', 'Latency of each stage of request handling.'),
+    'podcast_stage_errors_total': ('counter', 'Stages that raised instead of returning.'),
+    'podcast_cache_requests_total': ('counter', 'Cache lookups by namespace and result.'),
+    'podcast_cache_hit_ratio': ('gauge', 'Cache hits over hits and misses, by namespace.'),
+    'podcast_catalog_podcasts': ('gauge', 'Podcasts in the loaded catalog.'),
+    'podcast_catalog_info': ('gauge', 'Version of the loaded catalog.'),
+    'podcast_admission_total': ('counter', 'Admission decisions by outcome.'),
+    'podcast_admission_in_flight': ('gauge', 'Admitted requests running now.'),
+    'podcast_admission_queue_depth': ('gauge', 'Requests waiting for a slot now.'),
+    'podcast_coalescing_total': ('counter', 'Recommend calls executed or coalesced.'),
+    'podcast_encoding_bytes_total': ('counter', 'Response bytes before and after compression, by endpoint.'),
+    'podcast_profile_provider_total': ('counter', 'Profile provider calls by outcome.'),
+    'podcast_events_total': ('counter', 'Feedback events by outcome: recorded, duplicates, overwritten, written, write_errors.'),
+    'podcast_events_buffered': ('gauge', 'Feedback events waiting to be written.'),
+    'podcast_image_requests_total': ('counter', 'Artwork thumbnail lookups by result: hit, miss, error.'),
+    'podcast_image_cache_bytes': ('gauge', 'Bytes of artwork thumbnails in the disk cache shared by the host.'),
+    'podcast_log_dropped_total': ('counter', 'Log records dropped because the log queue was full.'),
+    'podcast_workers': ('gauge', 'Workers contributing to these metrics.'),
+}
+
+# Gauges every worker reports identically; these are not summed across workers
+SHARED_GAUGES = {'podcast_catalog_podcasts', 'podcast_catalog_info', 'podcast_image_cache_bytes'}
+
+# A collector returns (kind, name, labels, value) samples, kind being counter or gauge
+Sample = Tuple[str, str, Dict[str, str], float]
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Render a label set as Prometheus does, e.g. stage="scoring"."""
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in sorted(labels.items())
+    )
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum."""
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self, counts: Optional[List[int]] = None, total: float = 0.0):
+        self.counts = counts or [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = total
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.total += seconds
+
+    def merge(self, other: 'Histogram') -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+class MetricsRegistry:
+    """Per-worker histograms and counters, plus collectors read at scrape time."""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._flusher_pid = None
+        self._master_pid = None
+
+    @classmethod
+    def from_env(cls) -> 'MetricsRegistry':
+        return cls(
+            os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'podcast-metrics'),
+            float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+        )
+
+    def observe(self, name: str, labels: Dict[str, str], seconds: float) -> None:
+        key = (name, format_labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+        self._ensure_flusher()
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1) -> None:
+        key = (name, format_labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def mark_master(self) -> None:
+        """Mark this process as the gunicorn master, which never flushes a snapshot of its own."""
+        self._master_pid = os.getpid()
+
+    def clear_snapshots(self) -> None:
+        """Remove the snapshots of a previous run, which would otherwise be summed with this one's."""
+        if self.directory is None:
+            return
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Already removed
+
+    def reset_after_fork(self) -> None:
+        """Drop what the parent recorded (e.g. a preload warm-up) so a worker reports only its own."""
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._flusher_pid = None
+
+    def snapshot(self) -> Dict:
+        """Return this worker's metrics in the JSON form written to METRICS_DIR."""
+        counters, gauges = {}, {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                log.error('metrics_error', f"Error collecting metrics: {str(e)}")
+                continue
+            for kind, name, labels, value in samples:
+                target = counters if kind == 'counter' else gauges
+                target.setdefault(name, {})[format_labels(labels)] = value
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                counters.setdefault(name, {})[labels] = value
+            histograms = {}
+            for (name, labels), histogram in self._histograms.items():
+                histograms.setdefault(name, {})[labels] = {'counts': list(histogram.counts), 'sum': histogram.total}
+        return {'pid': os.getpid(), 'histograms': histograms, 'counters': counters, 'gauges': gauges}
+
+    def flush(self, snapshot: Optional[Dict] = None) -> None:
+        """Write this worker's snapshot to METRICS_DIR, atomically."""
+        if self.directory is None or self._master_pid == os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot or self.snapshot(), f)
+        os.replace(path, os.path.join(self.directory, f"{os.getpid()}.json"))
+
+    def _ensure_flusher(self) -> None:
+        # Started lazily so that forked gunicorn workers each get their own
+        if self.directory is None or os.getpid() in (self._flusher_pid, self._master_pid):
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error('metrics_error', f"Error flushing metrics: {str(e)}")
+
+    def _worker_snapshots(self) -> List[Dict]:
+        """Fresh snapshot for this worker and the last flushed one of every other."""
+        own = self.snapshot()
+        if self.directory is None:
+            return [own]
+        self.flush(own)
+        snapshots = [own]
+        for entry in os.listdir(self.directory):
+            if not entry.endswith('.json') or entry == f"{own['pid']}.json":
+                continue
+            try:
+                with open(os.path.join(self.directory, entry)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being replaced or removed
+        return snapshots
+
+    def render(self) -> str:
+        """Aggregate every worker's metrics into the Prometheus text format."""
+        histograms, counters, gauges = {}, {}, {}
+        workers = 0
+        for snapshot in self._worker_snapshots():
+            for name, series in snapshot['histograms'].items():
+                for labels, data in series.items():
+                    merged = histograms.setdefault(name, {}).setdefault(labels, Histogram())
+                    merged.merge(Histogram(data['counts'], data['sum']))
+            # Counters of exited workers still count; their gauges no longer hold
+            for name, series in snapshot['counters'].items():
+                totals = counters.setdefault(name, {})
+                for labels, value in series.items():
+                    totals[labels] = totals.get(labels, 0) + value
+            if not _pid_alive(snapshot['pid']):
+                continue
+            workers += 1
+            for name, series in snapshot['gauges'].items():
+                totals = gauges.setdefault(name, {})
+                for labels, value in series.items():
+                    if name in SHARED_GAUGES:
+                        totals[labels] = value
+                    else:
+                        totals[labels] = totals.get(labels, 0) + value
+
+        gauges['podcast_cache_hit_ratio'] = _hit_ratios(counters.get('podcast_cache_requests_total', {}))
+        gauges['podcast_workers'] = {'': workers}
+
+        lines = []
+        for name in sorted(set(histograms) | set(counters) | set(gauges)):
+            kind = 'histogram' if name in histograms else 'counter' if name in counters else 'gauge'
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, ('', name))[1]}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'histogram':
+                for labels, histogram in sorted(histograms[name].items()):
+                    lines.extend(_histogram_lines(name, labels, histogram))
+            else:
+                for labels, value in sorted((counters if kind == 'counter' else gauges)[name].items()):
+                    lines.append(_sample_line(name, labels, value))
+        return '\n'.join(lines) + '\n'
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _hit_ratios(requests: Dict[str, float]) -> Dict[str, float]:
+    hits, lookups = {}, {}
+    for labels, value in requests.items():
+        pairs = dict(pair.split('=', 1) for pair in labels.split(','))
+        namespace = format_labels({'namespace': pairs['namespace'].strip('"')})
+        if pairs['result'] in ('"hit"', '"miss"'):
+            lookups[namespace] = lookups.get(namespace, 0) + value
+            if pairs['result'] == '"hit"':
+                hits[namespace] = hits.get(namespace, 0) + value
+    return {namespace: hits.get(namespace, 0) / total for namespace, total in lookups.items() if total}
+
+def _sample_line(name: str, labels: str, value: float) -> str:
+    return f"{name}{{{labels}}} {value:g}" if labels else f"{name} {value:g}"
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    prefix = labels + ',' if labels else ''
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKET_BOUNDS, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+    cumulative += histogram.counts[-1]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+    lines.append(_sample_line(f"{name}_sum", labels, histogram.total))
+    lines.append(_sample_line(f"{name}_count", labels, cumulative))
+    return lines
+
+metrics = MetricsRegistry.from_env()
+os.register_at_fork(after_in_child=metrics.reset_after_fork)
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of request handling."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.inc('podcast_stage_errors_total', {'stage': name})
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.observe('podcast_stage_duration_seconds', {'stage': name}, seconds)
+        record_stage(name, seconds)
+
+def timed(name: str):
+    """Decorator form of `stage`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,32 @@
+"""
+Module for rendering guest pitch messages to podcast hosts.
+"""
+from string import Template
+from typing import Dict
+
+from metrics import timed
+
+# Compiled once at import; rendering is a single substitution
+PITCH_TEMPLATE = Template("""Hi $host_name,
+
+I hope this message finds you well! I'm a regular listener of $title and really appreciate your insights on $categories.
+
+I'm reaching out because I believe I could bring valuable insights to your audience. With expertise in $skills and a passion for $interests, I could share unique perspectives on $summary...
+
+I'd love to explore the possibility of being a guest on your show. Would you be open to a conversation about potential collaboration?
+
+Best regards,
+$name""")
+
+@timed('pitch')
+def generate_pitch_message(profile_data: Dict, podcast: Dict) -> str:
+    """Generate a personalized pitch message for the podcast host."""
+    return PITCH_TEMPLATE.substitute(
+        host_name=podcast.get('host_name', 'Host'),
+        title=podcast['title'],
+        categories=', '.join(podcast['categories'][:2]),
+        skills=', '.join(profile_data['skills'][:3]),  # Top 3 skills
+        interests=', '.join(profile_data['interests'][:2]),  # Top 2 interests
+        summary=profile_data['summary'][:100],
+        name=profile_data.get('name', '')
+    )
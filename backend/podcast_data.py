@@ -1,16 +1,30 @@
 """
 Module for scraping and managing podcast data.
 """
-import requests
-from bs4 import BeautifulSoup
+import hashlib
 import json
 import os
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
+from cache import get_cache
+from deadlines import DeadlineExceeded, bounded_timeout
+from logs import get_logger
+from metrics import timed
+
+log = get_logger(__name__)
 
 # Cache file for storing scraped podcast data
 CACHE_FILE = 'podcasts.json'
 
+# Key for the scraped catalog in the shared cache tier
+CATALOG_CACHE_KEY = 'itunes-business'
+
+# Parsed cache file and the catalog version it was read at
+_loaded_catalog = (None, None)
+
+# Podcasts by ID and the catalog version they were indexed at
+_podcasts_by_id = (None, {})
+
 def get_sample_podcasts() -> List[Dict]:
     """Return sample podcast data for testing and fallback."""
     return [
@@ -61,12 +75,17 @@ def scrape_podcasts() -> List[Dict]:
     Scrape podcast data from multiple sources and return a list of podcasts.
     Each podcast has: title, description, image_url, website, categories
     """
+    import requests  # Deferred: only a stale or missing catalog is scraped
+
     podcasts = []
     
     # Try to scrape from various sources
     try:
         # Scrape from iTunes/Apple Podcasts business category
-        response = requests.get('https://itunes.apple.com/us/rss/toppodcasts/limit=100/genre=1321/json')
+        response = requests.get(
+            'https://itunes.apple.com/us/rss/toppodcasts/limit=100/genre=1321/json',
+            timeout=bounded_timeout(10, 'catalog scrape')
+        )
         if response.status_code == 200:
             data = response.json()
             for entry in data.get('feed', {}).get('entry', []):
@@ -78,32 +97,48 @@ def scrape_podcasts() -> List[Dict]:
                     'categories': ['Business', 'Top Rated'],
                     'source': 'iTunes'
                 })
+    except DeadlineExceeded:
+        # Don't let an abandoned request cache the sample fallback
+        raise
     except Exception as e:
-        print(f"Error scraping iTunes: {str(e)}")
+        log.error('scrape_error', f"Error scraping iTunes: {str(e)}")
 
     # If we couldn't get any podcasts, use sample data
     if not podcasts:
-        print("Using sample podcast data as fallback")
+        log.warning('catalog_fallback', "Using sample podcast data as fallback")
         podcasts = get_sample_podcasts()
 
     return podcasts
 
+@timed('load_catalog')
 def load_or_scrape_podcasts() -> List[Dict]:
     """
     Load podcasts from cache file if it exists and is recent,
-    otherwise scrape new data.
+    otherwise scrape new data. The parsed file is reused until it changes,
+    so callers must treat the returned list as read-only.
     """
+    global _loaded_catalog
     if os.path.exists(CACHE_FILE):
         # Check if cache is less than 24 hours old
         if os.path.getmtime(CACHE_FILE) > time.time() - 86400:
+            version = get_catalog_version()
+            if _loaded_catalog[0] == version:
+                return _loaded_catalog[1]
             try:
                 with open(CACHE_FILE, 'r') as f:
-                    return json.load(f)
+                    podcasts = unique_podcasts(json.load(f))
+                _loaded_catalog = (version, podcasts)
+                log.info('catalog_loaded', "Loaded cached podcast data", podcasts=len(podcasts), version=version)
+                return podcasts
             except Exception as e:
-                print(f"Error reading cache file: {str(e)}")
+                log.error('catalog_error', f"Error reading cache file: {str(e)}")
     
-    # Scrape new data
-    podcasts = scrape_podcasts()
+    # Another worker or host may already have scraped a fresh copy
+    podcasts = get_cache().get('catalog', CATALOG_CACHE_KEY)
+    if podcasts is None:
+        # Scrape new data
+        podcasts = unique_podcasts(scrape_podcasts())
+        get_cache().set('catalog', CATALOG_CACHE_KEY, podcasts)
     
     # Save to cache
     with open(CACHE_FILE, 'w') as f:
@@ -111,6 +146,43 @@ def load_or_scrape_podcasts() -> List[Dict]:
     
     return podcasts
 
+def get_podcast_id(podcast: Dict) -> str:
+    """
+    Return a stable identifier for a podcast.
+    Scraped entries carry no ID, so one is derived from the website (or title).
+    """
+    if podcast.get('id'):
+        return str(podcast['id'])
+    key = podcast.get('website') or podcast.get('title', '')
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+def unique_podcasts(podcasts: List[Dict]) -> List[Dict]:
+    """
+    Drop podcasts whose ID repeats an earlier one, keeping the first.
+    Every lookup by ID then agrees on which podcast an ID names.
+    """
+    seen = set()
+    unique = []
+    for podcast in podcasts:
+        podcast_id = get_podcast_id(podcast)
+        if podcast_id not in seen:
+            seen.add(podcast_id)
+            unique.append(podcast)
+    if len(unique) < len(podcasts):
+        log.warning('catalog_duplicates', "Dropped podcasts with duplicate IDs", dropped=len(podcasts) - len(unique))
+    return unique
+
+def get_catalog_version() -> str:
+    """
+    Return a cheap version string for the cached catalog.
+    It changes whenever the cache file is rewritten.
+    """
+    try:
+        stat = os.stat(CACHE_FILE)
+    except OSError:
+        return 'none'
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
 def search_podcasts(query: str, offset: int = 0) -> List[Dict]:
     """
     Search podcasts based on query string.
@@ -131,6 +203,20 @@ def search_podcasts(query: str, offset: int = 0) -> List[Dict]:
     end = start + 10
     return matching_podcasts[start:end]
 
+def get_podcast_by_id(podcast_id: str) -> Optional[Dict]:
+    """
+    Find a podcast by its ID, or None if it is not in the catalog.
+    The index is rebuilt once per catalog version.
+    """
+    global _podcasts_by_id
+    version = get_catalog_version()
+    indexed_version, by_id = _podcasts_by_id
+    if indexed_version != version:
+        # IDs are unique once loaded, so this agrees with the projection index
+        by_id = {get_podcast_id(podcast): podcast for podcast in load_or_scrape_podcasts()}
+        _podcasts_by_id = (version, by_id)
+    return by_id.get(podcast_id)
+
 def get_all_podcasts() -> List[Dict]:
     """
     Get all available podcasts.
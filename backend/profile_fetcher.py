@@ -0,0 +1,339 @@
+"""
+Module for fetching LinkedIn profiles from an external profile provider.
+
+The fetcher keeps a pool of keep-alive connections to the provider and puts
+three guards in front of it:
+
+- a token-bucket rate limiter shared by every worker on the host through a
+  SQLite file, so the provider sees one budget however many workers run
+- hedged retries: if the provider has not answered after `hedge_after`
+  seconds a second attempt is raced against the first, all within a deadline
+- a circuit breaker that fails fast while the provider is down
+
+See stub_profile_provider.py for a local provider with injectable latency.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+from deadlines import bounded_timeout
+
+class ProfileFetchError(Exception):
+    """The profile provider could not return a profile in time."""
+
+class RateLimitedError(ProfileFetchError):
+    """No rate limit token became available before the deadline."""
+
+class ProviderThrottledError(ProfileFetchError):
+    """The provider answered 429; `retry_after` is how many seconds it asked us to wait."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Profile provider is throttling requests (retry after {retry_after:g}s)")
+        self.retry_after = retry_after
+
+class ProfileNotFoundError(ValueError):
+    """The provider has no profile for the username."""
+
+class CircuitOpenError(ProfileFetchError):
+    """The provider is failing and calls are being short-circuited."""
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Seconds from a Retry-After header; HTTP dates and junk fall back to `default`."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+class TokenBucket:
+    """In-process token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+class SQLiteTokenBucket:
+    """Token bucket whose state lives in a SQLite file shared by worker processes."""
+
+    def __init__(self, path: str, rate: float, capacity: float, name: str = 'profile-provider'):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        connection.execute(
+            'INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+            (name, capacity, time.time())
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            tokens, updated = connection.execute(
+                'SELECT tokens, updated FROM buckets WHERE name = ?', (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            wait_for = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_for = (1 - tokens) / self.rate
+            connection.execute(
+                'UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?', (tokens, now, self.name)
+            )
+            connection.execute('COMMIT')
+            return wait_for
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return whether a call may go through right now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class ProfileFetcher:
+    """Fetches profile JSON from `{base_url}/profiles/{username}`."""
+
+    def __init__(self, base_url: str, rate_limiter=None, breaker: Optional[CircuitBreaker] = None,
+                 pool_size: int = 10, deadline: float = 3.0, hedge_after: float = 0.5,
+                 max_attempts: int = 3):
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.max_attempts = max_attempts
+
+        # Imported here so workers without a provider never load requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # Keep-alive connections to the provider, reused across requests
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size)
+
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'hedged': 0, 'throttled': 0, 'failures': 0, 'short_circuited': 0,
+                       'rate_limited': 0}
+
+    @classmethod
+    def from_env(cls) -> Optional['ProfileFetcher']:
+        """Build a fetcher from PROFILE_PROVIDER_URL, or None to keep mock profiles."""
+        base_url = os.environ.get('PROFILE_PROVIDER_URL')
+        if not base_url:
+            return None
+        rate = float(os.environ.get('PROFILE_RATE_LIMIT', 10))
+        burst = float(os.environ.get('PROFILE_RATE_BURST', rate))
+        # One bucket for every worker on the host; the limit is the provider's, not a worker's
+        bucket_path = os.environ.get('PROFILE_RATE_LIMIT_DB') or \
+            os.path.join(tempfile.gettempdir(), 'podcast-profile-rate.sqlite3')
+        return cls(
+            base_url,
+            rate_limiter=SQLiteTokenBucket(bucket_path, rate, burst),
+            breaker=CircuitBreaker(
+                int(os.environ.get('PROFILE_BREAKER_FAILURES', 5)),
+                float(os.environ.get('PROFILE_BREAKER_RESET', 30))
+            ),
+            pool_size=int(os.environ.get('PROFILE_POOL_SIZE', 10)),
+            deadline=float(os.environ.get('PROFILE_DEADLINE', 3)),
+            hedge_after=float(os.environ.get('PROFILE_HEDGE_AFTER', 0.5))
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, breaker=self.breaker.state)
+
+    def _acquire_token(self, deadline: float) -> None:
+        if self.rate_limiter is None:
+            return
+        while True:
+            wait_for = self.rate_limiter.try_acquire()
+            if not wait_for:
+                return
+            if time.monotonic() + wait_for > deadline:
+                self._count('rate_limited')
+                raise RateLimitedError("Profile provider rate limit exceeded")
+            time.sleep(wait_for)
+
+    def _get(self, username: str, timeout: float) -> Dict:
+        self._count('requests')
+        response = self._session.get(f"{self.base_url}/profiles/{username}", timeout=max(timeout, 0.01))
+        if response.status_code == 404:
+            raise ProfileNotFoundError(f"LinkedIn profile not found: {username}")
+        if response.status_code == 429:
+            raise ProviderThrottledError(parse_retry_after(response.headers.get('Retry-After')))
+        response.raise_for_status()
+        return response.json()
+
+    def fetch(self, username: str) -> Dict:
+        """
+        Return the provider's profile for a username.
+        Raises ProfileNotFoundError for unknown profiles and ProfileFetchError
+        when the provider is down, rate limited or misses the deadline. A 429
+        is retried once the provider's Retry-After has passed, deadline allowing.
+        """
+        deadline = time.monotonic() + bounded_timeout(self.deadline, 'profile fetch')
+        # Waiting on the rate limiter says nothing about provider health,
+        # so it happens before the breaker hands out a (half-open) trial
+        self._acquire_token(deadline)
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpenError("Profile provider is unavailable, try again later")
+
+        pending = {self._executor.submit(self._get, username, deadline - time.monotonic())}
+        attempts = 1
+        last_error = None
+        retry_at = 0.0
+        try:
+            while pending and time.monotonic() < deadline:
+                # Wait for an answer, or until it is time to hedge with another attempt
+                timeout = deadline - time.monotonic()
+                if attempts < self.max_attempts:
+                    timeout = min(timeout, self.hedge_after)
+                done, pending = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    try:
+                        profile = future.result()
+                    except ProfileNotFoundError:
+                        # The provider answered; the profile just does not exist
+                        self.breaker.record_success()
+                        raise
+                    except ProviderThrottledError as e:
+                        self._count('throttled')
+                        last_error = e
+                        retry_at = max(retry_at, time.monotonic() + e.retry_after)
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    self.breaker.record_success()
+                    return profile
+
+                # A throttled provider is only asked again once its Retry-After has passed
+                if attempts < self.max_attempts and not pending and time.monotonic() < retry_at < deadline:
+                    time.sleep(retry_at - time.monotonic())
+
+                # Retry after a failure, or hedge a slow attempt, if a token is free right now
+                if attempts < self.max_attempts and retry_at <= time.monotonic() < deadline and \
+                        (self.rate_limiter is None or not self.rate_limiter.try_acquire()):
+                    if not done:
+                        self._count('hedged')
+                    pending.add(self._executor.submit(self._get, username, deadline - time.monotonic()))
+                    attempts += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+        self._count('failures')
+        if isinstance(last_error, ProviderThrottledError) and not pending:
+            # Throttling says the provider is up, so it does not count against the breaker
+            self.breaker.record_success()
+            raise last_error
+        self.breaker.record_failure()
+        if last_error is not None and not pending:
+            raise ProfileFetchError(f"Profile provider failed: {str(last_error)}")
+        raise ProfileFetchError("Profile provider timed out")
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+_fetcher_loaded = False
+
+def get_profile_fetcher() -> Optional[ProfileFetcher]:
+    """Return the process-wide fetcher, or None when no provider is configured."""
+    global _fetcher, _fetcher_loaded
+    if not _fetcher_loaded:
+        with _fetcher_lock:
+            if not _fetcher_loaded:
+                _fetcher = ProfileFetcher.from_env()
+                _fetcher_loaded = True
+    return _fetcher
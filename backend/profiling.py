@@ -0,0 +1,273 @@
+"""
+Module for sampling profiles of production requests.
+
+A sampler on a real OS thread (not a gevent greenlet, so it keeps running
+while a request is busy on the CPU) periodically records the stack of the
+request being profiled and folds the samples into collapsed stacks, one
+"frame;frame;frame count" line per distinct stack, which flamegraph.pl,
+speedscope and similar tools read directly.
+
+Per-request profiles are opt-in and admin-gated: PROFILING_TOKEN must be set
+and the request must carry it in X-Admin-Token along with `X-Profile: 1` or
+`?profile=1`. Under gevent, samples taken while the request's greenlet is
+suspended record where it is waiting, under a "[waiting]" root frame.
+
+With PROFILING_BACKGROUND_HZ set, each worker also samples all of its threads
+continuously and writes one folded profile per PROFILING_WINDOW seconds. The
+sampling rate backs off whenever measured sampling cost would exceed
+PROFILING_OVERHEAD_BUDGET (1%) of wall time.
+"""
+import _thread
+import hmac
+import os
+import re
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from logs import get_logger
+
+# The sampler needs real threads. If gevent has already patched the stdlib,
+# ask it for the originals; otherwise the stdlib ones are still original.
+if 'gevent.monkey' in sys.modules:
+    _monkey = sys.modules['gevent.monkey']
+    _start_thread = _monkey.get_original('_thread', 'start_new_thread')
+    _get_ident = _monkey.get_original('_thread', 'get_ident')
+    _allocate_lock = _monkey.get_original('_thread', 'allocate_lock')
+    _sleep = _monkey.get_original('time', 'sleep')
+else:
+    _start_thread, _get_ident, _allocate_lock, _sleep = (
+        _thread.start_new_thread, _thread.get_ident, _thread.allocate_lock, time.sleep
+    )
+
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+MAX_STACK_DEPTH = 128
+PROFILE_ID_PATTERN = re.compile(r'^[\w\-]{1,64}$')
+
+log = get_logger(__name__)
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    filename = '/'.join(code.co_filename.replace('\\', '/').rsplit('/', 2)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+def fold_stack(frame, root: Optional[str] = None) -> str:
+    """Collapse a frame and its callers into one root-first line."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    if root:
+        labels.append(root)
+    return ';'.join(reversed(labels))
+
+def render_folded(samples: Counter) -> str:
+    return ''.join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+class StackSampler:
+    """
+    Samples stacks on a real thread until stopped. With `thread_id` only that
+    thread is sampled (and, given `target`, only while that greenlet runs);
+    otherwise every thread but the sampler's own is.
+    """
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None, target=None,
+                 overhead_budget: Optional[float] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.target = target
+        self.overhead_budget = overhead_budget
+        self.samples = Counter()
+        self.sample_count = 0
+        self.sampling_seconds = 0.0
+        self.started = time.monotonic()
+        self._lock = _allocate_lock()
+        self._running = False
+        self._own_thread = None
+
+    def start(self) -> 'StackSampler':
+        self._running = True
+        self.started = time.monotonic()
+        _start_thread(self._run, ())
+        return self
+
+    def stop(self) -> Counter:
+        with self._lock:
+            self._running = False
+            return self.samples
+
+    def take(self) -> Counter:
+        """Return the samples so far and start a fresh window."""
+        with self._lock:
+            samples, self.samples = self.samples, Counter()
+            return samples
+
+    def overhead(self) -> float:
+        """Fraction of wall time spent sampling."""
+        elapsed = time.monotonic() - self.started
+        return self.sampling_seconds / elapsed if elapsed > 0 else 0.0
+
+    def _run(self) -> None:
+        self._own_thread = _get_ident()
+        interval = self.interval
+        while True:
+            _sleep(interval)
+            with self._lock:
+                if not self._running:
+                    return
+                started = time.perf_counter()
+                self._sample()
+                cost = time.perf_counter() - started
+                self.sampling_seconds += cost
+                self.sample_count += 1
+            if self.overhead_budget:
+                # Keep cost / (interval + cost) under budget
+                interval = max(self.interval, cost / self.overhead_budget)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        if self.thread_id is None:
+            for thread_id, frame in frames.items():
+                if thread_id != self._own_thread:
+                    self.samples[fold_stack(frame)] += 1
+            return
+
+        target = self.target
+        if target is not None and target.gr_frame is not None:
+            # A suspended greenlet keeps its frame; the thread is running another
+            self.samples[fold_stack(target.gr_frame, '[waiting]')] += 1
+        elif target is None or not target.dead:
+            frame = frames.get(self.thread_id)
+            if frame is not None:
+                self.samples[fold_stack(frame)] += 1
+
+class Profiler:
+    """Per-request and background sampling for one worker, with a shared profile store."""
+
+    def __init__(self, token: Optional[str], directory: str, interval: float = 0.005,
+                 background_hz: float = 0.0, window: float = 60.0, overhead_budget: float = 0.01,
+                 keep: int = 100):
+        self.token = token
+        self.directory = directory
+        self.interval = interval
+        self.background_hz = background_hz
+        self.window = window
+        self.overhead_budget = overhead_budget
+        self.keep = keep
+        self._background = None
+        self._background_pid = None
+        self._lock = _allocate_lock()
+
+    @classmethod
+    def from_env(cls) -> 'Profiler':
+        return cls(
+            os.environ.get('PROFILING_TOKEN') or None,
+            os.environ.get('PROFILING_DIR') or os.path.join(tempfile.gettempdir(), 'podcast-profiles'),
+            float(os.environ.get('PROFILING_INTERVAL', 0.005)),
+            float(os.environ.get('PROFILING_BACKGROUND_HZ', 0)),
+            float(os.environ.get('PROFILING_WINDOW', 60)),
+            float(os.environ.get('PROFILING_OVERHEAD_BUDGET', 0.01)),
+            int(os.environ.get('PROFILING_KEEP', 100))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def is_admin(self, presented: Optional[str]) -> bool:
+        return self.enabled and presented is not None and hmac.compare_digest(presented, self.token)
+
+    def profile_id(self, requested: Optional[str]) -> str:
+        """Use the caller's request ID when it is safe as a file name."""
+        if requested and PROFILE_ID_PATTERN.match(requested):
+            return requested
+        return uuid.uuid4().hex
+
+    def start_request(self) -> StackSampler:
+        """Start sampling the calling request until `finish_request`."""
+        target = greenlet.getcurrent() if greenlet is not None else None
+        return StackSampler(self.interval, _get_ident(), target).start()
+
+    def finish_request(self, sampler: StackSampler, profile_id: str) -> None:
+        self.save(profile_id, sampler.stop())
+
+    def save(self, name: str, samples: Counter) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            f.write(render_folded(samples))
+        os.replace(path, os.path.join(self.directory, f"{name}.folded"))
+        self._prune()
+
+    def load(self, name: str) -> Optional[str]:
+        if not PROFILE_ID_PATTERN.match(name):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{name}.folded")) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def list_profiles(self) -> List[Dict]:
+        """Stored profiles, newest first."""
+        profiles = []
+        try:
+            entries = os.listdir(self.directory)
+        except OSError:
+            return profiles
+        for entry in entries:
+            if not entry.endswith('.folded'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, entry))
+            except OSError:
+                continue
+            profiles.append({'id': entry[:-len('.folded')], 'bytes': stat.st_size, 'modified': stat.st_mtime})
+        return sorted(profiles, key=lambda p: p['modified'], reverse=True)
+
+    def _prune(self) -> None:
+        for stale in self.list_profiles()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, f"{stale['id']}.folded"))
+            except OSError:
+                pass
+
+    def ensure_background(self) -> None:
+        """Start this worker's background sampler, once per process."""
+        if self.background_hz <= 0 or self._background_pid == os.getpid():
+            return
+        with self._lock:
+            if self._background_pid == os.getpid():
+                return
+            self._background_pid = os.getpid()
+            self._background = StackSampler(1.0 / self.background_hz, overhead_budget=self.overhead_budget).start()
+        _start_thread(self._write_windows, ())
+
+    def _write_windows(self) -> None:
+        while True:
+            _sleep(self.window)
+            samples = self._background.take()
+            if samples:
+                try:
+                    self.save(f"background-{os.getpid()}-{int(time.time())}", samples)
+                except Exception as e:
+                    log.error('profile_error', f"Error writing background profile: {str(e)}")
+
+    def stats(self) -> Dict:
+        background = self._background
+        return {
+            'enabled': self.enabled,
+            'background': None if background is None else {
+                'samples': background.sample_count,
+                'overhead': round(background.overhead(), 5)
+            }
+        }
+
+profiler = Profiler.from_env()
@@ -0,0 +1,162 @@
+"""
+Module for projecting podcasts into API response shapes.
+
+Clients can ask /api/recommend for a subset of recommendation fields
+(`fields=`), for which optional sections to include (`include=`), or for a
+`compact` shape of IDs, titles and truncated snippets. The per-podcast part
+of each projection is built once per catalog version and field set, so a
+request only attaches its own reasons.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+from podcast_data import get_all_podcasts, get_catalog_version, get_podcast_id
+
+# Recommendation fields in response order; 'reasons' is per request
+RECOMMENDATION_FIELDS = (
+    'id', 'title', 'description', 'snippet', 'image', 'website',
+    'categories', 'reasons', 'host_name', 'host_email'
+)
+DEFAULT_FIELDS = ('id', 'title', 'description', 'image', 'website', 'categories', 'reasons', 'host_name', 'host_email')
+COMPACT_FIELDS = ('id', 'title', 'snippet')
+
+# Optional top-level sections of the recommend response
+INCLUDE_SECTIONS = ('profile',)
+DEFAULT_INCLUDE = frozenset(INCLUDE_SECTIONS)
+
+SNIPPET_LENGTH = 140
+MAX_CACHED_VIEWS = 32
+
+class ProjectionError(ValueError):
+    """A projection parameter named an unknown field or section."""
+
+def make_snippet(text: str, length: int = SNIPPET_LENGTH) -> str:
+    """Truncate text at a word boundary, marking the cut with an ellipsis."""
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:') + '…'
+
+def project_podcast(podcast: Mapping, podcast_id: str, fields: Sequence[str]) -> Dict:
+    """Build the static (request independent) projection of one podcast."""
+    projected = {}
+    for field in fields:
+        if field == 'id':
+            projected['id'] = podcast_id
+        elif field == 'snippet':
+            projected['snippet'] = make_snippet(podcast.get('description', ''))
+        elif field == 'host_name':
+            projected['host_name'] = podcast.get('host_name', 'Host')  # Default to 'Host' if not specified
+        elif field == 'host_email':
+            projected['host_email'] = podcast.get('host_email', '')
+        elif field != 'reasons':
+            projected[field] = podcast.get(field, '')
+    return projected
+
+def parse_projection(args: Mapping[str, str]) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    """
+    Read fields=, include= and compact= from request arguments.
+    Returns the recommendation fields (in response order) and the sections to include.
+    """
+    compact = args.get('compact', '').lower() in ('1', 'true', 'yes')
+
+    fields_arg = args.get('fields')
+    if fields_arg:
+        requested = {field.strip() for field in fields_arg.split(',') if field.strip()}
+        unknown = requested.difference(RECOMMENDATION_FIELDS)
+        if unknown:
+            raise ProjectionError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        requested.add('id')
+        fields = tuple(field for field in RECOMMENDATION_FIELDS if field in requested)
+    else:
+        fields = COMPACT_FIELDS if compact else DEFAULT_FIELDS
+
+    include_arg = args.get('include')
+    if include_arg is not None:
+        include = frozenset(section.strip() for section in include_arg.split(',') if section.strip())
+        unknown = include.difference(INCLUDE_SECTIONS)
+        if unknown:
+            raise ProjectionError(f"Unknown include sections: {', '.join(sorted(unknown))}")
+    else:
+        include = frozenset() if compact else DEFAULT_INCLUDE
+
+    return fields, include
+
+class ProjectionIndex:
+    """Per-podcast projections of one catalog version, memoized per field set."""
+
+    def __init__(self, podcasts: Sequence[Dict]):
+        self.podcasts = podcasts
+        self.ids = [get_podcast_id(podcast) for podcast in podcasts]
+        self._positions = {podcast_id: i for i, podcast_id in enumerate(self.ids)}
+        self._lock = threading.Lock()
+        self._views = OrderedDict()
+
+    def view(self, fields: Tuple[str, ...]) -> List[Dict]:
+        """Return the projection of every podcast for a field set, in catalog order."""
+        with self._lock:
+            view = self._views.get(fields)
+            if view is not None:
+                self._views.move_to_end(fields)
+                return view
+        view = [project_podcast(p, pid, fields) for p, pid in zip(self.podcasts, self.ids)]
+        with self._lock:
+            self._views[fields] = view
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    def project(self, podcast_id: str, fields: Tuple[str, ...], reasons: Optional[List[str]] = None,
+                podcast: Optional[Mapping] = None) -> Dict:
+        """
+        Project one recommendation. Podcasts outside this catalog (e.g. from
+        shard nodes) are projected from `podcast` on the fly.
+        """
+        position = self._positions.get(podcast_id)
+        if position is not None:
+            projected = self.view(fields)[position]
+        else:
+            projected = project_podcast(podcast or {}, podcast_id, fields)
+        if 'reasons' in fields:
+            return dict(projected, reasons=reasons or [])
+        return projected
+
+_index = (None, None)
+_index_lock = threading.Lock()
+
+def get_projection_index() -> ProjectionIndex:
+    """Return the projection index for the current catalog version."""
+    global _index
+    version = get_catalog_version()
+    with _index_lock:
+        if _index[0] != version:
+            _index = (version, ProjectionIndex(get_all_podcasts()))
+        return _index[1]
+
+def peek_projection_index() -> Optional[ProjectionIndex]:
+    """Return the index of the current catalog version if one is built, without building it."""
+    version = get_catalog_version()
+    with _index_lock:
+        return _index[1] if _index[0] == version else None
+
+def apply_projection(payload: Dict, fields: Tuple[str, ...], include: FrozenSet[str],
+                     index: Optional[ProjectionIndex] = None) -> Dict:
+    """
+    Shape a full recommend payload for the requested projection, from the
+    catalog's projection index unless another `index` is given.
+    """
+    if fields == DEFAULT_FIELDS and include == DEFAULT_INCLUDE:
+        return payload
+    index = index or get_projection_index()
+    projected = {
+        'recommendations': [
+            index.project(rec['id'], fields, rec.get('reasons'), rec)
+            for rec in payload['recommendations']
+        ],
+        'profileRef': payload['profileRef']
+    }
+    for section in include:
+        projected[section] = payload[section]
+    return projected
@@ -0,0 +1,119 @@
+"""
+Module for a tiny in-memory server speaking the Redis protocol.
+
+It implements just the commands the cache tier uses (PING, GET, SET with
+EX/PX, DEL, FLUSHDB, DBSIZE, SELECT, AUTH) so the redis cache backend can be
+exercised locally without a Redis install:
+    python resp_server.py --port 6380
+    CACHE_BACKEND=redis REDIS_URL=redis://127.0.0.1:6380/0 python app.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+class RespStore:
+    """Key/value store with millisecond expiry."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self.data[key]
+                return None
+            return value
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection."""
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            self.wfile.write(self._execute(command))
+            self.wfile.flush()
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Inline command, as sent by telnet or redis-cli --no-raw
+            return line.strip().split()
+        parts = []
+        for _ in range(int(line[1:-2])):
+            header = self.rfile.readline()
+            if not header.startswith(b'$'):
+                raise ValueError("Expected a bulk string")
+            length = int(header[1:-2])
+            parts.append(self.rfile.read(length + 2)[:-2])
+        return parts
+
+    def _execute(self, command: List[bytes]) -> bytes:
+        store = self.server.store
+        name = command[0].upper() if command else b''
+        args = command[1:]
+
+        if name == b'PING':
+            return b'+PONG\r\n'
+        if name in (b'AUTH', b'SELECT'):
+            return b'+OK\r\n'
+        if name == b'GET' and len(args) == 1:
+            value = store.get(args[0])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+        if name == b'SET' and len(args) >= 2:
+            expires = None
+            options = [a.upper() for a in args[2:]]
+            if b'EX' in options:
+                expires = time.time() + float(args[2 + options.index(b'EX') + 1])
+            elif b'PX' in options:
+                expires = time.time() + float(args[2 + options.index(b'PX') + 1]) / 1000
+            with store.lock:
+                store.data[args[0]] = (args[1], expires)
+            return b'+OK\r\n'
+        if name == b'DEL':
+            with store.lock:
+                removed = sum(1 for key in args if store.data.pop(key, None) is not None)
+            return b':%d\r\n' % removed
+        if name == b'DBSIZE':
+            with store.lock:
+                return b':%d\r\n' % len(store.data)
+        if name == b'FLUSHDB':
+            with store.lock:
+                store.data.clear()
+            return b'+OK\r\n'
+        return b'-ERR unknown command or wrong number of arguments\r\n'
+
+class RespServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int]):
+        super().__init__(address, RespHandler)
+        self.store = RespStore()
+
+def start_resp_server(host: str = '127.0.0.1', port: int = 0) -> RespServer:
+    """Start a server on a background thread; port 0 picks a free port."""
+    server = RespServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local Redis-protocol stand-in server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+    print(f"Listening on redis://{args.host}:{args.port}/0")
+    RespServer((args.host, args.port)).serve_forever()
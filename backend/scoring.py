@@ -0,0 +1,133 @@
+"""
+Module for scoring podcasts against an analyzed LinkedIn profile.
+"""
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from deadlines import DeadlineExceeded
+
+# A podcast reduced to the fields scoring looks at:
+# (lowercase title, lowercase description, lowercase categories, categories)
+PreparedPodcast = Tuple[str, str, Tuple[str, ...], Tuple[str, ...]]
+
+# A ranked result: (score, catalog index, reasons)
+ScoredPodcast = Tuple[int, int, List[str]]
+
+# How many podcasts to score between deadline checks
+DEADLINE_CHECK_INTERVAL = 256
+
+def prepare_podcast(podcast: Dict) -> PreparedPodcast:
+    """Lowercase the searchable fields of a podcast once, up front."""
+    categories = tuple(podcast.get('categories', []))
+    return (
+        podcast.get('title', '').lower(),
+        podcast.get('description', '').lower(),
+        tuple(category.lower() for category in categories),
+        categories
+    )
+
+def score_podcast(prepared: PreparedPodcast, analysis: Dict, wants_to_be_featured: bool,
+                  prior: int = 0, similarity: int = 0) -> Tuple[int, List[str]]:
+    """
+    Score a single prepared podcast against a profile analysis.
+    `similarity` is the bonus for being semantically close to the profile
+    (see similarity.py). `prior` is the podcast's popularity bonus from
+    listener feedback, only added to podcasts that are relevant on their own.
+    Returns the score and the human readable reasons behind it.
+    """
+    title, description, categories_lower, categories = prepared
+    score = 0
+    reasons = []
+
+    # Score based on keywords from profile
+    matching_keywords = []
+    for keyword in analysis['keywords']:
+        keyword_lower = keyword.lower()
+        if keyword_lower in title:
+            score += 3
+            matching_keywords.append(keyword)
+        elif keyword_lower in description:
+            score += 2
+            matching_keywords.append(keyword)
+    if matching_keywords:
+        reasons.append(f"Matches your expertise in: {', '.join(matching_keywords)}")
+
+    # Score based on categories
+    matching_categories = []
+    for category in analysis['categories']:
+        category_lower = category.lower()
+        if category_lower in title:
+            score += 3
+            matching_categories.append(category)
+        elif category_lower in description:
+            score += 2
+            matching_categories.append(category)
+        elif any(category_lower in pc for pc in categories_lower):
+            score += 2
+            matching_categories.append(category)
+    if matching_categories:
+        reasons.append(f"Aligns with your interests in: {', '.join(dict.fromkeys(matching_categories))}")
+
+    # Add bonus points for featured opportunities if user wants to be featured
+    if wants_to_be_featured:
+        matching_opportunities = []
+        for opportunity in analysis['featured_opportunities']:
+            if opportunity.lower() in title or opportunity.lower() in description:
+                score += 4
+                matching_opportunities.append(opportunity)
+        if matching_opportunities:
+            reasons.append("Perfect for guest appearances based on your profile")
+
+    # Add bonus points for top-rated and featured podcasts
+    if 'Top Rated' in categories:
+        score += 3
+        reasons.append("Highly rated by listeners")
+    if 'Featured' in categories:
+        score += 2
+        reasons.append("Featured podcast")
+
+    if similarity:
+        score += similarity
+        reasons.append("Related to topics in your profile")
+
+    if prior and score > 0:
+        score += prior
+        reasons.append("Popular with other listeners")
+
+    return score, reasons
+
+def rank_prepared(prepared: Sequence[PreparedPodcast], analysis: Dict, wants_to_be_featured: bool,
+                  k: int = 10, offset: int = 0, deadline: Optional[float] = None,
+                  priors: Optional[Sequence[int]] = None,
+                  similar: Optional[Dict[int, int]] = None) -> List[ScoredPodcast]:
+    """
+    Score a run of prepared podcasts and return the top k with a positive score.
+    `offset` is the catalog index of the first entry, so results from
+    different shards of the same catalog can be merged. Scoring is abandoned
+    with DeadlineExceeded once `deadline` (a time.monotonic value) passes.
+    `priors`, when given, holds each entry's popularity bonus by position;
+    `similar` maps catalog indexes to similarity bonuses.
+    """
+    scored = []
+    for i, podcast in enumerate(prepared):
+        if deadline is not None and i % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            raise DeadlineExceeded("Deadline exceeded during scoring")
+        score, reasons = score_podcast(podcast, analysis, wants_to_be_featured,
+                                       priors[i] if priors is not None else 0,
+                                       similar.get(offset + i, 0) if similar else 0)
+        if score > 0:  # Only include podcasts with some relevance
+            scored.append((score, offset + i, reasons))
+    return merge_top_k([scored], k)
+
+def rank_podcasts(podcasts: Sequence[Dict], analysis: Dict, wants_to_be_featured: bool,
+                  k: int = 10, deadline: Optional[float] = None) -> List[ScoredPodcast]:
+    """Score a full catalog in-process and return the top k."""
+    return rank_prepared([prepare_podcast(p) for p in podcasts], analysis, wants_to_be_featured, k, deadline=deadline)
+
+def merge_top_k(partials: Iterable[Iterable[ScoredPodcast]], k: int = 10) -> List[ScoredPodcast]:
+    """
+    Merge ranked lists into one top k list.
+    Ties keep catalog order, matching a stable sort of the whole catalog.
+    """
+    return heapq.nlargest(k, (r for partial in partials for r in partial), key=lambda r: (r[0], -r[1]))
@@ -0,0 +1,205 @@
+"""
+Module for scoring the podcast catalog in a pool of worker processes.
+
+The catalog is published once into `multiprocessing.shared_memory` segments:
+a blob holding the prepared text fields of every podcast and an int64 offset
+array into it. Worker processes attach to the segments and decode their shard
+once per catalog version, so a scoring request only ships the profile analysis
+to the workers and the shard-local top k back.
+"""
+import array
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from scoring import PreparedPodcast, ScoredPodcast, prepare_podcast, rank_prepared, merge_top_k
+
+# Fields stored per podcast: lowercase title, lowercase description, categories
+FIELDS_PER_PODCAST = 3
+CATEGORY_SEPARATOR = '\x1f'
+
+# (blob segment name, offsets segment name, number of podcasts)
+CatalogHandle = Tuple[str, str, int]
+
+def publish_catalog(podcasts: Sequence[Dict]) -> Tuple[shared_memory.SharedMemory, shared_memory.SharedMemory]:
+    """
+    Copy the prepared catalog into a pair of new shared memory segments.
+    The caller owns the segments and must close and unlink them.
+    """
+    chunks = []
+    offsets = array.array('q', [0])
+    position = 0
+    for podcast in podcasts:
+        title, description, _, categories = prepare_podcast(podcast)
+        for field in (title, description, CATEGORY_SEPARATOR.join(categories)):
+            encoded = field.encode('utf-8')
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+
+    blob = b''.join(chunks)
+    blob_shm = shared_memory.SharedMemory(create=True, size=max(len(blob), 1))
+    blob_shm.buf[:len(blob)] = blob
+    offsets_bytes = offsets.tobytes()
+    offsets_shm = shared_memory.SharedMemory(create=True, size=len(offsets_bytes))
+    offsets_shm.buf[:len(offsets_bytes)] = offsets_bytes
+    return blob_shm, offsets_shm
+
+def read_shard(blob: memoryview, offsets: memoryview, start: int, stop: int) -> List[PreparedPodcast]:
+    """Decode podcasts [start, stop) from published catalog buffers."""
+    positions = offsets.cast('q')
+    shard = []
+    for index in range(start, stop):
+        base = index * FIELDS_PER_PODCAST
+        fields = [
+            bytes(blob[positions[base + f]:positions[base + f + 1]]).decode('utf-8')
+            for f in range(FIELDS_PER_PODCAST)
+        ]
+        categories = tuple(fields[2].split(CATEGORY_SEPARATOR)) if fields[2] else ()
+        shard.append((fields[0], fields[1], tuple(c.lower() for c in categories), categories))
+    positions.release()
+    return shard
+
+# Worker process state: decoded shards of the current catalog only
+_worker_catalog = None
+_worker_shards = {}
+
+def _worker_shard(handle: CatalogHandle, start: int, stop: int) -> List[PreparedPodcast]:
+    """Return a decoded shard, attaching to the catalog segments if needed."""
+    global _worker_catalog
+    if _worker_catalog is None or _worker_catalog[0] != handle:
+        if _worker_catalog is not None:
+            _worker_catalog[1].close()
+            _worker_catalog[2].close()
+        _worker_shards.clear()
+        _worker_catalog = (
+            handle,
+            shared_memory.SharedMemory(name=handle[0]),
+            shared_memory.SharedMemory(name=handle[1])
+        )
+    if (start, stop) not in _worker_shards:
+        _, blob_shm, offsets_shm = _worker_catalog
+        _worker_shards[(start, stop)] = read_shard(blob_shm.buf, offsets_shm.buf, start, stop)
+    return _worker_shards[(start, stop)]
+
+def _score_shard(handle: CatalogHandle, start: int, stop: int, analysis: Dict,
+                 wants_to_be_featured: bool, k: int, deadline: Optional[float],
+                 priors: Optional[bytes] = None, similar: Optional[Dict[int, int]] = None) -> List[ScoredPodcast]:
+    """Worker entry point: score one shard and return its local top k."""
+    shard = _worker_shard(handle, start, stop)
+    # time.monotonic is system wide on Linux, so the parent's deadline holds here
+    return rank_prepared(shard, analysis, wants_to_be_featured, k, offset=start, deadline=deadline,
+                         priors=array.array('b', priors) if priors is not None else None, similar=similar)
+
+class ScoringExecutor:
+    """
+    Shards the catalog across a process pool and merges shard-local top k
+    results in the parent. `submit` returns a future, so a gevent worker only
+    waits on it instead of burning its event loop on scoring.
+    """
+
+    def __init__(self, workers: int, shards: Optional[int] = None, start_method: str = 'spawn'):
+        self.workers = workers
+        self.shards = shards or workers
+        self._context = multiprocessing.get_context(start_method)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._version = None
+        self._handle = None
+        self._segments = []
+        self._retired = []
+
+    @classmethod
+    def from_env(cls) -> Optional['ScoringExecutor']:
+        """Build an executor from SCORING_WORKERS, or None when it is disabled."""
+        workers = int(os.environ.get('SCORING_WORKERS', 0))
+        if workers <= 0:
+            return None
+        shards = int(os.environ.get('SCORING_SHARDS', 0)) or None
+        return cls(workers, shards, os.environ.get('SCORING_START_METHOD', 'spawn'))
+
+    def load_catalog(self, podcasts: Sequence[Dict], version: str) -> None:
+        """Publish the catalog to shared memory unless this version already is."""
+        with self._lock:
+            if version == self._version:
+                return
+            blob_shm, offsets_shm = publish_catalog(podcasts)
+            # Keep the previous generation alive so in-flight tasks can still attach
+            self._unlink(self._retired)
+            self._retired = self._segments
+            self._segments = [blob_shm, offsets_shm]
+            self._handle = (blob_shm.name, offsets_shm.name, len(podcasts))
+            self._version = version
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context)
+
+    def submit(self, analysis: Dict, wants_to_be_featured: bool, k: int = 10,
+               deadline: Optional[float] = None, priors: Optional[array.array] = None,
+               similar: Optional[Dict[int, int]] = None) -> Future:
+        """
+        Score the published catalog; the future resolves to the merged top k.
+        Shards still queued or running past `deadline` are abandoned. Each
+        shard is sent its slice of `priors`, one byte per podcast, and the
+        `similar` bonuses that fall in its range.
+        """
+        with self._lock:
+            if self._handle is None:
+                raise RuntimeError("No catalog loaded into the scoring executor")
+            handle, pool = self._handle, self._pool
+
+        count = handle[2]
+        shard_size = max(1, -(-count // self.shards))
+        bounds = [(start, min(start + shard_size, count)) for start in range(0, count, shard_size)]
+
+        result = Future()
+        if not bounds:
+            result.set_result([])
+            return result
+
+        partials = [None] * len(bounds)
+        remaining = [len(bounds)]
+        done_lock = threading.Lock()
+
+        def collect(i, shard_future):
+            with done_lock:
+                if result.done():
+                    return
+                if shard_future.cancelled() or shard_future.exception() is not None:
+                    result.set_exception(shard_future.exception() if not shard_future.cancelled()
+                                         else RuntimeError("Scoring shard was cancelled"))
+                    return
+                partials[i] = shard_future.result()
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            result.set_result(merge_top_k(partials, k))
+
+        for i, (start, stop) in enumerate(bounds):
+            shard_priors = priors[start:stop].tobytes() if priors is not None else None
+            shard_similar = {i: b for i, b in similar.items() if start <= i < stop} if similar else None
+            shard_future = pool.submit(_score_shard, handle, start, stop, analysis, wants_to_be_featured, k, deadline,
+                                       shard_priors, shard_similar)
+            shard_future.add_done_callback(lambda f, i=i: collect(i, f))
+        return result
+
+    def close(self) -> None:
+        """Shut down the pool and release every shared memory segment."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+            self._unlink(self._retired + self._segments)
+            self._retired, self._segments = [], []
+            self._handle = self._version = None
+
+    @staticmethod
+    def _unlink(segments: List[shared_memory.SharedMemory]) -> None:
+        for segment in segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
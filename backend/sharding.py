@@ -0,0 +1,309 @@
+"""
+Module for scatter-gather scoring across catalog shard nodes.
+
+Each shard node owns one partition of the catalog (by podcast ID hash or by
+primary category) and serves its local top k over HTTP. The coordinator sends
+one profile analysis to every node and merges whatever comes back before the
+deadline, so a slow or dead shard degrades results instead of failing them.
+
+A partition step cuts one catalog into a snapshot file per shard, and each
+node loads only its own file: no node holds the whole catalog, and every
+node's catalog indexes (the merge tie-break) come from the same catalog.
+Nodes also add the similarity bonus, from an index over their partition.
+
+Write the shard snapshots and run a local cluster of shard nodes with:
+    python sharding.py cluster --shard-count 3 --base-port 6001
+and point the API at it with:
+    SHARD_NODES=http://127.0.0.1:6001,http://127.0.0.1:6002,http://127.0.0.1:6003
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flask import Flask, request, jsonify
+
+from podcast_data import get_all_podcasts, get_catalog_version, get_podcast_id
+from deadlines import bounded_timeout
+from logs import get_logger
+from scoring import prepare_podcast, score_podcast, merge_top_k
+from similarity import SimilarityBlender, SimilarityIndex, similarity_blender
+
+PARTITION_MODES = ('hash', 'category')
+DEFAULT_SNAPSHOT_DIR = 'shards'
+
+log = get_logger(__name__)
+
+def partition_for(podcast: Dict, shard_count: int, mode: str = 'hash') -> int:
+    """Return the shard index that owns a podcast."""
+    if mode == 'category':
+        categories = podcast.get('categories') or ['']
+        key = categories[0].lower()
+    else:
+        key = get_podcast_id(podcast)
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16) % shard_count
+
+def snapshot_path(directory: str, shard_index: int, shard_count: int) -> str:
+    return os.path.join(directory, f"shard-{shard_index}-of-{shard_count}.json")
+
+def write_partitions(podcasts: Sequence[Dict], version: str, shard_count: int, mode: str = 'hash',
+                     directory: str = DEFAULT_SNAPSHOT_DIR) -> List[str]:
+    """
+    Cut one catalog into a snapshot file per shard, each replaced atomically.
+    Entries keep their index in the full catalog. Returns the file paths.
+    """
+    if mode not in PARTITION_MODES:
+        raise ValueError(f"Unknown partition mode: {mode}")
+    partitions = [[] for _ in range(shard_count)]
+    for index, podcast in enumerate(podcasts):
+        partitions[partition_for(podcast, shard_count, mode)].append([index, podcast])
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for shard_index, entries in enumerate(partitions):
+        path = snapshot_path(directory, shard_index, shard_count)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': version, 'shard': shard_index, 'shardCount': shard_count,
+                       'partition': mode, 'podcasts': entries}, f)
+        os.replace(temp_path, path)
+        paths.append(path)
+    return paths
+
+class ShardPartition:
+    """The slice of the catalog a single node owns, read from its snapshot file and prepared for scoring."""
+
+    def __init__(self, path: str, blender: Optional[SimilarityBlender] = None):
+        self.path = path
+        self.blender = blender if blender is not None else similarity_blender
+        self._lock = threading.Lock()
+        self._file_version = None
+        self._loaded = ({}, [], None)
+
+    def _load(self) -> Tuple[Dict, List[Tuple[int, str, Dict, tuple]], Optional[SimilarityIndex]]:
+        """Snapshot metadata, entries and similarity index, reloaded when the file is replaced."""
+        stat = os.stat(self.path)
+        file_version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        with self._lock:
+            if file_version != self._file_version:
+                with open(self.path) as f:
+                    snapshot = json.load(f)
+                entries = [
+                    (index, get_podcast_id(podcast), podcast, prepare_podcast(podcast))
+                    for index, podcast in snapshot.pop('podcasts')
+                ]
+                index = SimilarityIndex([podcast for _, _, podcast, _ in entries]) if self.blender.enabled else None
+                self._loaded = (snapshot, entries, index)
+                self._file_version = file_version
+                log.info('shard_loaded', "Loaded shard snapshot", shard=snapshot['shard'],
+                         podcasts=len(entries), version=snapshot['version'])
+            return self._loaded
+
+    @property
+    def info(self) -> Dict:
+        """The snapshot's shard index, shard count, partition mode and catalog version."""
+        return self._load()[0]
+
+    def entries(self) -> List[Tuple[int, str, Dict, tuple]]:
+        """Return (catalog index, podcast ID, podcast, prepared podcast) for this shard."""
+        return self._load()[1]
+
+    def top_k(self, analysis: Dict, wants_to_be_featured: bool, k: int = 10,
+              priors: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """
+        Score this partition and return its top k, ready to send.
+        `priors` maps podcast IDs to the coordinator's listener feedback
+        bonuses; similarity bonuses come from this partition's own index.
+        """
+        _, entries, index = self._load()
+        priors = priors or {}
+        similar = self.blender.bonuses(index, analysis) if index is not None else {}
+        scored = []
+        for position, (catalog_index, podcast_id, podcast, prepared) in enumerate(entries):
+            score, reasons = score_podcast(prepared, analysis, wants_to_be_featured,
+                                           priors.get(podcast_id, 0), similar.get(position, 0))
+            if score > 0:
+                scored.append((score, catalog_index, (reasons, podcast_id, podcast)))
+        return [
+            {
+                'score': score,
+                'index': catalog_index,
+                'id': podcast_id,
+                'reasons': reasons,
+                'podcast': podcast
+            }
+            for score, catalog_index, (reasons, podcast_id, podcast) in merge_top_k([scored], k)
+        ]
+
+def create_shard_app(partition: ShardPartition) -> Flask:
+    """Build the Flask app a shard node serves."""
+    shard_app = Flask(__name__)
+
+    @shard_app.route('/shard/topk', methods=['POST'])
+    def shard_top_k():
+        """Score this node's partition for a profile analysis."""
+        data = request.json
+        if not data or 'analysis' not in data:
+            return jsonify({'error': 'analysis is required'}), 400
+        results = partition.top_k(
+            data['analysis'],
+            data.get('wantsToBeFeatured', False),
+            int(data.get('k', 10)),
+            data.get('priors')
+        )
+        return jsonify({'shard': partition.info['shard'], 'version': partition.info['version'], 'results': results})
+
+    @shard_app.route('/shard/health', methods=['GET'])
+    def shard_health():
+        """Health check endpoint for a shard node."""
+        info = partition.info
+        return jsonify({
+            'status': 'healthy',
+            'shard': info['shard'],
+            'shardCount': info['shardCount'],
+            'partition': info['partition'],
+            'version': info['version'],
+            'size': len(partition.entries())
+        })
+
+    return shard_app
+
+class ShardCoordinator:
+    """Fans a profile analysis out to shard nodes and merges their top k lists."""
+
+    def __init__(self, nodes: List[str], deadline: float = 2.0):
+        self.nodes = [node.rstrip('/') for node in nodes]
+        self.deadline = deadline
+        # Imported here so single-node apps never load requests
+        import requests
+        self._session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.nodes)))
+        self._version = 'none'
+
+    @classmethod
+    def from_env(cls) -> Optional['ShardCoordinator']:
+        """Build a coordinator from SHARD_NODES, or None when sharding is off."""
+        nodes = [node for node in os.environ.get('SHARD_NODES', '').split(',') if node.strip()]
+        if not nodes:
+            return None
+        return cls(nodes, float(os.environ.get('SHARD_DEADLINE', 2.0)))
+
+    def catalog_version(self) -> str:
+        """The catalog version the shard nodes reported in their last answers ('none' before any)."""
+        return self._version
+
+    def _query(self, node: str, payload: Dict, timeout: float) -> Dict:
+        response = self._session.post(f"{node}/shard/topk", json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def top_k(self, analysis: Dict, wants_to_be_featured: bool, k: int = 10,
+              priors: Optional[Dict[str, int]] = None) -> Tuple[List[Tuple[int, Dict, List[str]]], Dict]:
+        """
+        Return the merged top k as (score, podcast, reasons) plus a summary of
+        which shards answered before the deadline. The listener feedback
+        `priors` (by podcast ID) are folded on the coordinator and sent along,
+        so every node ranks with the same bonuses.
+        """
+        payload = {'analysis': analysis, 'wantsToBeFeatured': wants_to_be_featured, 'k': k, 'priors': priors or {}}
+        started = time.monotonic()
+        # The shard deadline never outlives the request's own deadline
+        deadline = bounded_timeout(self.deadline, 'shard scoring')
+        futures = {
+            self._executor.submit(self._query, node, payload, deadline): node
+            for node in self.nodes
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        for future in not_done:
+            future.cancel()
+
+        partials = []
+        versions = set()
+        failed = [futures[future] for future in not_done]
+        for future in done:
+            try:
+                answer = future.result()
+            except Exception as e:
+                log.error('shard_error', f"Error querying shard: {str(e)}", shard=futures[future])
+                failed.append(futures[future])
+                continue
+            versions.add(answer.get('version') or 'none')
+            partials.append([(r['score'], r['index'], (r['reasons'], r['podcast'])) for r in answer['results']])
+
+        if len(versions) > 1:
+            log.warning('shard_version_mismatch', 'Shards answered from different catalog versions',
+                        versions=sorted(versions))
+        if versions:
+            self._version = '+'.join(sorted(versions))
+
+        merged = [(score, podcast, reasons) for score, _, (reasons, podcast) in merge_top_k(partials, k)]
+        return merged, {
+            'shards': len(self.nodes),
+            'responded': len(self.nodes) - len(failed),
+            'failed': sorted(failed),
+            'partial': bool(failed),
+            'elapsedMs': round((time.monotonic() - started) * 1000, 1)
+        }
+
+def run_partition(shard_count: int, mode: str, directory: str) -> List[str]:
+    """Write the shard snapshots from the current catalog; the only step that loads all of it."""
+    paths = write_partitions(get_all_podcasts(), get_catalog_version(), shard_count, mode, directory)
+    for path in paths:
+        print(path)
+    return paths
+
+def run_cluster(shard_count: int, base_port: int, mode: str, directory: str) -> None:
+    """Write the shard snapshots, then start one shard node process per partition and wait on them."""
+    paths = run_partition(shard_count, mode, directory)
+    processes = []
+    for shard_index, path in enumerate(paths):
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), 'node',
+            '--snapshot', os.path.abspath(path),
+            '--port', str(base_port + shard_index)
+        ], cwd=os.path.dirname(os.path.abspath(__file__))))
+    nodes = ','.join(f"http://127.0.0.1:{base_port + i}" for i in range(shard_count))
+    print(f"SHARD_NODES={nodes}")
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Partition the catalog and run shard nodes.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    partition_parser = subparsers.add_parser('partition', help='write one catalog snapshot file per shard')
+    partition_parser.add_argument('--shard-count', type=int, default=3)
+    partition_parser.add_argument('--partition', choices=PARTITION_MODES, default='hash')
+    partition_parser.add_argument('--snapshot-dir', default=DEFAULT_SNAPSHOT_DIR)
+
+    node_parser = subparsers.add_parser('node', help='serve a single shard from its snapshot file')
+    node_parser.add_argument('--snapshot', required=True, help='a file written by the partition command')
+    node_parser.add_argument('--host', default='127.0.0.1')
+    node_parser.add_argument('--port', type=int, default=6001)
+
+    cluster_parser = subparsers.add_parser('cluster', help='partition, then serve every shard as local processes')
+    cluster_parser.add_argument('--shard-count', type=int, default=3)
+    cluster_parser.add_argument('--base-port', type=int, default=6001)
+    cluster_parser.add_argument('--partition', choices=PARTITION_MODES, default='hash')
+    cluster_parser.add_argument('--snapshot-dir', default=DEFAULT_SNAPSHOT_DIR)
+
+    args = parser.parse_args()
+    if args.command == 'partition':
+        run_partition(args.shard_count, args.partition, args.snapshot_dir)
+    elif args.command == 'node':
+        create_shard_app(ShardPartition(args.snapshot)).run(host=args.host, port=args.port)
+    else:
+        run_cluster(args.shard_count, args.base_port, args.partition, args.snapshot_dir)
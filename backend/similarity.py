@@ -0,0 +1,258 @@
+"""
+Module for approximate semantic similarity between profiles and podcasts.
+
+Everything is local and deterministic, with no model to download:
+
+1. A podcast's title and description become word unigrams and bigrams, plus
+   concept features: phrases from CONCEPTS ("machine learning", "neural
+   nets", "ai") all add the same concept, so related wording can match.
+2. Features are hashed into HASH_WIDTH buckets, weighted by tf-idf over
+   the catalog and normalized, so the dot product of two texts is their
+   cosine similarity.
+3. An inverted file keeps, for each bucket, the POSTING_LENGTH podcasts it
+   weighs most in, heaviest first.
+
+A query reads the largest POSTING_BUDGET contributions (query weight times
+podcast weight) across its buckets' posting lists, and sums them into
+partial scores. The MAX_CANDIDATES highest partial scores are ranked by
+exact cosine similarity. The index is built once per catalog version.
+
+The work per query is bounded whatever the catalog size, so large catalogs
+are only partly searched. A podcast whose similarity comes from many small
+contributions can be missed for one with a slightly lower score.
+"""
+import array
+import bisect
+import functools
+import hashlib
+import heapq
+import math
+import operator
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from podcast_data import get_all_podcasts, get_catalog_version
+
+HASH_WIDTH = 1 << 18
+
+# Most podcasts a query ranks exactly
+MAX_CANDIDATES = 1024
+# Longest posting list kept per bucket, and most posting entries a query reads
+POSTING_LENGTH = 4096
+POSTING_BUDGET = 32768
+
+# Concept features are weighted above plain words so related wording can outweigh noise
+CONCEPT_WEIGHT = 3.0
+CONCEPTS = {
+    'ai': ('ai', 'artificial intelligence', 'machine learning', 'deep learning', 'neural', 'neural nets',
+           'neural networks', 'llm', 'llms', 'generative', 'data science', 'ml'),
+    'startups': ('startup', 'startups', 'founder', 'founders', 'venture', 'vc', 'fundraising',
+                 'entrepreneur', 'entrepreneurs', 'entrepreneurship'),
+    'leadership': ('leadership', 'leader', 'leaders', 'ceo', 'ceos', 'executive', 'executives', 'management'),
+    'marketing': ('marketing', 'brand', 'branding', 'advertising', 'growth', 'sales', 'customers'),
+    'finance': ('finance', 'investing', 'investment', 'investors', 'money', 'markets', 'wealth', 'economics'),
+    'technology': ('technology', 'tech', 'software', 'digital', 'cloud', 'saas', 'engineering', 'developers'),
+    'innovation': ('innovation', 'innovative', 'disruption', 'transformation', 'future'),
+    'crypto': ('blockchain', 'crypto', 'bitcoin', 'web3'),
+}
+_CONCEPT_OF = {phrase: concept for concept, phrases in CONCEPTS.items() for phrase in phrases}
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have how i in is it its of on or our that the their this to '
+    'was we what when where who why with you your about into more most new show podcast podcasts episode '
+    'episodes every week weekly'.split()
+)
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+def extract_features(text: str) -> Counter:
+    """Word unigrams and bigrams of a text, plus a feature for each concept it mentions."""
+    words = [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+    features = Counter(words)
+    bigrams = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    features.update(bigrams)
+    for phrase in set(words).union(bigrams):
+        concept = _CONCEPT_OF.get(phrase)
+        if concept is not None:
+            features[f"concept:{concept}"] += 1
+    return features
+
+def feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+@functools.lru_cache(maxsize=1 << 16)
+def feature_bucket(feature: str) -> int:
+    """The hash bucket of a feature; catalogs repeat a small vocabulary, so this is memoized."""
+    return feature_hash(feature) % HASH_WIDTH
+
+class SimilarityIndex:
+    """Sparse tf-idf vectors and impact-ordered posting lists for one catalog."""
+
+    def __init__(self, podcasts: Sequence[Dict]):
+        self.podcasts = podcasts
+        self.size = len(podcasts)
+
+        documents = [self._hashed(f"{p.get('title', '')} {p.get('description', '')}") for p in podcasts]
+        document_frequency = Counter(bucket for document in documents for bucket in document)
+        self.idf = {bucket: math.log((1 + self.size) / (1 + df)) + 1.0 for bucket, df in document_frequency.items()}
+        self.default_idf = math.log(1 + self.size) + 1.0
+
+        # Podcast i's weights are buckets/weights[offsets[i]:offsets[i + 1]]
+        self.offsets = array.array('l', [0])
+        self.buckets = array.array('l')
+        self.weights = array.array('f')
+        entries = {}
+        for position, document in enumerate(documents):
+            weights = self._weights(document)
+            self.buckets.extend(weights)
+            self.weights.extend(weights.values())
+            self.offsets.append(len(self.buckets))
+            for bucket, weight in weights.items():
+                entries.setdefault(bucket, []).append((-weight, position))
+
+        # Per bucket, the POSTING_LENGTH podcasts it weighs most in, heaviest first; ties keep catalog order
+        self.postings = {}
+        for bucket, posting in entries.items():
+            posting.sort()
+            del posting[POSTING_LENGTH:]
+            self.postings[bucket] = (array.array('f', (-w for w, _ in posting)), array.array('l', (p for _, p in posting)))
+
+    def _hashed(self, text: str) -> Dict[int, float]:
+        """Sublinear term frequencies per hash bucket."""
+        buckets = {}
+        for feature, count in extract_features(text).items():
+            bucket = feature_bucket(feature)
+            weight = (1.0 + math.log(count)) * (CONCEPT_WEIGHT if feature.startswith('concept:') else 1.0)
+            buckets[bucket] = buckets.get(bucket, 0.0) + weight
+        return buckets
+
+    def _weights(self, buckets: Dict[int, float]) -> Dict[int, float]:
+        """Unit-length tf-idf weights of the buckets a text hashed into."""
+        weights = {bucket: tf * self.idf.get(bucket, self.default_idf) for bucket, tf in buckets.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {bucket: w / norm for bucket, w in weights.items()} if norm else {}
+
+    def _candidates(self, query: Dict[int, float], limit: int) -> List[int]:
+        """
+        Accumulate partial scores from the largest POSTING_BUDGET contributions
+        (query weight times podcast weight) across the query's posting lists;
+        the highest partial scores are the candidates.
+        """
+        lists = [(weight, self.postings[bucket]) for bucket, weight in query.items() if bucket in self.postings]
+
+        def prefix(weight, weights, threshold):
+            # Entries of a heaviest-first list contributing at least `threshold`
+            return bisect.bisect_left(weights, -threshold / weight, key=operator.neg)
+
+        # Bisect for the least contribution read that keeps within POSTING_BUDGET entries
+        threshold = 0.0
+        if sum(len(positions) for _, (_, positions) in lists) > POSTING_BUDGET:
+            low, high = 0.0, max(weight * weights[0] for weight, (weights, _) in lists)
+            for _ in range(20):
+                middle = (low + high) / 2
+                if sum(prefix(weight, weights, middle) for weight, (weights, _) in lists) > POSTING_BUDGET:
+                    low = middle
+                else:
+                    high = middle
+            threshold = high
+
+        scores = {}
+        for weight, (weights, positions) in lists:
+            count = prefix(weight, weights, threshold) if threshold else len(positions)
+            for w, position in zip(weights[:count], positions[:count]):
+                scores[position] = scores.get(position, 0.0) + weight * w
+        return heapq.nlargest(max(MAX_CANDIDATES, limit), scores, key=scores.get)
+
+    def weigh(self, text: str) -> Dict[int, float]:
+        """Unit-length tf-idf weights of a text, as a query."""
+        return self._weights(self._hashed(text))
+
+    def candidates(self, text: str, limit: int = 50) -> List[int]:
+        """The catalog positions a query for `text` would rank."""
+        return self._candidates(self.weigh(text), limit)
+
+    def cosine(self, query: Dict[int, float], position: int) -> float:
+        """Exact cosine similarity between query weights and the podcast at `position`."""
+        start, end = self.offsets[position], self.offsets[position + 1]
+        get = query.get
+        return sum(get(bucket, 0.0) * weight for bucket, weight in zip(self.buckets[start:end], self.weights[start:end]))
+
+    def query(self, text: str, limit: int = 50, min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Approximate nearest podcasts to a text, as (catalog position, cosine
+        similarity) pairs, most similar first.
+        """
+        query = self.weigh(text)
+        if not query:
+            return []
+        scored = []
+        for position in self._candidates(query, limit):
+            similarity = self.cosine(query, position)
+            if similarity >= min_similarity:
+                scored.append((position, similarity))
+        scored.sort(key=lambda s: (-s[1], s[0]))
+        return scored[:limit]
+
+    def stats(self) -> Dict:
+        return {
+            'podcasts': self.size,
+            'buckets': len(self.postings),
+            'max_candidates': MAX_CANDIDATES,
+            'longest_posting': max((len(positions) for _, positions in self.postings.values()), default=0)
+        }
+
+def profile_text(analysis: Dict) -> str:
+    """The text a profile analysis is matched on."""
+    return ' '.join(analysis['keywords'] + analysis['categories'] + analysis.get('featured_opportunities', []))
+
+class SimilarityBlender:
+    """Turns approximate neighbours of a profile into score bonuses by catalog position."""
+
+    def __init__(self, weight: float = 4.0, min_similarity: float = 0.2, candidates: int = 50):
+        self.weight = weight
+        self.min_similarity = min_similarity
+        self.candidates = candidates
+
+    @classmethod
+    def from_env(cls) -> 'SimilarityBlender':
+        return cls(
+            float(os.environ.get('SIMILARITY_WEIGHT', 4)),
+            float(os.environ.get('SIMILARITY_MIN', 0.2)),
+            int(os.environ.get('SIMILARITY_CANDIDATES', 50))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.weight > 0
+
+    def bonuses(self, index: SimilarityIndex, analysis: Dict) -> Dict[int, int]:
+        """Points per catalog position for podcasts similar to the profile."""
+        neighbours = index.query(profile_text(analysis), self.candidates, self.min_similarity)
+        bonuses = {}
+        for position, similarity in neighbours:
+            points = round(self.weight * similarity)
+            if points > 0:
+                bonuses[position] = points
+        return bonuses
+
+_index = (None, None)
+_index_lock = threading.Lock()
+
+def get_similarity_index() -> SimilarityIndex:
+    """Return the similarity index for the current catalog version."""
+    global _index
+    version = get_catalog_version()
+    with _index_lock:
+        if _index[0] != version:
+            _index = (version, SimilarityIndex(get_all_podcasts()))
+        return _index[1]
+
+def peek_similarity_index() -> Optional[SimilarityIndex]:
+    """Return the index of the current catalog version if one is built, without building it."""
+    version = get_catalog_version()
+    with _index_lock:
+        return _index[1] if _index[0] == version else None
+
+similarity_blender = SimilarityBlender.from_env()
@@ -0,0 +1,71 @@
+"""
+Module for coalescing identical concurrent calls into a single computation.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from deadlines import DeadlineExceeded, remaining
+
+class _Call:
+    """A computation in flight and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers that arrive while a call
+    for their key is in flight wait for it and share its result (or error),
+    so shared results must be treated as read-only. A waiting caller stops
+    waiting at its own request deadline, leaving the call running for others.
+
+    Only `threading` primitives are used; under gunicorn's gevent worker they
+    are monkey-patched, so waiting callers yield to other greenlets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) for key, or wait for the call already running."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            # Give up on the shared call once this caller's own deadline passes
+            if not call.done.wait(remaining()):
+                raise DeadlineExceeded("Deadline exceeded waiting for a coalesced call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters for executed, coalesced and in-flight calls."""
+        with self._lock:
+            return {
+                'executed': self._leaders,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
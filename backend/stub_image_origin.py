@@ -0,0 +1,77 @@
+"""
+Module for a local stand-in of the artwork CDN.
+
+Serves a generated PNG for any path (a solid colour derived from the path,
+so each podcast's artwork differs) with injectable latency and error rate,
+so the image proxy's fetching, thumbnailing and disk cache can be exercised
+locally. Artwork URLs keep their path and move to the stub's host:
+    python stub_image_origin.py --port 7002 --size 600 --latency 0.1
+    IMAGE_ORIGIN_URL=http://127.0.0.1:7002 python app.py
+
+The settings can be changed while running, and GET /_config reports how
+many images were served:
+    curl -X POST localhost:7002/_config -H 'Content-Type: application/json' -d '{"errorRate": 1}'
+"""
+import argparse
+import hashlib
+import random
+import struct
+import threading
+import time
+import zlib
+
+from flask import Flask, Response, request, jsonify
+
+def solid_png(width: int, height: int, rgb: bytes) -> bytes:
+    """Encode a single-colour RGB image as PNG."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = (b'\x00' + rgb * width) * height
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 9))
+            + chunk(b'IEND', b''))
+
+def create_stub_app(size: int = 600, latency: float = 0.0, error_rate: float = 0.0) -> Flask:
+    """Build the stub origin app with the given image size and fault settings."""
+    stub_app = Flask(__name__, static_folder=None)
+    config = {'size': size, 'latency': latency, 'errorRate': error_rate}
+    counters = {'requests': 0}
+    lock = threading.Lock()
+
+    @stub_app.route('/<path:name>', methods=['GET'])
+    def get_image(name):
+        """Return the artwork for a path after the configured delay, or fail."""
+        with lock:
+            counters['requests'] += 1
+        time.sleep(max(0.0, config['latency']))
+        if random.random() < config['errorRate']:
+            return jsonify({'error': 'Injected origin failure'}), 503
+        if name.startswith('missing-'):
+            return jsonify({'error': 'Image not found'}), 404
+        side = int(config['size'])
+        body = solid_png(side, side, hashlib.sha256(name.encode('utf-8')).digest()[:3])
+        return Response(body, mimetype='image/png')
+
+    @stub_app.route('/_config', methods=['GET', 'POST'])
+    def update_config():
+        """Read or change the image size and fault settings."""
+        if request.method == 'POST':
+            for key, value in (request.json or {}).items():
+                if key in config:
+                    config[key] = float(value)
+        with lock:
+            return jsonify(dict(config, requests=counters['requests']))
+
+    return stub_app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local stub artwork origin.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7002)
+    parser.add_argument('--size', type=int, default=600, help='width and height of the served images')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+    create_stub_app(args.size, args.latency, args.error_rate).run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,73 @@
+"""
+Module for a local stand-in of the LinkedIn profile provider.
+
+Serves mock profiles at /profiles/<username> with injectable latency, jitter,
+error rate and 429 throttling, so the profile fetcher's pooling, hedging, rate limiting and
+circuit breaker can be exercised locally:
+    python stub_profile_provider.py --port 7001 --latency 0.2 --error-rate 0.1
+    PROFILE_PROVIDER_URL=http://127.0.0.1:7001 python app.py
+
+The fault settings can be changed while running:
+    curl -X POST localhost:7001/_config -H 'Content-Type: application/json' -d '{"errorRate": 1}'
+    curl -X POST localhost:7001/_config -H 'Content-Type: application/json' -d '{"throttleNext": 3}'
+"""
+import argparse
+import random
+import threading
+import time
+
+from flask import Flask, request, jsonify
+
+from linkedin_scraper import generate_mock_profile
+
+def create_stub_app(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                    throttle_next: int = 0, retry_after: float = 1.0) -> Flask:
+    """Build the stub provider app with the given fault settings."""
+    stub_app = Flask(__name__)
+    config = {'latency': latency, 'jitter': jitter, 'errorRate': error_rate,
+              'throttleNext': throttle_next, 'retryAfter': retry_after}
+    counters = {'requests': 0}
+    lock = threading.Lock()
+
+    @stub_app.route('/profiles/<username>', methods=['GET'])
+    def get_profile(username):
+        """Return a mock profile after the configured delay, or fail."""
+        with lock:
+            counters['requests'] += 1
+            throttled = config['throttleNext'] > 0
+            if throttled:
+                config['throttleNext'] -= 1
+        if throttled:
+            response = jsonify({'error': 'Injected rate limit'})
+            response.headers['Retry-After'] = f"{config['retryAfter']:g}"
+            return response, 429
+        time.sleep(max(0.0, config['latency'] + random.uniform(-config['jitter'], config['jitter'])))
+        if random.random() < config['errorRate']:
+            return jsonify({'error': 'Injected provider failure'}), 503
+        if username.startswith('missing-'):
+            return jsonify({'error': 'Profile not found'}), 404
+        return jsonify(generate_mock_profile(username))
+
+    @stub_app.route('/_config', methods=['GET', 'POST'])
+    def update_config():
+        """Read or change the fault settings."""
+        if request.method == 'POST':
+            for key, value in (request.json or {}).items():
+                if key in config:
+                    config[key] = float(value)
+        with lock:
+            return jsonify(dict(config, requests=counters['requests']))
+
+    return stub_app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local stub profile provider.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7001)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds around the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--throttle-next', type=int, default=0, help='answer the first N requests with 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with a 429')
+    args = parser.parse_args()
+    create_stub_app(args.latency, args.jitter, args.error_rate, args.throttle_next, args.retry_after).run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,70 @@
+"""
+Shared fixtures. The backend modules import each other as top-level modules,
+so the backend directory goes on sys.path. Every test runs in its own
+temporary directory, so nothing it does can rewrite the real podcasts.json.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from werkzeug.serving import make_server
+
+# Metric snapshots default to a directory shared by the host; keep this run's to itself
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='podcast-metrics-'))
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+@pytest.fixture
+def serve():
+    """Serve WSGI apps on free local ports; returns a function giving each app's base URL."""
+    servers = []
+
+    def start(wsgi_app) -> str:
+        server = make_server('127.0.0.1', 0, wsgi_app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def make_catalog(size: int = 30):
+    """A small catalog with a spread of matching and non-matching podcasts."""
+    topics = ['Startup', 'Leadership', 'Gardening', 'Technology', 'Cooking']
+    return [
+        {
+            'id': f"podcast-{i}",
+            'title': f"{topics[i % len(topics)]} Show {i}",
+            'description': f"Episodes about {topics[(i * 3) % len(topics)].lower()} and more.",
+            'image': f"https://example.com/art/{i}.jpg",
+            'website': f"https://example.com/{i}",
+            'categories': ['Business', 'Top Rated'] if i % 7 == 0 else ['Business'],
+            'host_email': f"host{i}@example.com"
+        }
+        for i in range(size)
+    ]
+
+@pytest.fixture
+def catalog_file():
+    """Write a catalog to the test directory's podcasts.json, so nothing is scraped."""
+    catalog = make_catalog()
+    with open('podcasts.json', 'w') as f:
+        json.dump(catalog, f)
+    return catalog
+
+ANALYSIS = {
+    'keywords': ['Startup', 'Leadership', 'Technology'],
+    'categories': ['startups', 'technology'],
+    'featured_opportunities': ['Founder Stories']
+}
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+import podcast_data
+from admission import AdmissionController
+from conftest import ANALYSIS, make_catalog
+from deadlines import DeadlineExceeded, bounded_timeout, clear_deadline, set_deadline
+from scoring import prepare_podcast, rank_prepared
+
+PROFILE = {'linkedinUrl': 'https://linkedin.com/in/jane'}
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Condition never held")
+
+def queue_behind(controller, count, timeout=5):
+    """Start `count` threads waiting for a slot; returns the threads and their outcomes."""
+    outcomes = []
+    threads = [threading.Thread(target=lambda: outcomes.append(controller.try_acquire(timeout)))
+               for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+def test_requests_queue_up_to_the_limit_then_shed():
+    controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+    assert controller.try_acquire()
+
+    threads, outcomes = queue_behind(controller, 2)
+    wait_for(lambda: controller.stats()['queue_depth'] == 2)
+    assert controller.try_acquire() is False
+
+    # Each release admits one queued request
+    for admitted in (1, 2):
+        controller.release()
+        wait_for(lambda: len(outcomes) == admitted)
+    for thread in threads:
+        thread.join(5)
+
+    assert outcomes == [True, True]
+    stats = controller.stats()
+    assert (stats['admitted'], stats['queued'], stats['shed_queue_full']) == (3, 2, 1)
+    assert (stats['in_flight'], stats['queue_depth'], stats['shed']) == (1, 0, 1)
+
+def test_queued_request_is_shed_at_the_queue_timeout():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.1)
+    assert controller.try_acquire()
+
+    started = time.monotonic()
+    assert controller.try_acquire() is False
+    assert 0.1 <= time.monotonic() - started < 1
+    # A shorter caller timeout wins over the queue timeout
+    assert controller.try_acquire(timeout=0.01) is False
+
+    stats = controller.stats()
+    assert (stats['shed_queue_timeout'], stats['shed'], stats['queue_depth']) == (2, 2, 0)
+
+def test_shed_request_gets_a_fast_503(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0, queue_timeout=1))
+    client = app_module.app.test_client()
+
+    response = client.post('/api/recommend', json=PROFILE)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app_module.SHED_RETRY_AFTER)
+    # Endpoints outside admission control are still served
+    assert client.get('/api/health').status_code == 200
+
+    metrics = client.get('/api/metrics').get_data().decode('utf-8')
+    assert 'podcast_admission_total{outcome="shed_queue_full"} 1' in metrics
+
+def test_expired_deadline_stops_scoring(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    monkeypatch.setattr(app_module, 'REQUEST_DEADLINE', -1)
+    response = app_module.app.test_client().post('/api/recommend', json=PROFILE)
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+    prepared = [prepare_podcast(podcast) for podcast in make_catalog()]
+    with pytest.raises(DeadlineExceeded):
+        rank_prepared(prepared, ANALYSIS, True, 10, deadline=time.monotonic() - 1)
+
+def test_expired_deadline_stops_scraping():
+    token = set_deadline(-1)
+    try:
+        # Raised before any request is made, and without falling back to sample data
+        with pytest.raises(DeadlineExceeded):
+            podcast_data.scrape_podcasts()
+    finally:
+        clear_deadline(token)
+
+def test_timeouts_are_capped_at_the_time_left():
+    assert bounded_timeout(10) == 10
+    token = set_deadline(2)
+    try:
+        assert 1 < bounded_timeout(10) <= 2
+        assert bounded_timeout(0.5) == 0.5
+    finally:
+        clear_deadline(token)
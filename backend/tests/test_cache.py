@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+import pytest
+
+import cache
+from cache import Cache, MemoryBackend, RedisBackend, SQLiteBackend, deserialize, serialize
+from resp_server import start_resp_server
+
+@pytest.fixture
+def resp_server():
+    server = start_resp_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def redis_backend(resp_server):
+    backend = RedisBackend(f"redis://127.0.0.1:{resp_server.server_address[1]}/0")
+    yield backend
+    backend.close()
+
+@pytest.mark.parametrize('value', [{'a': 1}, ['x' * 5000], 'naïve', 0])
+def test_serialize_round_trips_small_and_compressed_values(value):
+    blob = serialize(value)
+    assert blob[:1] == (cache.ZLIB_JSON if len(str(value)) > cache.COMPRESS_THRESHOLD else cache.RAW_JSON)
+    assert deserialize(blob) == value
+
+def test_redis_backend_against_the_resp_server(redis_backend, resp_server):
+    assert redis_backend.ping()
+    assert redis_backend.get('missing') is None
+    redis_backend.set('key', b'\x00binary\r\nvalue', 60)
+    assert redis_backend.get('key') == b'\x00binary\r\nvalue'
+    redis_backend.delete('key')
+    assert redis_backend.get('key') is None
+
+    redis_backend.set('short', b'v', 0.05)
+    time.sleep(0.1)
+    assert redis_backend.get('short') is None
+    assert resp_server.store.get(b'short') is None
+
+def test_cache_over_resp_counts_hits_and_misses(redis_backend):
+    shared = Cache(redis_backend)
+    assert shared.get_or_compute('profile', 'jane:1', lambda: {'name': 'Jane'}) == {'name': 'Jane'}
+    # A second worker sees the first one's entry
+    assert Cache(redis_backend).get('profile', 'jane:1') == {'name': 'Jane'}
+    assert shared.stats()['profile'] == {'hits': 0, 'misses': 1, 'errors': 0}
+
+def test_cache_survives_an_unreachable_server():
+    broken = Cache(RedisBackend('redis://127.0.0.1:1/0', timeout=0.2))
+    assert broken.get('profile', 'key') is None
+    broken.set('profile', 'key', {'a': 1})
+    assert broken.stats()['profile']['errors'] == 2
+
+@pytest.mark.parametrize('blob', [b'z' + b'not zlib', b'jnot json', b'?unknown format'])
+def test_undecodable_entries_are_misses_and_are_dropped(blob):
+    backend = MemoryBackend()
+    entries = Cache(backend)
+    backend.set(entries._key('recommendations', 'key'), blob, 60)
+
+    assert entries.get('recommendations', 'key') is None
+    assert backend.get(entries._key('recommendations', 'key')) is None
+    assert entries.get_or_compute('recommendations', 'key', lambda: [1]) == [1]
+    assert entries.get('recommendations', 'key') == [1]
+
+def test_sqlite_backend_sweeps_expired_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite3')
+    backend = SQLiteBackend(path)
+    backend.set('old', b'v', 0.01)
+    time.sleep(0.05)
+    assert backend.get('old') is None
+
+    monkeypatch.setattr(backend, '_next_purge', 0)
+    backend.set('new', b'v', 60)
+    rows = [row[0] for row in sqlite3.connect(path).execute('SELECT key FROM cache')]
+    assert rows == ['new']
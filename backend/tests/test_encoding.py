@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+import app as app_module
+import encoding
+from encoding import PrecompressedSnapshot, dumps, json_response, negotiate_encoding
+
+app = Flask(__name__)
+
+LARGE = encoding.COMPRESS_MIN_SIZE * 2
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, identity;q=1', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    ('deflate', None),
+    ('', None),
+    ('*', 'br' if encoding.brotli is not None else 'gzip'),
+])
+def test_encoding_follows_accept_encoding(accept, expected):
+    with app.test_request_context(headers={'Accept-Encoding': accept}):
+        assert negotiate_encoding(LARGE) == expected
+
+def test_brotli_is_preferred_when_installed():
+    pytest.importorskip('brotli')
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip, br'}):
+        assert negotiate_encoding(LARGE) == 'br'
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip, br;q=0.5'}):
+        assert negotiate_encoding(LARGE) == 'gzip'
+
+def test_small_bodies_are_sent_as_is():
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        assert negotiate_encoding(encoding.COMPRESS_MIN_SIZE - 1) is None
+        assert negotiate_encoding(encoding.COMPRESS_MIN_SIZE) == 'gzip'
+
+def test_compressed_response_decodes_to_the_payload():
+    payload = {'podcasts': [{'title': f"Show {i}", 'description': 'x' * 50} for i in range(40)]}
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = json_response(payload)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert json.loads(gzip.decompress(response.get_data())) == payload
+
+    with app.test_request_context():
+        response = json_response({'small': True})
+    assert 'Content-Encoding' not in response.headers
+    # Caches must key on Accept-Encoding even for an uncompressed body
+    assert 'Accept-Encoding' in response.vary
+
+def test_orjson_and_stdlib_encode_alike(monkeypatch):
+    pytest.importorskip('orjson')
+    payload = {'title': 'Café Ünïcode ✓', 'nested': [1, 2.5, None, True, {'a': ''}], 'quote': '"\\/'}
+    monkeypatch.setattr(encoding, 'JSON_ENCODER', 'orjson')
+    fast = dumps(payload)
+    monkeypatch.setattr(encoding, 'JSON_ENCODER', 'stdlib')
+    assert dumps(payload) == fast
+    assert json.loads(fast) == payload
+
+def test_snapshot_variants_decode_to_the_catalog(catalog_file, monkeypatch):
+    snapshot = PrecompressedSnapshot({'podcasts': catalog_file})
+    assert json.loads(gzip.decompress(snapshot.variants['gzip'])) == {'podcasts': catalog_file}
+    if 'br' in snapshot.variants:
+        assert encoding.brotli.decompress(snapshot.variants['br']) == snapshot.identity
+
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    response = app_module.app.test_client().get('/api/catalog', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    served = json.loads(gzip.decompress(response.get_data()))
+    assert served['podcasts'] == catalog_file
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+import pytest
+
+import app as app_module
+from admission import AdmissionController
+from events import EventStore
+
+def test_priors_digest_changes_only_with_the_priors(tmp_path):
+    store = EventStore(str(tmp_path / 'events'), fold_interval=3600)
+    assert store.priors() == ({}, '')
+
+    store.record([('impression', f"podcast-{i}") for i in range(10)] * 20)
+    store.record([('copy', 'podcast-1')] * 20)
+    store.flush()
+    later = time.time() + 7200
+    store.fold(later)
+    priors, digest = store.priors()
+    assert priors['podcast-1'] > 0
+    assert digest
+
+    # A second worker folding the same segments agrees on the digest
+    other = EventStore(str(tmp_path / 'events'), fold_interval=3600)
+    other.fold(later)
+    assert other.priors() == (priors, digest)
+
+    store.fold(later)
+    assert store.priors()[1] == digest
+
+def test_workers_folding_at_different_times_agree(tmp_path):
+    directory = str(tmp_path / 'events')
+    os.makedirs(directory)
+    # Ahead of the clock, so the stores' own background folds stay behind it
+    boundary = (time.time() // 60 + 10) * 60
+    # Events on both sides of a boundary, as another worker would have written them
+    events = [{'ts': boundary - 30 + i % 50, 'type': 'impression', 'podcastId': f"podcast-{i % 10}"}
+              for i in range(200)]
+    events += [{'ts': boundary - 5, 'type': 'copy', 'podcastId': 'podcast-1'}] * 15
+    events += [{'ts': boundary + 5, 'type': 'copy', 'podcastId': 'podcast-2'}] * 15
+    with open(os.path.join(directory, f"events-{time.strftime('%Y%m%d', time.gmtime(boundary))}.jsonl"), 'w') as f:
+        f.writelines(json.dumps(event) + '\n' for event in events)
+
+    early = EventStore(directory, fold_interval=60, fold_grace=10)
+    late = EventStore(directory, fold_interval=60, fold_grace=10)
+    early.fold(boundary + 11)
+    late.fold(boundary + 59)
+    assert early.stats()['folded_through'] == late.stats()['folded_through'] == boundary
+    assert early.priors() == late.priors()
+    assert 'podcast-2' not in early.priors()[0]
+
+    # The events past the boundary are kept for the next fold, not lost
+    early.fold(boundary + 60 + 11)
+    late.fold(boundary + 60 + 40)
+    assert early.priors() == late.priors()
+    assert 'podcast-2' in early.priors()[0]
+
+def test_repeated_events_from_a_client_count_once(tmp_path):
+    store = EventStore(str(tmp_path / 'events'), dedup_window=60)
+    assert store.record([('click', 'podcast-1'), ('click', 'podcast-1'), ('copy', 'podcast-1')], client='a') == 2
+    assert store.record([('click', 'podcast-1')], client='a') == 0
+    assert store.record([('click', 'podcast-1')], client='b') == 1
+    assert store.stats()['duplicates'] == 2
+
+    store._recent = OrderedDict((key, seen - 61) for key, seen in store._recent.items())
+    assert store.record([('click', 'podcast-1')], client='a') == 1
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'event_store', EventStore(str(tmp_path / 'events')))
+    return app_module.app.test_client()
+
+def test_events_endpoint_dedupes_and_rejects(client):
+    body = {'events': [{'type': 'click', 'podcastId': 'podcast-1'}, {'type': 'click', 'podcastId': 'podcast-1'},
+                       {'type': 'bogus', 'podcastId': 'podcast-1'}, {'type': 'copy', 'podcastId': '../etc'}]}
+    response = client.post('/api/events', data=json.dumps(body), content_type='text/plain')
+    assert response.status_code == 202
+    assert response.json == {'accepted': 1, 'duplicates': 1, 'rejected': 2}
+
+def test_events_endpoint_has_a_per_client_quota(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EVENTS_RATE_LIMIT', '2 per minute')
+    body = {'events': [{'type': 'impression', 'podcastId': 'podcast-1'}]}
+    headers = {'X-Forwarded-For': '203.0.113.9'}
+    statuses = [client.post('/api/events', json=body, headers=headers).status_code for _ in range(3)]
+    assert statuses == [202, 202, 429]
+    assert 'Retry-After' in client.post('/api/events', json=body, headers=headers).headers
+    # Other clients keep their own quota
+    assert client.post('/api/events', json=body, headers={'X-Forwarded-For': '203.0.113.10'}).status_code == 202
+
+def test_events_endpoint_is_shed_under_load(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0, queue_timeout=1))
+    response = client.post('/api/events', json={'events': [{'type': 'click', 'podcastId': 'podcast-1'}]})
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+import app as app_module
+from http_cache import CACHE_CONTROL
+
+PROFILE = {'linkedinUrl': 'https://linkedin.com/in/jane'}
+
+@pytest.fixture
+def client(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    return app_module.app.test_client()
+
+def test_matching_etag_is_answered_before_any_work(client, monkeypatch):
+    etag = client.post('/api/recommend', json=PROFILE).headers['ETag']
+
+    def no_work(*args):
+        raise AssertionError("A revalidated request analysed the profile")
+
+    monkeypatch.setattr(app_module, 'get_profile_analysis', no_work)
+    response = client.post('/api/recommend', json=PROFILE, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+def test_new_catalog_version_changes_the_etag(client):
+    first = client.post('/api/recommend', json=PROFILE).headers['ETag']
+    stat = os.stat('podcasts.json')
+    os.utime('podcasts.json', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    response = client.post('/api/recommend', json=PROFILE, headers={'If-None-Match': first})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first
+
+def test_new_priors_change_the_etag(client, monkeypatch):
+    first = client.post('/api/recommend', json=PROFILE).headers['ETag']
+    monkeypatch.setattr(app_module.event_store, 'priors', lambda: ({'podcast-3': 2}, 'new-digest'))
+
+    response = client.post('/api/recommend', json=PROFILE, headers={'If-None-Match': first})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first
+
+@pytest.mark.parametrize('endpoint, method, url', [
+    ('recommend', 'post', '/api/recommend'),
+    ('pitch', 'get', '/api/pitch?podcastId=podcast-1&profileRef=jane'),
+    ('list_podcasts', 'get', '/api/podcasts?q=show'),
+    ('get_catalog', 'get', '/api/catalog'),
+    ('health_check', 'get', '/api/health'),
+])
+def test_cache_control_is_set_per_endpoint(client, endpoint, method, url):
+    body = PROFILE if method == 'post' else None
+    response = getattr(client, method)(url, json=body)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == CACHE_CONTROL[endpoint]
+
+    # 304s carry the same policy, so clients keep revalidating on it
+    if 'ETag' in response.headers:
+        revalidated = getattr(client, method)(url, json=body, headers={'If-None-Match': response.headers['ETag']})
+        assert revalidated.status_code == 304
+        assert revalidated.headers['Cache-Control'] == CACHE_CONTROL[endpoint]
+
+def test_errors_get_no_cache_control(client):
+    response = client.post('/api/recommend', json={})
+    assert response.status_code == 400
+    assert 'Cache-Control' not in response.headers
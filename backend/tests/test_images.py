@@ -0,0 +1,119 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+from PIL import Image
+
+import app as app_module
+import images
+from images import ImageFetchError, ImageProxy, ThumbnailCache
+from stub_image_origin import create_stub_app
+
+@pytest.fixture
+def origin(serve):
+    stub = create_stub_app(size=600)
+    url = serve(stub)
+    control = stub.test_client()
+
+    def configure(**settings):
+        return control.post('/_config', json=settings).json
+
+    return url, configure
+
+@pytest.fixture
+def proxy(origin, tmp_path):
+    url, _ = origin
+    return ImageProxy(ThumbnailCache(str(tmp_path / 'images'), 1024 * 1024), size=64, origin_url=url,
+                      retry_after=60)
+
+def test_artwork_is_fetched_once_and_served_as_a_thumbnail(proxy, origin):
+    _, configure = origin
+    for _ in range(2):
+        thumbnail = proxy.get('https://cdn.example.com/art/1.png')
+        with thumbnail.file:
+            image = Image.open(io.BytesIO(thumbnail.file.read()))
+        assert thumbnail.content_type == 'image/jpeg'
+        assert image.size == (64, 64)
+
+    assert configure()['requests'] == 1
+    assert proxy.stats()['hits'] == 1
+    assert proxy.stats()['misses'] == 1
+
+def test_cache_evicts_the_least_recently_served(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, 'TOUCH_INTERVAL', 0)
+    cache = ThumbnailCache(str(tmp_path / 'images'), 250)
+    cache.put('a', b'a' * 100, 'image/png')
+    cache.put('b', b'b' * 100, 'image/png')
+    cache.open('a').file.close()  # Served, so 'b' is now the least recently used
+
+    cache.put('c', b'c' * 100, 'image/png')
+    assert cache.open('b') is None
+    for key in ('a', 'c'):
+        thumbnail = cache.open(key)
+        thumbnail.file.close()
+    assert cache.stats() == {'entries': 2, 'bytes': 200, 'max_bytes': 250}
+    assert len([name for name in (tmp_path / 'images').iterdir() if name.suffix == '.png']) == 2
+
+def test_identical_artwork_is_stored_once(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / 'images'), 1024)
+    cache.put('a', b'same' * 10, 'image/png')
+    cache.put('b', b'same' * 10, 'image/png')
+    assert cache.stats()['bytes'] == 40
+
+def test_failed_origin_is_not_retried_until_retry_after(proxy, origin):
+    _, configure = origin
+    configure(errorRate=1)
+    with pytest.raises(ImageFetchError, match='503'):
+        proxy.get('https://cdn.example.com/art/2.png')
+    with pytest.raises(ImageFetchError, match='failed recently'):
+        proxy.get('https://cdn.example.com/art/2.png')
+
+    assert configure()['requests'] == 1
+    assert proxy.stats()['fetch_errors'] == 1
+
+def test_route_answers_502_when_the_origin_fails(proxy, origin, monkeypatch):
+    _, configure = origin
+    configure(errorRate=1)
+    podcast = {'id': 'podcast-1', 'image': 'https://cdn.example.com/art/3.png'}
+    monkeypatch.setattr(app_module, 'image_proxy', proxy)
+    monkeypatch.setattr(app_module, 'get_podcast_by_id', lambda podcast_id: podcast if podcast_id == 'podcast-1' else None)
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    client = app_module.app.test_client()
+
+    assert client.get('/api/image/podcast-1').status_code == 502
+    assert client.get('/api/image/podcast-1').status_code == 502
+    assert client.get('/api/image/unknown').status_code == 404
+    assert configure()['requests'] == 1
+
+    configure(errorRate=0)
+    proxy.retry_after = 0
+    proxy._failures.clear()
+    response = client.get('/api/image/podcast-1')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert client.get('/api/image/podcast-1', headers={'If-None-Match': f'"{response.get_etag()[0]}"'}).status_code == 304
+
+def test_missing_pillow_fails_only_the_image_route(proxy, origin, monkeypatch):
+    _, configure = origin
+    podcast = {'id': 'podcast-1', 'image': 'https://cdn.example.com/art/4.png'}
+    monkeypatch.setattr(app_module, 'image_proxy', proxy)
+    monkeypatch.setattr(app_module, 'get_podcast_by_id', lambda podcast_id: podcast)
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    client = app_module.app.test_client()
+
+    with monkeypatch.context() as without_pillow:
+        without_pillow.setitem(sys.modules, 'PIL', None)  # Makes `from PIL import Image` raise ImportError
+        assert client.get('/api/image/podcast-1').status_code == 500
+        assert client.get('/api/health').status_code == 200
+    # The origin is not blamed, so the artwork is fetched again once Pillow is back
+    assert proxy.stats()['fetch_errors'] == 0
+    assert client.get('/api/image/podcast-1').status_code == 200
+    assert configure()['requests'] == 2
+
+def test_app_imports_without_pillow(tmp_path):
+    code = "import sys; sys.modules['PIL'] = None; import app"
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)), timeout=60)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,18 @@
+import pytest
+
+from linkedin_scraper import canonical_username, extract_profile_data
+
+@pytest.mark.parametrize('url', [
+    'https://www.linkedin.com/in/Jane-Doe',
+    'https://www.LinkedIn.com/in/jane-doe/',
+    'HTTPS://WWW.LINKEDIN.COM/IN/JANE-DOE?trk=share'
+])
+def test_validation_and_extraction_agree_on_any_case(url):
+    assert canonical_username(url) == 'jane-doe'
+    assert extract_profile_data(url)['name'] == 'Jane Doe'
+
+@pytest.mark.parametrize('url', ['', 'https://www.linkedin.com/company/acme', 'not a url'])
+def test_invalid_urls_are_rejected_by_both(url):
+    assert canonical_username(url) is None
+    with pytest.raises(ValueError):
+        extract_profile_data(url)
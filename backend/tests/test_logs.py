@@ -0,0 +1,81 @@
+import io
+import json
+import logging
+import os
+
+import logs
+from logs import EventFilter, JsonFormatter, QueueingHandler
+
+def make_record(event, message='message'):
+    record = logging.LogRecord('podcast.test', logging.INFO, __file__, 1, message, None, None)
+    record.event = event
+    return record
+
+def test_events_are_sampled_at_their_rate(monkeypatch):
+    event_filter = EventFilter({'request': 0.25, 'never': 0.0}, {})
+    draws = iter([0.1, 0.3, 0.24, 0.9, 0.0])
+    monkeypatch.setattr(logs.random, 'random', lambda: next(draws))
+
+    assert [event_filter.filter(make_record('request')) for _ in range(4)] == [True, False, True, False]
+    assert not event_filter.filter(make_record('never'))
+    # Events without a rate are never sampled
+    assert all(event_filter.filter(make_record('other')) for _ in range(10))
+
+def test_rate_limited_events_report_what_was_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logs.time, 'monotonic', lambda: now[0])
+    event_filter = EventFilter({}, {'cache_error': (2, 60.0)})
+
+    records = [make_record('cache_error') for _ in range(5)]
+    assert [event_filter.filter(record) for record in records] == [True, True, False, False, False]
+    assert event_filter.filter(make_record('shard_error'))
+
+    # The next window lets records through again; the first says how many were dropped
+    now[0] += 60
+    first, second = make_record('cache_error'), make_record('cache_error')
+    assert event_filter.filter(first) and event_filter.filter(second)
+    assert first.suppressed == 3
+    assert not hasattr(second, 'suppressed')
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    start_thread = logs._start_thread
+    monkeypatch.setattr(logs, '_start_thread', lambda target, args: None)  # No writer yet
+    stream = io.StringIO()
+    handler = QueueingHandler(stream, max_queue=2)
+    handler.setFormatter(JsonFormatter())
+
+    for i in range(5):
+        handler.emit(make_record('request', f"record {i}"))
+    assert handler.stats() == {'queued': 2, 'dropped': 3}
+
+    start_thread(handler._write_records, (handler._queue,))
+    handler.drain()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['msg'] for line in lines[:2]] == ['record 0', 'record 1']
+    assert lines[2]['event'] == 'log_dropped'
+    assert lines[2]['count'] == 3
+
+def test_forked_process_starts_its_own_writer():
+    read_end, write_end = os.pipe()
+    handler = QueueingHandler(os.fdopen(write_end, 'w'))
+    handler.setFormatter(JsonFormatter())
+    handler.emit(make_record('parent'))
+    handler.drain()
+    parent_queue = handler._queue
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # The parent's writer thread did not survive the fork
+            handler.emit(make_record('child', 'from child'))
+            handler.drain()
+            os.write(write_end, b'fresh\n' if handler._queue is not parent_queue else b'stale\n')
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    handler.stream.close()
+
+    with os.fdopen(read_end) as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)['event'] for line in lines if line.startswith('{')] == ['parent', 'child']
+    assert lines[-1] == 'fresh'
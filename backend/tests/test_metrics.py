@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+
+from metrics import MetricsRegistry
+
+def test_master_never_writes_a_snapshot(tmp_path):
+    registry = MetricsRegistry(str(tmp_path / 'metrics'), flush_interval=60)
+    registry.mark_master()
+    registry.observe('podcast_stage_duration_seconds', {'stage': 'warm_up'}, 0.5)
+    registry.flush()
+
+    assert registry._flusher_pid is None
+    assert not os.path.exists(tmp_path / 'metrics')
+
+def test_forked_worker_reports_only_its_own_metrics(tmp_path):
+    directory = str(tmp_path / 'metrics')
+    registry = MetricsRegistry(directory, flush_interval=60)
+    os.register_at_fork(after_in_child=registry.reset_after_fork)
+    registry.mark_master()
+    registry.observe('podcast_stage_duration_seconds', {'stage': 'warm_up'}, 0.5)
+    registry.inc('podcast_warm_ups_total', {})
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            registry.inc('podcast_requests_total', {})
+            text = registry.render()
+            os.write(write_end, json.dumps([registry.snapshot(), text]).encode('utf-8'))
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as f:
+        snapshot, text = json.loads(f.read())
+    os.waitpid(pid, 0)
+
+    assert snapshot['histograms'] == {}
+    assert list(snapshot['counters']) == ['podcast_requests_total']
+    assert 'podcast_workers 1\n' in text
+    assert os.listdir(directory) == [f"{pid}.json"]
+
+def test_snapshots_default_to_a_temp_dir_and_are_cleared_on_start(tmp_path, monkeypatch):
+    monkeypatch.delenv('METRICS_DIR', raising=False)
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    registry = MetricsRegistry.from_env()
+    assert registry.directory == str(tmp_path / 'podcast-metrics')
+
+    # A snapshot left by a worker of an earlier run
+    registry.inc('podcast_requests_total', {})
+    registry.flush()
+    os.rename(os.path.join(registry.directory, f"{os.getpid()}.json"), os.path.join(registry.directory, '1.json'))
+    restarted = MetricsRegistry(registry.directory)
+    assert 'podcast_requests_total 1' in restarted.render()
+
+    restarted.clear_snapshots()
+    assert 'podcast_requests_total' not in restarted.render()
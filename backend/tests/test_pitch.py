@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import app as app_module
+import podcast_data
+from projection import ProjectionIndex
+
+PROFILE = 'https://linkedin.com/in/jane'
+
+@pytest.fixture
+def client(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    return app_module.app.test_client()
+
+def test_unknown_podcast_is_not_found(client):
+    response = client.get('/api/pitch', query_string={'podcastId': 'no-such-podcast', 'profileRef': 'jane'})
+    assert response.status_code == 404
+    assert client.get('/api/pitch', query_string={'podcastId': 'podcast-1'}).status_code == 400
+
+def test_second_render_comes_from_the_cache(client, monkeypatch):
+    rendered = []
+    generate = app_module.generate_pitch_message
+    monkeypatch.setattr(app_module, 'generate_pitch_message',
+                        lambda *args: rendered.append(args) or generate(*args))
+
+    query = {'podcastId': 'podcast-3', 'profileRef': 'jane'}
+    first = client.get('/api/pitch', query_string=query)
+    second = client.get('/api/pitch', query_string=query)
+    assert first.status_code == second.status_code == 200
+    assert first.json == second.json
+    assert len(rendered) == 1
+
+    revalidated = client.get('/api/pitch', query_string=query, headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+def test_pitch_matches_the_streamed_recommendation(client, catalog_file):
+    streamed = client.post('/api/recommend?stream=ndjson', json={'linkedinUrl': PROFILE, 'wantsToBeFeatured': True})
+    events = [json.loads(line) for line in streamed.get_data().decode('utf-8').splitlines()]
+    pitches = [event for event in events if event.pop('type') == 'pitch']
+    assert pitches
+
+    hosts = {podcast['id']: podcast['host_email'] for podcast in catalog_file}
+    for streamed_pitch in pitches:
+        response = client.get('/api/pitch', query_string={'podcastId': streamed_pitch['podcastId'], 'profileRef': 'jane'})
+        assert response.json == streamed_pitch
+        assert response.json['hostEmail'] == hosts[streamed_pitch['podcastId']]
+
+def test_duplicate_ids_resolve_to_the_first_podcast(catalog_file):
+    duplicate = dict(catalog_file[2], title='Later Duplicate')
+    with open('podcasts.json', 'w') as f:
+        json.dump(catalog_file + [duplicate], f)
+
+    podcasts = podcast_data.get_all_podcasts()
+    assert len(podcasts) == len(catalog_file)
+    assert podcast_data.get_podcast_by_id('podcast-2')['title'] == catalog_file[2]['title']
+    assert ProjectionIndex(podcasts).project('podcast-2', ('title',)) == {'title': catalog_file[2]['title']}
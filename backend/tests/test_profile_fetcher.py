@@ -0,0 +1,98 @@
+import pytest
+
+import app as app_module
+import profile_fetcher
+from profile_fetcher import (CircuitBreaker, CircuitOpenError, ProfileFetcher, ProfileFetchError,
+                             ProfileNotFoundError, SQLiteTokenBucket, TokenBucket)
+from stub_profile_provider import create_stub_app
+
+@pytest.fixture
+def provider(serve):
+    stub = create_stub_app()
+    url = serve(stub)
+    control = stub.test_client()
+
+    def configure(**settings):
+        return control.post('/_config', json=settings).json
+
+    return url, configure
+
+def make_fetcher(url, **overrides):
+    options = dict(rate_limiter=TokenBucket(100, 100), breaker=CircuitBreaker(5, 30), pool_size=4,
+                   deadline=3, hedge_after=1)
+    options.update(overrides)
+    return ProfileFetcher(url, **options)
+
+def test_throttled_request_is_retried_after_retry_after(provider):
+    url, configure = provider
+    configure(throttleNext=1, retryAfter=0.2)
+    fetcher = make_fetcher(url)
+
+    assert fetcher.fetch('jane')['name']
+    stats = fetcher.stats()
+    assert stats['throttled'] == 1
+    assert stats['failures'] == 0
+    assert configure()['requests'] == 2
+
+def test_throttling_past_the_deadline_is_a_fetch_error_not_a_breaker_failure(provider):
+    url, configure = provider
+    configure(throttleNext=10, retryAfter=5)
+    fetcher = make_fetcher(url, deadline=0.5, breaker=CircuitBreaker(1, 30))
+
+    with pytest.raises(ProfileFetchError):
+        fetcher.fetch('jane')
+    assert configure()['requests'] == 1
+    assert fetcher.stats()['breaker'] == 'closed'
+
+def test_slow_request_is_hedged(provider):
+    url, configure = provider
+    configure(latency=0.3)
+    fetcher = make_fetcher(url, hedge_after=0.1)
+
+    assert fetcher.fetch('jane')['name']
+    assert fetcher.stats()['hedged'] >= 1
+    assert configure()['requests'] >= 2
+
+def test_circuit_opens_after_repeated_failures(provider):
+    url, configure = provider
+    configure(errorRate=1)
+    fetcher = make_fetcher(url, breaker=CircuitBreaker(2, 30), max_attempts=1)
+
+    for _ in range(2):
+        with pytest.raises(ProfileFetchError):
+            fetcher.fetch('jane')
+    seen = configure()['requests']
+
+    with pytest.raises(CircuitOpenError):
+        fetcher.fetch('jane')
+    assert configure()['requests'] == seen
+    assert fetcher.stats()['short_circuited'] == 1
+
+def test_unknown_profile_is_not_found(provider):
+    url, _ = provider
+    fetcher = make_fetcher(url)
+
+    with pytest.raises(ProfileNotFoundError):
+        fetcher.fetch('missing-jane')
+    assert fetcher.stats()['breaker'] == 'closed'
+
+def test_routes_map_unknown_profiles_to_404(provider, monkeypatch):
+    url, _ = provider
+    monkeypatch.setattr(profile_fetcher, '_fetcher', make_fetcher(url))
+    monkeypatch.setattr(profile_fetcher, '_fetcher_loaded', True)
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    client = app_module.app.test_client()
+
+    response = client.post('/api/recommend', json={'linkedinUrl': 'https://linkedin.com/in/missing-jane'})
+    assert response.status_code == 404
+    response = client.post('/api/recommend', json={'linkedinUrl': 'https://example.com/jane'})
+    assert response.status_code == 400
+
+def test_sqlite_buckets_share_tokens(tmp_path):
+    path = str(tmp_path / 'rate.sqlite3')
+    first, second = SQLiteTokenBucket(path, 0.01, 2), SQLiteTokenBucket(path, 0.01, 2)
+
+    assert first.try_acquire() == 0
+    assert second.try_acquire() == 0
+    assert first.try_acquire() > 0
+    assert second.try_acquire() > 0
@@ -0,0 +1,69 @@
+import os
+import time
+from collections import Counter
+
+import pytest
+
+import app as app_module
+from profiling import Profiler
+
+TOKEN = 'profiling-secret'
+PROFILE = {'linkedinUrl': 'https://linkedin.com/in/jane'}
+
+def busy_analysis(*args):
+    # Long enough for the sampler to see this frame many times
+    until = time.perf_counter() + 0.2
+    while time.perf_counter() < until:
+        pass
+    return {'summary': '', 'skills': [], 'interests': []}, {'keywords': [], 'categories': [], 'featured_opportunities': []}
+
+@pytest.fixture
+def client(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    monkeypatch.setattr(app_module, 'get_profile_analysis', busy_analysis)
+    return app_module.app.test_client()
+
+def use_profiler(monkeypatch, tmp_path, token):
+    profiler = Profiler(token, str(tmp_path / 'profiles'), interval=0.002)
+    monkeypatch.setattr(app_module, 'profiler', profiler)
+    return profiler
+
+def test_profiling_is_refused_without_the_token(client, monkeypatch, tmp_path):
+    profiler = use_profiler(monkeypatch, tmp_path, None)
+    response = client.post('/api/recommend?profile=1', json=PROFILE, headers={'X-Admin-Token': 'anything'})
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/api/debug/profiles').status_code == 404
+
+    profiler.token = TOKEN
+    response = client.post('/api/recommend?profile=1', json=PROFILE, headers={'X-Admin-Token': 'wrong'})
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/api/debug/profiles', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert profiler.list_profiles() == []
+
+def test_profiled_request_stores_its_profile(client, monkeypatch, tmp_path):
+    use_profiler(monkeypatch, tmp_path, TOKEN)
+    admin = {'X-Admin-Token': TOKEN}
+    response = client.post('/api/recommend', json=PROFILE,
+                           headers=dict(admin, **{'X-Profile': '1', 'X-Request-ID': 'req-42'}))
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Id'] == 'req-42'
+
+    listed = client.get('/api/debug/profiles', headers=admin).json['profiles']
+    assert [profile['id'] for profile in listed] == ['req-42']
+    folded = client.get('/api/debug/profiles/req-42', headers=admin).get_data().decode('utf-8')
+    busy = [line for line in folded.splitlines() if 'busy_analysis' in line]
+    assert busy
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in busy)
+    assert client.get('/api/debug/profiles/req-43', headers=admin).status_code == 404
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    profiler = Profiler(TOKEN, str(tmp_path / 'profiles'), keep=2)
+    for i in range(4):
+        profiler.save(f"profile-{i}", Counter({'main (app.py:1)': i + 1}))
+        path = os.path.join(profiler.directory, f"profile-{i}.folded")
+        os.utime(path, (1000 + i, 1000 + i))
+
+    assert [profile['id'] for profile in profiler.list_profiles()] == ['profile-3', 'profile-2']
+    assert profiler.load('profile-3') == 'main (app.py:1) 4\n'
+    assert profiler.load('../profile-3') is None
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import app as app_module
+from projection import COMPACT_FIELDS, make_snippet
+
+PROFILE = {'linkedinUrl': 'https://linkedin.com/in/jane'}
+
+@pytest.fixture
+def client(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    return app_module.app.test_client()
+
+@pytest.fixture
+def full(client):
+    response = client.post('/api/recommend', json=PROFILE)
+    assert response.status_code == 200
+    return response.json
+
+@pytest.mark.parametrize('query', ['fields=id,nope', 'fields=title,Title', 'include=profile,history'])
+def test_unknown_fields_are_rejected(client, query):
+    response = client.post(f"/api/recommend?{query}", json=PROFILE)
+    assert response.status_code == 400
+    assert 'Unknown' in response.json['error']
+
+@pytest.mark.parametrize('fields', ['title,categories,reasons', 'host_email,website', 'reasons'])
+def test_projection_filters_the_full_response(client, full, fields):
+    projected = client.post(f"/api/recommend?fields={fields}", json=PROFILE).json
+    kept = ['id'] + fields.split(',')
+    assert projected['recommendations'] == [
+        {field: rec[field] for field in rec if field in kept} for rec in full['recommendations']
+    ]
+    assert projected['profile'] == full['profile']
+    assert projected['profileRef'] == full['profileRef']
+
+def test_id_only_projection(client, full):
+    projected = client.post('/api/recommend?fields=id&include=', json=PROFILE).json
+    assert projected == {
+        'recommendations': [{'id': rec['id']} for rec in full['recommendations']],
+        'profileRef': full['profileRef']
+    }
+
+def test_nested_sections_are_included_on_request(client, full):
+    without = client.post('/api/recommend?include=', json=PROFILE).json
+    assert 'profile' not in without
+    assert without['recommendations'] == full['recommendations']
+
+    only_profile = client.post('/api/recommend?fields=id&include=profile', json=PROFILE).json
+    assert only_profile['profile'] == full['profile']
+    assert set(only_profile['profile']) == {'summary', 'skills', 'interests', 'featuredOpportunities'}
+
+def test_compact_shape(client, full):
+    compact = client.post('/api/recommend?compact=1', json=PROFILE).json
+    assert 'profile' not in compact
+    assert compact['recommendations'] == [
+        {'id': rec['id'], 'title': rec['title'], 'snippet': make_snippet(rec['description'])}
+        for rec in full['recommendations']
+    ]
+    assert tuple(compact['recommendations'][0]) == COMPACT_FIELDS
+
+def test_streamed_recommendations_are_projected(client, full):
+    lines = client.post('/api/recommend?stream=ndjson&fields=title', json=PROFILE).get_data().decode('utf-8')
+    events = [json.loads(line) for line in lines.splitlines()]
+    streamed = [event['podcast'] for event in events if event['type'] == 'recommendation']
+    assert streamed == [{'id': rec['id'], 'title': rec['title']} for rec in full['recommendations']]
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import app as app_module
+from conftest import make_catalog
+from logs import request_stages
+
+PROFILE = {'linkedinUrl': 'https://linkedin.com/in/jane'}
+
+@pytest.fixture
+def client(catalog_file, monkeypatch):
+    monkeypatch.setitem(app_module.startup, 'ready', True)
+    return app_module.app.test_client()
+
+def stream_events(client, body):
+    response = client.post('/api/recommend?stream=ndjson', json=body)
+    return [json.loads(line) for line in response.get_data().decode('utf-8').splitlines()]
+
+def test_streamed_request_is_logged_after_the_body(client, monkeypatch):
+    logged = []
+    monkeypatch.setattr(app_module, 'write_request_log', lambda status: logged.append((status, request_stages())))
+
+    events = stream_events(client, PROFILE)
+    assert events[-1]['type'] == 'done'
+
+    # Scoring runs inside the generator, so its stage is only there once the stream is done
+    assert len(logged) == 1
+    status, stages = logged[0]
+    assert status == 200
+    assert 'scoring' in stages
+
+def test_pitches_are_streamed_for_podcasts_with_a_host_email(client):
+    # Scraped podcasts carry no host email; half of this catalog is like them
+    catalog = make_catalog()
+    for podcast in catalog[::2]:
+        del podcast['host_email']
+    with open('podcasts.json', 'w') as f:
+        json.dump(catalog, f)
+
+    events = stream_events(client, dict(PROFILE, wantsToBeFeatured=True))
+    recommended = [event['podcast'] for event in events if event['type'] == 'recommendation']
+    pitched = [event['podcastId'] for event in events if event['type'] == 'pitch']
+    assert pitched == [podcast['id'] for podcast in recommended if podcast['host_email']]
+    assert len(pitched) < len(recommended)
+
+    # Those without one can still ask for a pitch
+    unpitched = next(podcast['id'] for podcast in recommended if not podcast['host_email'])
+    response = client.get('/api/pitch', query_string={'podcastId': unpitched, 'profileRef': 'jane'})
+    assert response.status_code == 200
+    assert response.json['hostEmail'] == ''
+
+    assert not [event for event in stream_events(client, PROFILE) if event['type'] == 'pitch']
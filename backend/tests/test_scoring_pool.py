@@ -0,0 +1,71 @@
+import array
+import time
+
+import pytest
+
+from conftest import ANALYSIS, make_catalog
+from deadlines import DeadlineExceeded
+from scoring import prepare_podcast, rank_podcasts, rank_prepared
+from scoring_pool import ScoringExecutor
+
+@pytest.fixture(scope='module')
+def executor():
+    # Seven shards over 40 podcasts: uneven slices, and the top 10 spans shard boundaries
+    pool = ScoringExecutor(workers=2, shards=7)
+    yield pool
+    pool.close()
+
+def test_submit_without_a_catalog_is_refused():
+    with pytest.raises(RuntimeError):
+        ScoringExecutor(workers=1).submit(ANALYSIS, False)
+
+@pytest.mark.parametrize('k', [1, 10, 40])
+def test_pooled_ranking_matches_in_process(executor, k):
+    catalog = make_catalog(40)
+    executor.load_catalog(catalog, 'v1')
+
+    ranked = executor.submit(ANALYSIS, True, k).result(timeout=30)
+    assert ranked == rank_podcasts(catalog, ANALYSIS, True, k)
+    assert len({index for _, index, _ in ranked}) == len(ranked)
+
+def test_priors_and_similarity_are_sliced_per_shard(executor):
+    catalog = make_catalog(40)
+    executor.load_catalog(catalog, 'v1')
+    # One bonus in every shard, including the first and last podcast of a shard
+    priors = array.array('b', (3 if i % 6 == 0 else 0 for i in range(len(catalog))))
+    similar = {0: 2, 5: 4, 6: 1, 23: 4, 39: 3}
+
+    ranked = executor.submit(ANALYSIS, False, 10, priors=priors, similar=similar).result(timeout=30)
+    expected = rank_prepared([prepare_podcast(p) for p in catalog], ANALYSIS, False, 10,
+                             priors=priors, similar=similar)
+    assert ranked == expected
+    assert ranked != rank_podcasts(catalog, ANALYSIS, False, 10)
+
+def test_new_catalog_version_is_republished(executor):
+    executor.load_catalog(make_catalog(40), 'v1')
+    first_handle = executor._handle
+
+    smaller = make_catalog(40)[::-1][:25]
+    executor.load_catalog(smaller, 'v2')
+    assert executor._handle != first_handle
+    assert executor.submit(ANALYSIS, True, 10).result(timeout=30) == rank_podcasts(smaller, ANALYSIS, True, 10)
+
+    # The same version is not published again
+    executor.load_catalog(make_catalog(40), 'v2')
+    assert executor._handle[2] == 25
+
+def test_passed_deadline_raises(executor):
+    executor.load_catalog(make_catalog(40), 'v1')
+    future = executor.submit(ANALYSIS, True, 10, deadline=time.monotonic() - 1)
+    with pytest.raises(DeadlineExceeded):
+        future.result(timeout=30)
+
+def test_closing_the_pool_fails_pending_requests():
+    pool = ScoringExecutor(workers=1, shards=20)
+    pool.load_catalog(make_catalog(400), 'v1')
+    future = pool.submit(ANALYSIS, True, 10)
+    pool.close()
+
+    # Shards cancelled before they ran fail the request rather than leaving it waiting
+    with pytest.raises(RuntimeError, match='cancelled'):
+        future.result(timeout=30)
@@ -0,0 +1,170 @@
+import json
+import socket
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+import app as app_module
+import sharding
+from conftest import ANALYSIS, make_catalog
+from scoring import prepare_podcast, rank_podcasts, rank_prepared
+from sharding import ShardCoordinator, ShardPartition, create_shard_app, partition_for, write_partitions
+from similarity import SimilarityBlender, SimilarityIndex
+
+NO_SIMILARITY = SimilarityBlender(weight=0)
+
+@pytest.fixture
+def catalog(monkeypatch):
+    # Nodes read only their snapshot files; loading the full catalog is a bug
+    def no_full_catalog():
+        raise AssertionError("Shard node loaded the full catalog")
+
+    monkeypatch.setattr(sharding, 'get_all_podcasts', no_full_catalog)
+    return make_catalog(40)
+
+@pytest.fixture
+def snapshots(catalog, tmp_path):
+    return write_partitions(catalog, 'test', 3, 'hash', str(tmp_path / 'shards'))
+
+@pytest.fixture
+def shard_nodes(snapshots, serve):
+    return [serve(create_shard_app(ShardPartition(path, NO_SIMILARITY))) for path in snapshots]
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+def test_partitions_cover_the_catalog_once(catalog, tmp_path):
+    for mode in sharding.PARTITION_MODES:
+        paths = write_partitions(catalog, 'test', 3, mode, str(tmp_path / mode))
+        owners = [partition_for(podcast, 3, mode) for podcast in catalog]
+        partitions = [ShardPartition(path, NO_SIMILARITY) for path in paths]
+        assert [p.info['shard'] for p in partitions] == [0, 1, 2]
+        assert [len(p.entries()) for p in partitions] == [owners.count(i) for i in range(3)]
+        indexes = sorted(index for p in partitions for index, _, _, _ in p.entries())
+        assert indexes == list(range(len(catalog)))
+
+def test_node_reloads_a_replaced_snapshot(catalog, snapshots, tmp_path):
+    partition = ShardPartition(snapshots[0], NO_SIMILARITY)
+    assert partition.info['version'] == 'test'
+
+    time.sleep(0.01)
+    write_partitions(catalog[:20], 'smaller', 3, 'hash', str(tmp_path / 'shards'))
+    assert partition.info['version'] == 'smaller'
+    assert all(index < 20 for index, _, _, _ in partition.entries())
+
+def test_merged_top_k_matches_in_process_ranking(catalog, shard_nodes):
+    coordinator = ShardCoordinator(shard_nodes, deadline=5)
+    assert coordinator.catalog_version() == 'none'
+    merged, summary = coordinator.top_k(ANALYSIS, True, 10)
+
+    expected = rank_podcasts(catalog, ANALYSIS, True, 10)
+    assert [podcast['id'] for _, podcast, _ in merged] == [catalog[index]['id'] for _, index, _ in expected]
+    assert [score for score, _, _ in merged] == [score for score, _, _ in expected]
+    assert summary['partial'] is False
+    assert summary['responded'] == 3
+    assert coordinator.catalog_version() == 'test'
+
+def test_nodes_apply_the_coordinator_priors(catalog, shard_nodes):
+    # Lift podcasts that would otherwise rank just outside the top 10
+    ranked = rank_podcasts(catalog, ANALYSIS, False, len(catalog))
+    priors = {catalog[index]['id']: 3 for _, index, _ in ranked[10:14]}
+    merged, _ = ShardCoordinator(shard_nodes, deadline=5).top_k(ANALYSIS, False, 10, priors=priors)
+
+    aligned = [priors.get(podcast['id'], 0) for podcast in catalog]
+    expected = rank_prepared([prepare_podcast(p) for p in catalog], ANALYSIS, False, 10, priors=aligned)
+    assert [podcast['id'] for _, podcast, _ in merged] == [catalog[index]['id'] for _, index, _ in expected]
+    assert set(priors) & {podcast['id'] for _, podcast, _ in merged}
+
+def test_nodes_add_similarity_from_their_own_partition(catalog, snapshots, serve):
+    blender = SimilarityBlender(weight=4, min_similarity=0.0)
+    nodes = [serve(create_shard_app(ShardPartition(path, blender))) for path in snapshots]
+    merged, _ = ShardCoordinator(nodes, deadline=5).top_k(ANALYSIS, True, 10)
+
+    similar = {}
+    for path in snapshots:
+        entries = ShardPartition(path, NO_SIMILARITY).entries()
+        bonuses = blender.bonuses(SimilarityIndex([podcast for _, _, podcast, _ in entries]), ANALYSIS)
+        similar.update({entries[position][0]: points for position, points in bonuses.items()})
+    assert similar
+
+    expected = rank_prepared([prepare_podcast(p) for p in catalog], ANALYSIS, True, 10, similar=similar)
+    assert [podcast['id'] for _, podcast, _ in merged] == [catalog[index]['id'] for _, index, _ in expected]
+    assert [score for score, _, _ in merged] == [score for score, _, _ in expected]
+
+def test_dead_node_gives_partial_results(catalog, shard_nodes):
+    dead = closed_port_url()
+    coordinator = ShardCoordinator(shard_nodes[:2] + [dead], deadline=5)
+    merged, summary = coordinator.top_k(ANALYSIS, False, 10)
+
+    assert summary['partial'] is True
+    assert summary['failed'] == [dead]
+    assert summary['responded'] == 2
+    assert merged
+    dead_shard = {p['id'] for p in catalog if partition_for(p, 3) == 2}
+    assert not dead_shard & {podcast['id'] for _, podcast, _ in merged}
+
+def test_slow_node_is_dropped_at_the_deadline(catalog, shard_nodes, serve):
+    slow_app = Flask(__name__)
+
+    @slow_app.route('/shard/topk', methods=['POST'])
+    def slow_top_k():
+        time.sleep(2)
+        return jsonify({'shard': 9, 'version': 'test', 'results': []})
+
+    slow = serve(slow_app)
+    coordinator = ShardCoordinator(shard_nodes + [slow], deadline=0.5)
+    started = time.monotonic()
+    merged, summary = coordinator.top_k(ANALYSIS, False, 10)
+
+    assert time.monotonic() - started < 1.5
+    assert summary['failed'] == [slow]
+    assert summary['responded'] == 3
+    assert len(merged) == 10
+
+def test_failing_node_is_reported(catalog, shard_nodes, serve):
+    broken_app = Flask(__name__)
+
+    @broken_app.route('/shard/topk', methods=['POST'])
+    def broken_top_k():
+        return jsonify({'error': 'boom'}), 500
+
+    broken = serve(broken_app)
+    merged, summary = ShardCoordinator(shard_nodes + [broken], deadline=5).top_k(ANALYSIS, False, 5)
+
+    assert summary['failed'] == [broken]
+    assert len(merged) == 5
+
+def test_shard_node_rejects_requests_without_analysis(snapshots):
+    partition = ShardPartition(snapshots[0], NO_SIMILARITY)
+    client = create_shard_app(partition).test_client()
+    assert client.post('/shard/topk', json={}).status_code == 400
+    health = client.get('/shard/health').json
+    assert health['size'] == len(partition.entries())
+    assert (health['shard'], health['shardCount'], health['version']) == (0, 3, 'test')
+
+def test_coordinator_app_never_loads_the_catalog(catalog, shard_nodes, monkeypatch):
+    def no_full_catalog():
+        raise AssertionError("Coordinator loaded the full catalog")
+
+    monkeypatch.setattr(app_module, 'shard_coordinator', ShardCoordinator(shard_nodes, deadline=5))
+    monkeypatch.setattr(app_module, 'get_all_podcasts', no_full_catalog)
+    monkeypatch.setattr(app_module, 'get_projection_index', no_full_catalog)
+    monkeypatch.setattr(app_module.event_store, 'priors', lambda: ({}, ''))
+    monkeypatch.setattr(app_module, 'startup', dict(app_module.startup, ready=False))
+    assert app_module.warm_up('test')['ready'] is True
+    client = app_module.app.test_client()
+
+    url = {'linkedinUrl': 'https://linkedin.com/in/shard-test'}
+    response = client.post('/api/recommend?fields=id,title', json=url)
+    assert response.status_code == 200
+    ids = [rec['id'] for rec in response.json['recommendations']]
+    expected = rank_podcasts(catalog, app_module.get_profile_analysis(url['linkedinUrl'], False)[1], False, 10)
+    assert ids == [catalog[index]['id'] for _, index, _ in expected]
+
+    streamed = client.post('/api/recommend?stream=ndjson', json=url).get_data().decode('utf-8')
+    lines = [json.loads(line) for line in streamed.splitlines()]
+    assert [line['podcast']['id'] for line in lines if line['type'] == 'recommendation'] == \
+        [rec['id'] for rec in client.post('/api/recommend', json=url).json['recommendations']]
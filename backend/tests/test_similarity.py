@@ -0,0 +1,46 @@
+import functools
+import heapq
+
+import pytest
+
+from benchmarks.generators import generate_catalog, generate_profiles
+from linkedin_scraper import analyze_profile_for_podcasts
+from similarity import MAX_CANDIDATES, SimilarityIndex, profile_text
+
+TEXTS = [profile_text(analyze_profile_for_podcasts(profile, True)) for profile in generate_profiles(12, 3)]
+LIMIT = 50
+
+@functools.lru_cache(maxsize=None)
+def index_for(size):
+    return SimilarityIndex(generate_catalog(size, 7))
+
+def test_related_wording_matches():
+    index = SimilarityIndex([
+        {'title': 'Neural Nets Weekly', 'description': 'An AI podcast about neural nets'},
+        {'title': 'Garden Hour', 'description': 'Roses, soil and compost'},
+    ])
+    assert [position for position, _ in index.query('machine learning engineer', 10, 0.1)] == [0]
+    assert index.query('', 10) == []
+
+@pytest.mark.parametrize('size, exact_recall', [(2000, 1.0), (20000, 0.8)])
+def test_recall_against_brute_force(size, exact_recall):
+    index = index_for(size)
+    recalls = []
+    for text in TEXTS:
+        query = index.weigh(text)
+        kth = heapq.nlargest(LIMIT, (index.cosine(query, position) for position in range(size)))[-1]
+        found = [similarity for _, similarity in index.query(text, LIMIT)]
+        assert len(found) == LIMIT
+        recalls.append(sum(similarity >= kth - 1e-6 for similarity in found) / LIMIT)
+        # Any true neighbour missed loses out to one of nearly the same similarity
+        assert sum(similarity >= kth - 0.02 for similarity in found) / LIMIT >= 0.9
+    assert sum(recalls) / len(recalls) >= exact_recall
+
+def test_candidates_are_bounded_as_the_catalog_grows():
+    fractions = []
+    for size in (2000, 8000, 20000):
+        counts = [len(index_for(size).candidates(text, LIMIT)) for text in TEXTS]
+        assert max(counts) <= MAX_CANDIDATES
+        fractions.append(max(counts) / size)
+    assert fractions == sorted(fractions, reverse=True)
+    assert fractions[-1] <= 0.06
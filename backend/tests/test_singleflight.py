@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from deadlines import DeadlineExceeded, clear_deadline, set_deadline
+from singleflight import SingleFlight
+
+def run_concurrently(count, target):
+    results, errors = [None] * count, [None] * count
+
+    def call(slot):
+        try:
+            results[slot] = target()
+        except Exception as e:
+            errors[slot] = e
+
+    threads = [threading.Thread(target=call, args=(slot,)) for slot in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def wait_until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Condition never held")
+
+def wait_for_followers(flight, count):
+    # Followers are counted under the lock before they block on the call
+    wait_until(lambda: flight.stats()['coalesced'] >= count)
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {'value': 42}
+
+    threads, results, errors = run_concurrently(8, lambda: flight.do('key', compute))
+    wait_for_followers(flight, 7)
+    assert flight.stats() == {'executed': 1, 'coalesced': 7, 'in_flight': 1}
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'executed': 1, 'coalesced': 7, 'in_flight': 0}
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise ValueError("origin failed")
+
+    threads, results, errors = run_concurrently(4, lambda: flight.do('key', compute))
+    wait_for_followers(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [None] * 4
+    assert all(isinstance(error, ValueError) for error in errors)
+    # The failed call is not remembered: the next caller computes afresh
+    assert flight.do('key', lambda: 'recovered') == 'recovered'
+    assert flight.stats()['executed'] == 2
+
+def test_follower_gives_up_at_its_own_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('key', release.wait, 5))
+    leader.start()
+    wait_until(lambda: flight.stats()['in_flight'] == 1)
+
+    token = set_deadline(0.1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            flight.do('key', lambda: 'never runs')
+    finally:
+        clear_deadline(token)
+        release.set()
+        leader.join(5)
+
+    # The leader kept running and finished for everyone else
+    assert flight.stats() == {'executed': 1, 'coalesced': 1, 'in_flight': 0}
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert [flight.do(key, str, key) for key in ('a', 'b', 'a')] == ['a', 'b', 'a']
+    assert flight.stats() == {'executed': 3, 'coalesced': 0, 'in_flight': 0}